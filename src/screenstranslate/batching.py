@@ -0,0 +1,220 @@
+"""Troceo de las líneas a traducir en lotes que acepte cada proveedor.
+
+Una captura de un documento largo puede tener miles de líneas, y los
+proveedores limitan cada petición: DeepL rechaza más de 50 parámetros
+`text` o cuerpos de más de 128 KiB. `split_batches` parte la lista por
+número de textos y por bytes (medidos como los codifica cada proveedor) y
+`dispatch_batches` envía los lotes en paralelo con un máximo de peticiones
+simultáneas, recompone el resultado en orden y reintenta solo los lotes
+que fallaron por un error pasajero.
+"""
+
+from __future__ import annotations
+
+import json
+import logging
+import os
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from dataclasses import dataclass
+from typing import Callable, Dict, List, Sequence
+from urllib.parse import quote_plus
+
+from .jobs import CancellationToken, JobCancelled
+
+
+def _form_size(text: str) -> int:
+    # "&text=" + valor codificado como application/x-www-form-urlencoded.
+    return len(quote_plus(text)) + 6
+
+
+def _json_size(text: str) -> int:
+    # requests serializa con ensure_ascii: cadena entre comillas más coma.
+    return len(json.dumps(text)) + 1
+
+
+@dataclass(frozen=True)
+class BatchLimits:
+    max_items: int
+    max_bytes: int
+    measure: Callable[[str], int]
+
+
+# Se deja margen para el resto del cuerpo (clave, idiomas, cabeceras).
+PROVIDER_LIMITS: Dict[str, BatchLimits] = {
+    "deepl": BatchLimits(max_items=50, max_bytes=128 * 1024 - 2048, measure=_form_size),
+    "generic": BatchLimits(max_items=100, max_bytes=64 * 1024, measure=_json_size),
+}
+
+DEFAULT_CONCURRENCY = 4
+# Rondas extra para los lotes que fallan (además del intento inicial).
+DEFAULT_CHUNK_RETRIES = 1
+
+
+def _env_int(name: str, default: int) -> int:
+    try:
+        return int(os.getenv(name, str(default)))
+    except ValueError:
+        return default
+
+
+def limits_for(provider: str) -> BatchLimits:
+    """Límites del proveedor, ajustables con variables de entorno.
+
+    - SCREENSTRANSLATE_BATCH_MAX_ITEMS: textos por petición.
+    - SCREENSTRANSLATE_BATCH_MAX_KB: tamaño de los textos por petición.
+    """
+
+    base = PROVIDER_LIMITS.get(provider, PROVIDER_LIMITS["generic"])
+    max_items = _env_int("SCREENSTRANSLATE_BATCH_MAX_ITEMS", base.max_items)
+    max_kb = _env_int("SCREENSTRANSLATE_BATCH_MAX_KB", 0)
+    return BatchLimits(
+        max_items=max(1, max_items),
+        max_bytes=max_kb * 1024 if max_kb > 0 else base.max_bytes,
+        measure=base.measure,
+    )
+
+
+def combined_limits(providers: Sequence[str]) -> BatchLimits:
+    """Límites que sirven para todos los `providers` (lotes intercambiables)."""
+
+    limits = [limits_for(provider) for provider in providers]
+    if len(limits) == 1:
+        return limits[0]
+    measures = [limit.measure for limit in limits]
+    return BatchLimits(
+        max_items=min(limit.max_items for limit in limits),
+        max_bytes=min(limit.max_bytes for limit in limits),
+        measure=lambda text: max(measure(text) for measure in measures),
+    )
+
+
+def is_transient(exc: BaseException) -> bool:
+    """¿Tiene sentido reintentar el lote? (red caída, 429, 5xx...).
+
+    Las peticiones ya se reintentan en `HttpClient`: aquí solo se insiste
+    en lo pasajero. Un 401/403/400 o un error de cuota se propaga al
+    momento en lugar de multiplicar las llamadas fallidas.
+    """
+
+    return bool(getattr(exc, "transient", False))
+
+
+def concurrency_from_env() -> int:
+    """SCREENSTRANSLATE_BATCH_CONCURRENCY: peticiones simultáneas por captura."""
+
+    return max(1, _env_int("SCREENSTRANSLATE_BATCH_CONCURRENCY", DEFAULT_CONCURRENCY))
+
+
+def split_batches(texts: Sequence[str], limits: BatchLimits) -> List[range]:
+    """Rangos consecutivos de `texts` que respetan los límites.
+
+    Un texto que por sí solo supera `max_bytes` va en un lote propio: que
+    sea el proveedor quien lo rechace, sin arrastrar al resto.
+    """
+
+    batches: List[range] = []
+    start = 0
+    size = 0
+    for index, text in enumerate(texts):
+        item = limits.measure(text)
+        count = index - start
+        if count and (count >= limits.max_items or size + item > limits.max_bytes):
+            batches.append(range(start, index))
+            start, size = index, 0
+        size += item
+    if start < len(texts):
+        batches.append(range(start, len(texts)))
+    return batches
+
+
+def dispatch_batches(
+    texts: Sequence[str],
+    batches: Sequence[range],
+    translate_batch: Callable[[range, List[str]], List[str]],
+    executor: ThreadPoolExecutor | None,
+    max_concurrency: int = DEFAULT_CONCURRENCY,
+    retries: int = DEFAULT_CHUNK_RETRIES,
+    cancel_token: CancellationToken | None = None,
+    on_batch: Callable[[range, List[str]], None] | None = None,
+    retry_on: Callable[[BaseException], bool] = is_transient,
+) -> List[str]:
+    """Traduce los lotes y devuelve las traducciones en el orden de `texts`.
+
+    `translate_batch` recibe el rango del lote dentro de `texts` y sus
+    textos. Como mucho `max_concurrency` lotes están en vuelo a la vez. Los
+    que lanzan una excepción aceptada por `retry_on` se reintentan (solo
+    ellos) hasta `retries` rondas más; si alguno sigue fallando se relanza
+    su último error. Cualquier otro error se relanza de inmediato.
+    `on_batch` recibe cada lote terminado, en el orden en que llegan.
+    """
+
+    logger = logging.getLogger(__name__)
+    results: List[str | None] = [None] * len(texts)
+
+    def _run(batch: range) -> List[str]:
+        if cancel_token is not None:
+            cancel_token.raise_if_cancelled()
+        return translate_batch(batch, [texts[i] for i in batch])
+
+    def _store(batch: range, translated: List[str]) -> None:
+        results[batch.start : batch.stop] = translated
+        if on_batch is not None:
+            on_batch(batch, translated)
+
+    pending = list(batches)
+    for round_number in range(retries + 1):
+        failed: List[range] = []
+        last_error: BaseException | None = None
+        if executor is None or len(pending) == 1 or max_concurrency <= 1:
+            for batch in pending:
+                try:
+                    _store(batch, _run(batch))
+                except JobCancelled:
+                    raise
+                except Exception as exc:
+                    if not retry_on(exc):
+                        raise
+                    failed.append(batch)
+                    last_error = exc
+        else:
+            queue = list(reversed(pending))
+            in_flight: Dict[Future, range] = {}
+            try:
+                while queue or in_flight:
+                    while queue and len(in_flight) < max_concurrency:
+                        batch = queue.pop()
+                        in_flight[executor.submit(_run, batch)] = batch
+                    done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        batch = in_flight.pop(future)
+                        try:
+                            translated = future.result()
+                        except JobCancelled:
+                            raise
+                        except Exception as exc:
+                            if not retry_on(exc):
+                                raise
+                            failed.append(batch)
+                            last_error = exc
+                        else:
+                            _store(batch, translated)
+            finally:
+                # Cancelado: lo que no ha empezado ya no se envía.
+                for future in in_flight:
+                    future.cancel()
+
+        if not failed:
+            break
+        if round_number >= retries:
+            assert last_error is not None
+            raise last_error
+        logger.warning(
+            "%s/%s lotes de traducción fallaron (%s); se reintentan",
+            len(failed),
+            len(batches),
+            last_error,
+        )
+        failed.sort(key=lambda batch: batch.start)
+        pending = failed
+
+    return [text if text is not None else texts[i] for i, text in enumerate(results)]
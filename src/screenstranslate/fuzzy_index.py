@@ -0,0 +1,342 @@
+"""Índice de segmentos casi duplicados para la memoria de traducción.
+
+El OCR de una misma cadena en pantalla cambia a menudo en uno o dos
+caracteres (`l`/`1`, puntuación suelta, umbrales de confianza distintos),
+así que la búsqueda exacta falla y se vuelve a pagar la traducción.
+
+`FuzzyIndex` responde "segmento más cercano a distancia de edición <= k":
+
+1. MinHash de los trigramas de caracteres de cada segmento, calculado con
+   NumPy por lotes (la construcción es vectorizada).
+2. LSH por bandas: dos segmentos parecidos coinciden en alguna banda con
+   alta probabilidad; los candidatos se ordenan por bandas coincidentes.
+3. Verificación de los mejores candidatos con Levenshtein acotado.
+"""
+
+from __future__ import annotations
+
+import threading
+from collections import Counter
+from dataclasses import dataclass
+from typing import Dict, Iterable, List, Sequence, Set, Tuple
+
+import numpy as np
+
+
+NUM_BANDS = 12
+BAND_ROWS = 3
+# Candidatos (los de más bandas coincidentes) que se verifican por consulta.
+MAX_VERIFIED_CANDIDATES = 8
+# Entradas procesadas por lote al calcular firmas en NumPy.
+BUILD_CHUNK = 4096
+# Altas pendientes a partir de las cuales se reconstruye el array ordenado.
+MAX_PENDING = 2048
+# Bandas compartidas por más segmentos que esto (líneas con la misma
+# plantilla) no distinguen nada y harían cada consulta proporcional al
+# tamaño del índice: se ignoran, como las palabras vacías.
+MAX_BUCKET_SIZE = 256
+
+_GOLDEN = np.uint64(0x9E3779B97F4A7C15)
+_PAD = "\x02"
+
+
+def _permutations(count: int, seed: int = 0x5EED) -> Tuple[np.ndarray, np.ndarray]:
+    """Parámetros de hashing multiplicativo ((a*x + b) >> 32, con a impar)."""
+
+    rng = np.random.default_rng(seed)
+    a = rng.integers(0, 1 << 63, size=count, dtype=np.uint64) | np.uint64(1)
+    b = rng.integers(0, 1 << 63, size=count, dtype=np.uint64)
+    return a, b
+
+
+_PERM_A, _PERM_B = _permutations(NUM_BANDS * BAND_ROWS)
+# Pesos para combinar las filas de una banda en una sola clave entera.
+_BAND_WEIGHTS = np.array([1, 1_000_003, 1_000_003**2 % (1 << 61)], dtype=np.uint64)[:BAND_ROWS]
+_BAND_SALTS = (np.arange(NUM_BANDS, dtype=np.uint64) + np.uint64(1)) * _GOLDEN
+
+
+def _levenshtein(a: str, b: str, max_distance: int | None = None) -> int:
+    """Distancia de edición con el algoritmo de vectores de bits de Myers.
+
+    Cada columna se procesa con unas pocas operaciones sobre enteros de
+    Python, en lugar de recorrer la matriz completa carácter a carácter.
+    Con `max_distance`, en cuanto la distancia ya no puede bajar de ese
+    límite se devuelve `max_distance + 1`.
+    """
+
+    if not a:
+        return len(b)
+    # La puntuación baja como mucho 1 por columna restante.
+    cutoff = max_distance + len(b) if max_distance is not None else None
+    peq: Dict[str, int] = {}
+    for i, char in enumerate(a):
+        peq[char] = peq.get(char, 0) | (1 << i)
+    mask = (1 << len(a)) - 1
+    last = 1 << (len(a) - 1)
+    pv, mv, score = mask, 0, len(a)
+    for column, char in enumerate(b, 1):
+        eq = peq.get(char, 0)
+        xv = eq | mv
+        xh = (((eq & pv) + pv) ^ pv) | eq
+        ph = (mv | ~(xh | pv)) & mask
+        mh = pv & xh
+        if ph & last:
+            score += 1
+        elif mh & last:
+            score -= 1
+        ph = ((ph << 1) | 1) & mask
+        mh = (mh << 1) & mask
+        pv = (mh | ~(xv | ph)) & mask
+        mv = ph & xv
+        if cutoff is not None and score + column > cutoff:
+            return max_distance + 1  # type: ignore[operator]
+    return score
+
+
+def bounded_levenshtein(a: str, b: str, max_distance: int) -> int | None:
+    """Distancia de edición entre `a` y `b`, o None si supera `max_distance`."""
+
+    if a == b:
+        return 0
+    if abs(len(a) - len(b)) > max_distance:
+        return None
+    # El ruido de OCR suele concentrarse en uno o dos puntos: recortar el
+    # prefijo y el sufijo comunes deja muy poco por comparar.
+    start = 0
+    limit = min(len(a), len(b))
+    while start < limit and a[start] == b[start]:
+        start += 1
+    end = 0
+    limit -= start
+    while end < limit and a[-1 - end] == b[-1 - end]:
+        end += 1
+    a = a[start : len(a) - end]
+    b = b[start : len(b) - end]
+    if min(len(a), len(b)) > 2 * max_distance + 4:
+        # Cota inferior barata (distancia de bolsa): cada edición cambia como
+        # mucho un carácter de cada multiconjunto. En tramos cortos sale más
+        # a cuenta ir directamente a Myers.
+        balance = Counter(a)
+        balance.subtract(b)
+        surplus = sum(n for n in balance.values() if n > 0)
+        if max(surplus, surplus + len(b) - len(a)) > max_distance:
+            return None
+    # El patrón más corto da enteros más pequeños.
+    if len(a) > len(b):
+        a, b = b, a
+    distance = _levenshtein(a, b, max_distance)
+    return distance if distance <= max_distance else None
+
+
+def _signatures(texts: Sequence[str]) -> np.ndarray:
+    """Firmas MinHash (len(texts) x NUM_BANDS*BAND_ROWS) de los trigramas.
+
+    Los textos se concatenan con relleno y se trabaja sobre sus códigos
+    UTF-32, de modo que los trigramas de todo el lote salen de una sola
+    operación vectorizada; se descartan los que cruzan dos textos.
+    """
+
+    padded = [_PAD + text + _PAD for text in texts]
+    lengths = np.fromiter((len(p) for p in padded), dtype=np.int64, count=len(padded))
+    codes = np.frombuffer("".join(padded).encode("utf-32-le"), dtype=np.uint32).astype(np.uint64)
+
+    grams = codes[:-2] * np.uint64(1 << 42) ^ codes[1:-1] * np.uint64(1 << 21) ^ codes[2:]
+    # Posiciones válidas: trigramas que empiezan y terminan en el mismo texto.
+    owner_all = np.repeat(np.arange(len(padded)), lengths)
+    valid = owner_all[:-2] == owner_all[2:]
+    grams = grams[valid]
+    owner = owner_all[:-2][valid]
+
+    # Todas las permutaciones a la vez: (permutaciones x trigramas), para
+    # que el mínimo por texto recorra memoria contigua. La aritmética
+    # uint64 desborda a propósito (hashing multiplicativo).
+    values = _PERM_A[:, None] * grams
+    values += _PERM_B[:, None]
+    values >>= np.uint64(32)
+    # Cada texto tiene al menos un trigrama gracias al relleno.
+    offsets = np.flatnonzero(np.r_[True, owner[1:] != owner[:-1]])
+    return np.minimum.reduceat(values, offsets, axis=1).T
+
+
+def _signature(text: str) -> np.ndarray:
+    """Firma MinHash de un único texto (camino rápido para consultas)."""
+
+    codes = np.frombuffer((_PAD + text + _PAD).encode("utf-32-le"), dtype=np.uint32).astype(np.uint64)
+    grams = codes[:-2] * np.uint64(1 << 42) ^ codes[1:-1] * np.uint64(1 << 21) ^ codes[2:]
+    values = _PERM_A[:, None] * grams
+    values += _PERM_B[:, None]
+    values >>= np.uint64(32)
+    return values.min(axis=1)[None, :]
+
+
+def _band_keys(signatures: np.ndarray) -> np.ndarray:
+    """Clave entera por banda (len x NUM_BANDS) a partir de las firmas.
+
+    Cada banda lleva su propia sal para poder guardar las claves de todas
+    las bandas en un único array ordenado.
+    """
+
+    rows = signatures.reshape(len(signatures), NUM_BANDS, BAND_ROWS).astype(np.uint64)
+    keys = (rows * _BAND_WEIGHTS).sum(axis=2, dtype=np.uint64)
+    return keys ^ _BAND_SALTS
+
+
+@dataclass
+class FuzzyMatch:
+    text: str
+    distance: int
+    similarity: float
+
+
+class FuzzyIndex:
+    """Índice LSH en memoria de segmentos ya traducidos.
+
+    Las claves de banda viven en un array ordenado (búsqueda binaria con
+    `np.searchsorted`); las altas recientes van a un diccionario pequeño
+    que se funde con el array cuando crece. Las bajas se marcan y se
+    compactan cuando llegan a la mitad del índice.
+    """
+
+    def __init__(self) -> None:
+        self._texts: List[str] = []
+        self._ids: Dict[str, int] = {}
+        self._key_chunks: List[np.ndarray] = []
+        self._sorted_keys = np.empty(0, dtype=np.uint64)
+        self._sorted_ids = np.empty(0, dtype=np.int64)
+        self._pending: Dict[int, List[int]] = {}
+        self._pending_count = 0
+        # Identificadores dados de baja que aún ocupan sitio en los arrays.
+        self._removed: Set[int] = set()
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._ids)
+
+    def __contains__(self, text: str) -> bool:
+        return text in self._ids
+
+    def add_many(self, texts: Iterable[str]) -> None:
+        with self._lock:
+            new = [t for t in dict.fromkeys(texts) if t and t not in self._ids]
+        if not new:
+            return
+        keys = np.concatenate([_band_keys(_signatures(new[i : i + BUILD_CHUNK])) for i in range(0, len(new), BUILD_CHUNK)])
+
+        with self._lock:
+            first_id = len(self._texts)
+            for text in new:
+                self._ids[text] = len(self._texts)
+                self._texts.append(text)
+            self._key_chunks.append(keys)
+            if self._pending_count + len(new) >= MAX_PENDING:
+                self._rebuild_locked()
+                return
+            for offset, bands in enumerate(keys.tolist()):
+                for key in bands:
+                    self._pending.setdefault(key, []).append(first_id + offset)
+            self._pending_count += len(new)
+
+    def add(self, text: str) -> None:
+        self.add_many((text,))
+
+    def remove_many(self, texts: Iterable[str]) -> None:
+        with self._lock:
+            for text in texts:
+                text_id = self._ids.pop(text, None)
+                if text_id is not None:
+                    self._removed.add(text_id)
+            if self._removed and len(self._removed) * 2 >= len(self._texts):
+                self._compact_locked()
+
+    def _compact_locked(self) -> None:
+        live = sorted(self._ids.values())
+        keys = np.concatenate(self._key_chunks)[live] if live else None
+        self._texts = [self._texts[i] for i in live]
+        self._ids = {text: i for i, text in enumerate(self._texts)}
+        self._removed.clear()
+        self._pending.clear()
+        self._pending_count = 0
+        if keys is None:
+            self._key_chunks = []
+            self._sorted_keys = np.empty(0, dtype=np.uint64)
+            self._sorted_ids = np.empty(0, dtype=np.int64)
+        else:
+            self._key_chunks = [keys]
+            self._rebuild_locked()
+
+    def _rebuild_locked(self) -> None:
+        keys = np.concatenate(self._key_chunks) if len(self._key_chunks) > 1 else self._key_chunks[0]
+        self._key_chunks = [keys]
+        flat = keys.ravel()
+        order = np.argsort(flat, kind="stable")
+        self._sorted_keys = flat[order]
+        self._sorted_ids = order // NUM_BANDS
+        self._pending.clear()
+        self._pending_count = 0
+
+    def nearest(self, text: str, max_distance: int = 2, min_similarity: float = 0.0) -> FuzzyMatch | None:
+        """Segmento más cercano a distancia <= `max_distance` (o None).
+
+        `min_similarity` (1 - distancia / longitud máxima) evita reutilizar
+        traducciones de textos cortos en los que 1-2 cambios lo son todo.
+        """
+
+        if not text:
+            return None
+        with self._lock:
+            if text in self._ids:
+                return FuzzyMatch(text=text, distance=0, similarity=1.0)
+            if not self._ids:
+                return None
+
+        bands = _band_keys(_signature(text))[0]
+        with self._lock:
+            lo = np.searchsorted(self._sorted_keys, bands, side="left")
+            hi = np.searchsorted(self._sorted_keys, bands, side="right")
+            hits = [
+                self._sorted_ids[start:stop]
+                for start, stop in zip(lo.tolist(), hi.tolist())
+                if 0 < stop - start <= MAX_BUCKET_SIZE
+            ]
+            if self._pending:
+                for key in bands.tolist():
+                    bucket = self._pending.get(key)
+                    if bucket and len(bucket) <= MAX_BUCKET_SIZE:
+                        hits.append(np.asarray(bucket, dtype=np.int64))
+            if not hits:
+                return None
+            ids, votes = np.unique(np.concatenate(hits), return_counts=True)
+            if self._removed:
+                live = np.fromiter((i not in self._removed for i in ids.tolist()), dtype=bool, count=len(ids))
+                ids, votes = ids[live], votes[live]
+                if not len(ids):
+                    return None
+            order = np.argsort(-votes, kind="stable")[:MAX_VERIFIED_CANDIDATES]
+            # Un casi duplicado coincide en muchas bandas; los candidatos con
+            # menos de la mitad de votos que el mejor rara vez lo son.
+            min_votes = (int(votes[order[0]]) + 1) // 2
+            candidates = [self._texts[int(ids[i])] for i in order if votes[i] >= min_votes]
+
+        best: FuzzyMatch | None = None
+        for candidate in candidates:
+            limit = max_distance if best is None else best.distance - 1
+            if limit < 0:
+                break
+            distance = bounded_levenshtein(text, candidate, limit)
+            if distance is None:
+                continue
+            similarity = 1.0 - distance / max(len(text), len(candidate))
+            if similarity >= min_similarity:
+                best = FuzzyMatch(text=candidate, distance=distance, similarity=similarity)
+        return best
+
+    def remove_all(self) -> None:
+        with self._lock:
+            self._removed.clear()
+            self._texts.clear()
+            self._ids.clear()
+            self._key_chunks = []
+            self._sorted_keys = np.empty(0, dtype=np.uint64)
+            self._sorted_ids = np.empty(0, dtype=np.int64)
+            self._pending.clear()
+            self._pending_count = 0
@@ -0,0 +1,248 @@
+"""Peticiones "hedged" y failover entre varios proveedores de traducción.
+
+Con más de un proveedor configurado, cada lote se envía primero al
+principal. Si no ha respondido cuando ya supera su p95 de latencia
+habitual, se lanza la misma petición al siguiente proveedor ("hedge");
+si falla con un error pasajero, se pasa al siguiente de inmediato
+(failover). Gana la primera respuesta válida y el resto de intentos se
+cancelan.
+
+La latencia de cada proveedor se resume en un `LatencyHistogram` de
+cubetas logarítmicas que olvida poco a poco las muestras antiguas.
+"""
+
+from __future__ import annotations
+
+import logging
+import math
+import os
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from contextlib import ExitStack
+from dataclasses import dataclass
+from typing import Callable, Dict, Generic, Sequence, Tuple, TypeVar
+
+from .batching import is_transient
+from .jobs import REASON_SUPERSEDED, CancellationToken
+
+
+T = TypeVar("T")
+
+# Cubetas de 20 ms a ~2 min con un 25 % de crecimiento entre cada una.
+_BUCKET_BASE = 0.02
+_BUCKET_GROWTH = 1.25
+_BUCKET_COUNT = 40
+# Al llegar a tantas muestras se reducen todas a la mitad, para que el
+# histograma siga los cambios de latencia del proveedor.
+_DECAY_AT = 512
+
+
+class LatencyHistogram:
+    def __init__(self) -> None:
+        self._counts = [0.0] * _BUCKET_COUNT
+        self._total = 0.0
+        self._lock = threading.Lock()
+
+    @property
+    def samples(self) -> int:
+        return int(self._total)
+
+    def record(self, seconds: float) -> None:
+        if seconds <= _BUCKET_BASE:
+            bucket = 0
+        else:
+            bucket = min(_BUCKET_COUNT - 1, int(math.log(seconds / _BUCKET_BASE, _BUCKET_GROWTH)) + 1)
+        with self._lock:
+            self._counts[bucket] += 1
+            self._total += 1
+            if self._total >= _DECAY_AT:
+                self._counts = [count / 2 for count in self._counts]
+                self._total /= 2
+
+    def quantile(self, q: float) -> float | None:
+        """Cota superior del cuantil `q` en segundos (None sin muestras)."""
+
+        with self._lock:
+            if not self._total:
+                return None
+            target = q * self._total
+            seen = 0.0
+            for bucket, count in enumerate(self._counts):
+                seen += count
+                if seen >= target:
+                    return _BUCKET_BASE * _BUCKET_GROWTH**bucket
+        return _BUCKET_BASE * _BUCKET_GROWTH ** (_BUCKET_COUNT - 1)
+
+
+def _env_float(name: str, default: float) -> float:
+    try:
+        return float(os.getenv(name, str(default)))
+    except ValueError:
+        return default
+
+
+@dataclass(frozen=True)
+class HedgePolicy:
+    enabled: bool = True
+    quantile: float = 0.95
+    # Retardo mientras el proveedor no tiene muestras suficientes.
+    default_delay: float = 1.0
+    min_delay: float = 0.1
+    min_samples: int = 20
+
+    @classmethod
+    def from_env(cls) -> "HedgePolicy":
+        """Lee SCREENSTRANSLATE_HEDGE (0 = solo failover), _HEDGE_QUANTILE,
+        _HEDGE_DEFAULT_MS y _HEDGE_MIN_MS."""
+
+        defaults = cls()
+        return cls(
+            enabled=os.getenv("SCREENSTRANSLATE_HEDGE", "1") != "0",
+            quantile=_env_float("SCREENSTRANSLATE_HEDGE_QUANTILE", defaults.quantile),
+            default_delay=_env_float("SCREENSTRANSLATE_HEDGE_DEFAULT_MS", defaults.default_delay * 1000) / 1000,
+            min_delay=_env_float("SCREENSTRANSLATE_HEDGE_MIN_MS", defaults.min_delay * 1000) / 1000,
+        )
+
+    def delay_for(self, histogram: LatencyHistogram) -> float | None:
+        """Segundos a esperar antes de duplicar la petición (None = nunca)."""
+
+        if not self.enabled:
+            return None
+        if histogram.samples < self.min_samples:
+            return self.default_delay
+        value = histogram.quantile(self.quantile)
+        return max(self.min_delay, value if value is not None else self.default_delay)
+
+
+@dataclass
+class HedgeStats:
+    calls: int = 0
+    hedges: int = 0
+    hedge_wins: int = 0
+    failovers: int = 0
+
+
+@dataclass
+class _Attempt:
+    index: int
+    token: CancellationToken
+    started: float
+
+
+class HedgedGroup(Generic[T]):
+    """Reparte una llamada entre proveedores ordenados por preferencia.
+
+    `failover_on(error)` decide si un fallo justifica probar el siguiente
+    proveedor; por defecto, solo los pasajeros (`batching.is_transient`).
+    """
+
+    def __init__(
+        self,
+        names: Sequence[str],
+        policy: HedgePolicy | None = None,
+        max_workers: int = 8,
+        failover_on: Callable[[BaseException], bool] = is_transient,
+    ) -> None:
+        self.names = list(names)
+        self.policy = policy or HedgePolicy.from_env()
+        self.failover_on = failover_on
+        self._histograms: Dict[str, LatencyHistogram] = {name: LatencyHistogram() for name in self.names}
+        self._stats = HedgeStats()
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="translate-hedge")
+
+    def histogram(self, name: str) -> LatencyHistogram:
+        return self._histograms[name]
+
+    def stats(self) -> HedgeStats:
+        with self._lock:
+            return HedgeStats(**vars(self._stats))
+
+    def _count(self, field: str) -> None:
+        with self._lock:
+            setattr(self._stats, field, getattr(self._stats, field) + 1)
+
+    def call(
+        self,
+        attempt: Callable[[str, CancellationToken], T],
+        cancel_token: CancellationToken | None = None,
+    ) -> Tuple[str, T]:
+        """Ejecuta `attempt(proveedor, token)` con hedging y failover.
+
+        Devuelve (proveedor ganador, resultado). Si todos fallan se relanza
+        el último error; si se cancela `cancel_token`, `JobCancelled`.
+        """
+
+        logger = logging.getLogger(__name__)
+        self._count("calls")
+        in_flight: Dict[Future, _Attempt] = {}
+        last_error: BaseException | None = None
+        next_index = 0
+
+        with ExitStack() as stack:
+
+            def _launch() -> None:
+                nonlocal next_index
+                name = self.names[next_index]
+                if cancel_token is not None:
+                    token = stack.enter_context(cancel_token.child(cancel_token.stage or name))
+                else:
+                    token = CancellationToken(name)
+                future = self._executor.submit(attempt, name, token)
+                in_flight[future] = _Attempt(next_index, token, time.monotonic())
+                next_index += 1
+
+            _launch()
+            try:
+                while in_flight:
+                    timeout = None
+                    if next_index < len(self.names):
+                        # El último lanzado decide cuándo se duplica la petición.
+                        newest = max(in_flight.values(), key=lambda a: a.index)
+                        delay = self.policy.delay_for(self._histograms[self.names[newest.index]])
+                        if delay is not None:
+                            timeout = max(0.0, newest.started + delay - time.monotonic())
+                    done, _ = wait(in_flight, timeout=timeout, return_when=FIRST_COMPLETED)
+                    if cancel_token is not None:
+                        cancel_token.raise_if_cancelled()
+                    if not done:
+                        logger.info("Sin respuesta de %s a tiempo: se duplica la petición", self.names[next_index - 1])
+                        self._count("hedges")
+                        _launch()
+                        continue
+
+                    for future in done:
+                        current = in_flight.pop(future)
+                        name = self.names[current.index]
+                        try:
+                            result = future.result()
+                        except Exception as exc:
+                            last_error = exc
+                            logger.warning("El proveedor %s falló: %s", name, exc)
+                            if not self.failover_on(exc):
+                                # No se lanzan más intentos (ni hedge ni
+                                # failover); los que ya estén en vuelo siguen.
+                                next_index = len(self.names)
+                            elif next_index < len(self.names) and not in_flight:
+                                self._count("failovers")
+                                _launch()
+                            continue
+                        self._histograms[name].record(time.monotonic() - current.started)
+                        if current.index > 0 and any(a.index < current.index for a in in_flight.values()):
+                            self._count("hedge_wins")
+                        return name, result
+            finally:
+                now = time.monotonic()
+                for loser in in_flight.values():
+                    # Cota inferior de su latencia: mejor que no contarla.
+                    self._histograms[self.names[loser.index]].record(now - loser.started)
+                    loser.token.cancel(REASON_SUPERSEDED)
+
+        if cancel_token is not None:
+            cancel_token.raise_if_cancelled()
+        assert last_error is not None
+        raise last_error
+
+    def close(self) -> None:
+        self._executor.shutdown(wait=False, cancel_futures=True)
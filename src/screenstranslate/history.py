@@ -1,36 +1,635 @@
-﻿"""GestiÃ³n de historial de traducciones para ScreensTranslate Pro."""
+﻿"""GestiÃ³n de historial de traducciones para ScreensTranslate Pro.
+
+El historial vive en una base SQLite en modo WAL (`history.sqlite3`):
+cada entrada es una inserción y no hay que leer ni reescribir todo el
+historial, como pasaba con `history.json`. Los ids salen de una columna
+AUTOINCREMENT, así que siguen creciendo aunque se borre el historial.
+
+La primera vez que se abre la base se importa el `history.json` antiguo,
+si existe, y se renombra a `history.json.migrated`.
+
+Las escrituras no se hacen en el hilo que traduce: `add_entry` y
+`add_entries` solo encolan, y un `HistoryWriter` en segundo plano escribe
+cada captura en una transacción (group commit). Si el proceso muere de
+golpe solo se pierde lo que aún no se había escrito.
+
+`search` busca en el texto original y en el traducido con un índice FTS5
+de trigramas (sirve también para chino o japonés, que no separan
+palabras), filtrando por idiomas y fechas.
+"""
 
 from __future__ import annotations
 
 import json
+import logging
+import os
+import queue
+import sqlite3
+import threading
+import time
+from dataclasses import dataclass
 from datetime import datetime, timezone
 from pathlib import Path
-from typing import Any, Dict, List
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Sequence, Tuple
 
 from .config import get_app_dir
 
 
+HISTORY_DB_NAME = "history.sqlite3"
 HISTORY_FILE_NAME = "history.json"
 
+_COLUMNS = ("id", "original", "translated", "source_lang", "target_lang", "timestamp")
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS history (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    original TEXT NOT NULL,
+    translated TEXT NOT NULL,
+    source_lang TEXT NOT NULL,
+    target_lang TEXT NOT NULL,
+    timestamp TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS history_timestamp ON history (timestamp);
+CREATE INDEX IF NOT EXISTS history_pair ON history (source_lang, target_lang);
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value TEXT NOT NULL
+);
+"""
+
+# Índice de texto completo sobre la tabla `history` (contenido externo: no
+# duplica el texto). El historial solo crece, así que basta el trigger de
+# inserción; `clear` vacía el índice aparte.
+_FTS_SCHEMA = """
+CREATE VIRTUAL TABLE IF NOT EXISTS history_fts USING fts5(
+    original, translated, content='history', content_rowid='id', tokenize='trigram'
+);
+"""
+_FTS_TRIGGER = """
+CREATE TRIGGER IF NOT EXISTS history_fts_insert AFTER INSERT ON history BEGIN
+    INSERT INTO history_fts (rowid, original, translated) VALUES (new.id, new.original, new.translated);
+END;
+"""
+
+# El tokenizador de trigramas no indexa términos de menos de 3 caracteres;
+# esos se buscan con LIKE recorriendo la tabla, así que la interfaz no los
+# busca mientras se escribe.
+MIN_INDEXED_TERM = 3
+
+HistoryRow = Tuple[str, str, str, str, str]
+
+# Capturas pendientes de escribir como máximo.
+DEFAULT_QUEUE_SIZE = 64
+# Cada cuánto se escriben las entradas sueltas de `add_entry`.
+DEFAULT_FLUSH_INTERVAL = 1.0
+# Entradas sueltas acumuladas que fuerzan una escritura antes de tiempo.
+MAX_BUFFERED_ENTRIES = 200
+# Espera máxima de quien encola si la cola está llena; después se descarta.
+DEFAULT_BLOCK_TIMEOUT = 0.05
+# Espera máxima de las lecturas (hilo de la interfaz) a que se escriba lo
+# pendiente; lo que llegue después lo añade el aviso del escritor.
+READ_FLUSH_TIMEOUT = 0.2
+
+
+def get_history_db_path() -> Path:
+    return get_app_dir() / HISTORY_DB_NAME
+
 
 def get_history_path() -> Path:
+    """Ruta del historial JSON antiguo (solo para migrarlo)."""
+
     return get_app_dir() / HISTORY_FILE_NAME
 
 
+def _now() -> str:
+    return datetime.now(timezone.utc).isoformat()
+
+
+def _as_dict(row: Tuple[Any, ...]) -> Dict[str, Any]:
+    return dict(zip(_COLUMNS, row))
+
+
+class HistoryStore:
+    """Historial de solo inserción sobre SQLite."""
+
+    def __init__(self, path: Path | str) -> None:
+        self.path = str(path)
+        self._lock = threading.Lock()
+        # Se usa desde los hilos del flujo de traducción, siempre bajo _lock.
+        self._conn = sqlite3.connect(self.path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(_SCHEMA)
+        self._fts = self._create_fts()
+        self._conn.commit()
+
+    def _create_fts(self) -> bool:
+        exists = self._conn.execute(
+            "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'history_fts'"
+        ).fetchone()
+        try:
+            self._conn.executescript(_FTS_SCHEMA + _FTS_TRIGGER)
+        except sqlite3.OperationalError:
+            # SQLite sin FTS5 o sin trigramas (anterior a 3.34): búsqueda con LIKE.
+            logging.getLogger(__name__).warning("FTS5 con trigramas no disponible; búsqueda sin índice")
+            return False
+        if not exists:
+            # Historial creado antes del índice.
+            self._conn.execute("INSERT INTO history_fts (history_fts) VALUES ('rebuild')")
+        return True
+
+    def add(self, original: str, translated: str, source_lang: str, target_lang: str) -> int:
+        """Añade una entrada y devuelve su id."""
+
+        return self.add_many([(original, translated, source_lang, target_lang, _now())])[-1]
+
+    def add_many(self, rows: Iterable[HistoryRow]) -> List[int]:
+        """Inserta (original, traducido, origen, destino, fecha ISO) en una transacción."""
+
+        ids: List[int] = []
+        with self._lock:
+            with self._conn:
+                for row in rows:
+                    cursor = self._conn.execute(
+                        "INSERT INTO history (original, translated, source_lang, target_lang, timestamp)"
+                        " VALUES (?, ?, ?, ?, ?)",
+                        row,
+                    )
+                    ids.append(int(cursor.lastrowid))
+        return ids
+
+    def count(self) -> int:
+        with self._lock:
+            return int(self._conn.execute("SELECT COUNT(*) FROM history").fetchone()[0])
+
+    def entries(self, limit: int | None = None, offset: int = 0, newest_first: bool = True) -> List[Dict[str, Any]]:
+        order = "DESC" if newest_first else "ASC"
+        with self._lock:
+            rows = self._conn.execute(
+                f"SELECT {', '.join(_COLUMNS)} FROM history ORDER BY id {order} LIMIT ? OFFSET ?",
+                (-1 if limit is None else limit, offset),
+            ).fetchall()
+        return [_as_dict(row) for row in rows]
+
+    def clear(self) -> None:
+        # DELETE (y no DROP) conserva el contador de AUTOINCREMENT.
+        with self._lock:
+            with self._conn:
+                if self._fts:
+                    self._conn.execute("INSERT INTO history_fts (history_fts) VALUES ('delete-all')")
+                self._conn.execute("DELETE FROM history")
+
+    def _filter_sql(
+        self,
+        query: str = "",
+        source_lang: str | None = None,
+        target_lang: str | None = None,
+        since: str | None = None,
+        until: str | None = None,
+        before_id: int | None = None,
+        after_id: int | None = None,
+    ) -> Tuple[str, List[Any], str]:
+        """FROM/WHERE de una búsqueda, sus parámetros y la columna de orden."""
+
+        where: List[str] = []
+        params: List[Any] = []
+        fts_terms: List[str] = []
+        for term in query.split():
+            if self._fts and len(term) >= MIN_INDEXED_TERM:
+                fts_terms.append('"' + term.replace('"', '""') + '"')
+            else:
+                pattern = "%" + term.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_") + "%"
+                where.append("(h.original LIKE ? ESCAPE '\\' OR h.translated LIKE ? ESCAPE '\\')")
+                params.extend([pattern, pattern])
+        for column, value in (("h.source_lang", source_lang), ("h.target_lang", target_lang)):
+            if value:
+                # Con un solo idioma, el índice del par obligaría a ordenar
+                # todas sus filas: "+" lo descarta y se recorre por id.
+                prefix = "" if source_lang and target_lang else "+"
+                where.append(f"{prefix}{column} = ?")
+                params.append(value)
+        if since:
+            where.append("h.timestamp >= ?")
+            params.append(since)
+        if until:
+            where.append("h.timestamp < ?")
+            params.append(until)
+
+        if fts_terms:
+            # CROSS JOIN fija el orden: se recorre el índice de texto de más
+            # reciente a más antiguo y se para al llegar a `limit`. Si no,
+            # SQLite puede empezar por los filtros y evaluar MATCH fila a fila.
+            sql = "FROM history_fts CROSS JOIN history AS h ON h.id = history_fts.rowid"
+            where.insert(0, "history_fts MATCH ?")
+            params.insert(0, " AND ".join(fts_terms))
+            order = "history_fts.rowid"
+        else:
+            sql = "FROM history AS h"
+            order = "h.id"
+        # El límite de página va sobre la columna de orden: con FTS, sobre
+        # `history_fts.rowid`, para que el índice de texto empiece en el
+        # cursor en vez de recorrer (y descartar) las páginas anteriores.
+        for operator, value in (("<", before_id), (">", after_id)):
+            if value is not None:
+                where.append(f"{order} {operator} ?")
+                params.append(value)
+        if where:
+            sql += " WHERE " + " AND ".join(where)
+        return sql, params, order
+
+    def search(
+        self,
+        query: str = "",
+        limit: int = 200,
+        offset: int = 0,
+        newest_first: bool = True,
+        **filters: Any,
+    ) -> List[Dict[str, Any]]:
+        """Entradas que contienen todos los términos de `query`, ordenadas por id.
+
+        Cada término (separado por espacios) debe aparecer en el original o
+        en la traducción, sin distinguir mayúsculas. Filtros: `source_lang`,
+        `target_lang`, `since`/`until` (fechas ISO 8601 en UTC, como las de
+        `timestamp`; `until` excluida) y `before_id`/`after_id` (excluidos).
+        Para paginar, mejor `before_id`/`after_id` que `offset`, que obliga
+        a SQLite a recorrer las filas saltadas.
+        """
+
+        sql, params, order = self._filter_sql(query, **filters)
+        columns = ", ".join(f"h.{column}" for column in _COLUMNS)
+        direction = "DESC" if newest_first else "ASC"
+        with self._lock:
+            rows = self._conn.execute(
+                f"SELECT {columns} {sql} ORDER BY {order} {direction} LIMIT ? OFFSET ?",
+                [*params, limit, offset],
+            ).fetchall()
+        return [_as_dict(row) for row in rows]
+
+    def count_matches(self, query: str = "", **filters: Any) -> int:
+        sql, params, _ = self._filter_sql(query, **filters)
+        with self._lock:
+            return int(self._conn.execute(f"SELECT COUNT(*) {sql}", params).fetchone()[0])
+
+    def iter_search(
+        self,
+        query: str = "",
+        chunk_size: int = 1000,
+        newest_first: bool = True,
+        **filters: Any,
+    ) -> Iterator[List[Dict[str, Any]]]:
+        """Recorre una búsqueda entera por bloques de `chunk_size` entradas.
+
+        Cada bloque es una consulta aparte (paginando por id), así que el
+        lock no se retiene entre bloques y la memoria no crece con el total.
+        """
+
+        bound = "before_id" if newest_first else "after_id"
+        last: int | None = None
+        while True:
+            if last is not None:
+                filters[bound] = last
+            page = self.search(query, limit=chunk_size, newest_first=newest_first, **filters)
+            if not page:
+                return
+            yield page
+            if len(page) < chunk_size:
+                return
+            last = page[-1]["id"]
+
+    def language_pairs(self) -> List[Tuple[str, str]]:
+        with self._lock:
+            return [
+                (str(src), str(tgt))
+                for src, tgt in self._conn.execute(
+                    "SELECT DISTINCT source_lang, target_lang FROM history ORDER BY source_lang, target_lang"
+                )
+            ]
+
+    def migrate_legacy(self, json_path: Path) -> int:
+        """Importa `history.json` una sola vez; devuelve las entradas importadas."""
+
+        with self._lock:
+            done = self._conn.execute("SELECT 1 FROM meta WHERE key = 'legacy_migrated'").fetchone()
+        if done or not json_path.exists():
+            return 0
+
+        try:
+            entries = json.loads(json_path.read_text(encoding="utf-8"))
+        except Exception:
+            # Historial corrupto: se ignora, como hacía `load_history`.
+            logging.getLogger(__name__).exception("No se pudo leer %s para migrarlo", json_path)
+            entries = []
+        rows = [
+            (
+                str(entry.get("original", "")),
+                str(entry.get("translated", "")),
+                str(entry.get("source_lang", "")),
+                str(entry.get("target_lang", "")),
+                str(entry.get("timestamp") or _now()),
+            )
+            for entry in entries
+            if isinstance(entry, dict)
+        ]
+        # Los ids antiguos podían repetirse tras borrar: se renumeran en
+        # orden cronológico.
+        rows.sort(key=lambda row: row[4])
+        with self._lock:
+            with self._conn:
+                if self._fts:
+                    # Reconstruir el índice al final es varias veces más
+                    # rápido que actualizarlo fila a fila con el trigger.
+                    self._conn.execute("DROP TRIGGER IF EXISTS history_fts_insert")
+                self._conn.executemany(
+                    "INSERT INTO history (original, translated, source_lang, target_lang, timestamp)"
+                    " VALUES (?, ?, ?, ?, ?)",
+                    rows,
+                )
+                if self._fts:
+                    self._conn.execute("INSERT INTO history_fts (history_fts) VALUES ('rebuild')")
+                    self._conn.execute(_FTS_TRIGGER)
+                self._conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES ('legacy_migrated', ?)", (_now(),))
+        try:
+            json_path.replace(json_path.with_name(json_path.name + ".migrated"))
+        except OSError:
+            logging.getLogger(__name__).warning("No se pudo renombrar %s tras migrarlo", json_path)
+        logging.getLogger(__name__).info("Historial migrado desde %s: %s entradas", json_path, len(rows))
+        return len(rows)
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+
+@dataclass
+class HistoryWriterStats:
+    queued_batches: int = 0
+    written_batches: int = 0
+    written_entries: int = 0
+    transactions: int = 0
+    dropped_entries: int = 0
+    failed_entries: int = 0
+    last_commit_ms: float = 0.0
+
+
+class HistoryWriter:
+    """Escribe el historial en segundo plano agrupando las inserciones.
+
+    Cada lote encolado con `submit` (las líneas de una captura) se escribe
+    entero en su propia transacción, en orden: si el proceso muere, se
+    pierde el lote que se estaba escribiendo y los que aún esperaban en la
+    cola, nunca medio lote ni uno ya escrito. Las entradas sueltas de `add`
+    se juntan en un lote que se escribe cada `flush_interval` segundos. Con la cola llena, quien encola espera como
+    mucho `block_timeout` y después el lote se descarta (y se cuenta): el
+    historial nunca debe frenar la traducción.
+    """
+
+    def __init__(
+        self,
+        store: HistoryStore,
+        max_pending: int = DEFAULT_QUEUE_SIZE,
+        flush_interval: float = DEFAULT_FLUSH_INTERVAL,
+        block_timeout: float = DEFAULT_BLOCK_TIMEOUT,
+    ) -> None:
+        self.store = store
+        self.flush_interval = flush_interval
+        self.block_timeout = block_timeout
+        self._queue: "queue.Queue[List[HistoryRow] | None]" = queue.Queue(maxsize=max(1, max_pending))
+        self._buffer: List[HistoryRow] = []
+        self._stats = HistoryWriterStats()
+        # Lotes encolados y lotes ya resueltos (escritos o fallidos), para `flush`.
+        self._submitted = 0
+        self._done = 0
+        self._cond = threading.Condition()
+        self._closed = False
+        # `close` lo activa; el hilo termina al vaciar la cola aunque no le
+        # llegue el aviso (con la cola llena no se puede encolar).
+        self._stop = threading.Event()
+        self._listeners: List[Callable[[List[int]], None]] = []
+        self._thread = threading.Thread(target=self._run, name="history-writer", daemon=True)
+        self._thread.start()
+
+    def submit(self, rows: Sequence[HistoryRow]) -> bool:
+        """Encola `rows` para escribirlas juntas. False si se descartan."""
+
+        batch = list(rows)
+        if not batch:
+            return True
+        with self._cond:
+            if self._closed:
+                self._stats.dropped_entries += len(batch)
+                return False
+            self._submitted += 1
+        try:
+            self._queue.put(batch, timeout=self.block_timeout)
+        except queue.Full:
+            with self._cond:
+                self._done += 1
+                self._stats.dropped_entries += len(batch)
+                self._cond.notify_all()
+            logging.getLogger(__name__).warning(
+                "Cola del historial llena: se descartan %s entradas", len(batch)
+            )
+            return False
+        with self._cond:
+            self._stats.queued_batches += 1
+        return True
+
+    def add(self, original: str, translated: str, source_lang: str, target_lang: str) -> None:
+        """Acumula una entrada suelta; se escribe en el siguiente ciclo."""
+
+        with self._cond:
+            self._buffer.append((original, translated, source_lang, target_lang, _now()))
+            full = len(self._buffer) >= MAX_BUFFERED_ENTRIES
+        if full:
+            self.submit(self._take_buffer())
+
+    def _take_buffer(self) -> List[HistoryRow]:
+        with self._cond:
+            rows, self._buffer = self._buffer, []
+        return rows
+
+    def flush(self, timeout: float | None = None) -> bool:
+        """Espera a que se escriba todo lo encolado hasta ahora."""
+
+        self.submit(self._take_buffer())
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._cond:
+            target = self._submitted
+            while self._done < target:
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    return False
+                self._cond.wait(remaining)
+        return True
+
+    def close(self, timeout: float = 5.0) -> None:
+        """Escribe lo pendiente y para el hilo; vuelve en `timeout` segundos.
+
+        Si el disco no da abasto en ese tiempo, lo que siga en la cola se
+        pierde al salir (el hilo es daemon): no se retiene el cierre.
+        """
+
+        deadline = time.monotonic() + timeout
+        self.flush(timeout)
+        with self._cond:
+            if self._closed:
+                return
+            self._closed = True
+        self._stop.set()
+        try:
+            # Despierta al hilo si espera en la cola vacía.
+            self._queue.put_nowait(None)
+        except queue.Full:
+            # Está escribiendo: verá `_stop` al terminar con la cola.
+            pass
+        self._thread.join(max(0.0, deadline - time.monotonic()))
+
+    def stats(self) -> HistoryWriterStats:
+        with self._cond:
+            return HistoryWriterStats(**vars(self._stats))
+
+    def add_listener(self, callback: Callable[[List[int]], None]) -> None:
+        """`callback(ids)` tras cada escritura, desde el hilo del escritor."""
+
+        with self._cond:
+            self._listeners.append(callback)
+
+    def remove_listener(self, callback: Callable[[List[int]], None]) -> None:
+        with self._cond:
+            if callback in self._listeners:
+                self._listeners.remove(callback)
+
+    def _run(self) -> None:
+        while True:
+            try:
+                batch = self._queue.get(timeout=self.flush_interval)
+            except queue.Empty:
+                batch = None
+            if batch is not None:
+                self._write(batch, batches=1)
+            loose = self._take_buffer()
+            if loose:
+                self._write(loose, batches=0)
+            if self._stop.is_set() and self._queue.empty():
+                return
+
+    def _write(self, rows: List[HistoryRow], batches: int) -> None:
+        # Una transacción por lote: un cierre abrupto no deja medio lote ni
+        # se lleva lotes ya escritos junto con el que estaba en curso.
+        logger = logging.getLogger(__name__)
+        started = time.monotonic()
+        ids: List[int] = []
+        try:
+            ids = self.store.add_many(rows)
+        except Exception:
+            logger.exception("No se pudieron guardar %s entradas del historial", len(rows))
+            failed = True
+        else:
+            failed = False
+        with self._cond:
+            if failed:
+                self._stats.failed_entries += len(rows)
+            else:
+                self._stats.written_batches += batches
+                self._stats.written_entries += len(rows)
+                self._stats.transactions += 1
+                self._stats.last_commit_ms = (time.monotonic() - started) * 1000
+            self._done += batches
+            self._cond.notify_all()
+            listeners = list(self._listeners)
+        for callback in listeners if ids else ():
+            try:
+                callback(ids)
+            except Exception:
+                logger.exception("Error al notificar nuevas entradas del historial")
+
+
+_history_store: HistoryStore | None = None
+_history_writer: HistoryWriter | None = None
+_history_lock = threading.Lock()
+
+
+def _env_float(name: str, default: float) -> float:
+    try:
+        return float(os.getenv(name, str(default)))
+    except ValueError:
+        return default
+
+
+def get_history_store() -> HistoryStore:
+    """Historial compartido; migra el JSON antiguo la primera vez."""
+
+    global _history_store
+    with _history_lock:
+        if _history_store is None:
+            store = HistoryStore(get_history_db_path())
+            store.migrate_legacy(get_history_path())
+            _history_store = store
+        return _history_store
+
+
+def get_history_writer() -> HistoryWriter:
+    """Escritor compartido del historial.
+
+    SCREENSTRANSLATE_HISTORY_QUEUE (capturas pendientes como máximo) y
+    SCREENSTRANSLATE_HISTORY_FLUSH_MS (intervalo de escritura) lo ajustan.
+    """
+
+    global _history_writer
+    store = get_history_store()
+    with _history_lock:
+        if _history_writer is None:
+            _history_writer = HistoryWriter(
+                store,
+                max_pending=int(_env_float("SCREENSTRANSLATE_HISTORY_QUEUE", DEFAULT_QUEUE_SIZE)),
+                flush_interval=_env_float("SCREENSTRANSLATE_HISTORY_FLUSH_MS", DEFAULT_FLUSH_INTERVAL * 1000) / 1000,
+            )
+        return _history_writer
+
+
+def flush_history(timeout: float | None = None) -> bool:
+    """Espera a que el historial encolado quede escrito."""
+
+    with _history_lock:
+        writer = _history_writer
+    return writer.flush(timeout) if writer is not None else True
+
+
+def shutdown_history(timeout: float = 5.0) -> None:
+    """Escribe lo pendiente y cierra el escritor (al salir de la app)."""
+
+    global _history_writer
+    with _history_lock:
+        writer, _history_writer = _history_writer, None
+    if writer is not None:
+        writer.close(timeout)
+
+
 def load_history() -> List[Dict[str, Any]]:
-    path = get_history_path()
-    if not path.exists():
-        return []
+    """Todas las entradas, de la más antigua a la más reciente."""
+
+    flush_history(READ_FLUSH_TIMEOUT)
     try:
-        return json.loads(path.read_text(encoding="utf-8"))
-    except Exception:
+        return get_history_store().entries(newest_first=False)
+    except sqlite3.Error:
         # Si el historial estÃ¡ corrupto, lo ignoramos para no bloquear la app.
+        logging.getLogger(__name__).exception("No se pudo leer el historial")
         return []
 
 
-def save_history(entries: List[Dict[str, Any]]) -> None:
-    path = get_history_path()
-    path.write_text(json.dumps(entries, ensure_ascii=False, indent=2), encoding="utf-8")
+def search_history(query: str = "", **filters: Any) -> List[Dict[str, Any]]:
+    """`HistoryStore.search` sobre el historial compartido.
+
+    Espera como mucho `READ_FLUSH_TIMEOUT` a que se escriba lo pendiente:
+    se llama desde la interfaz, que no debe congelarse si el disco va lento.
+    """
+
+    flush_history(READ_FLUSH_TIMEOUT)
+    try:
+        return get_history_store().search(query, **filters)
+    except sqlite3.Error:
+        logging.getLogger(__name__).exception("No se pudo buscar en el historial")
+        return []
 
 
 def add_entry(
@@ -39,21 +638,20 @@ def add_entry(
     source_lang: str,
     target_lang: str,
 ) -> None:
-    entries = load_history()
-    entry = {
-        "id": len(entries) + 1,
-        "original": original,
-        "translated": translated,
-        "source_lang": source_lang,
-        "target_lang": target_lang,
-        "timestamp": datetime.now(timezone.utc).isoformat(),
-    }
-    entries.append(entry)
-    save_history(entries)
+    get_history_writer().add(original, translated, source_lang, target_lang)
 
 
-def clear_history() -> None:
-    path = get_history_path()
-    if path.exists():
-        path.unlink()
+def add_entries(pairs: Sequence[Tuple[str, str]], source_lang: str, target_lang: str) -> bool:
+    """Encola las parejas (original, traducido) de una captura como un lote."""
+
+    timestamp = _now()
+    return get_history_writer().submit(
+        [(original, translated, source_lang, target_lang, timestamp) for original, translated in pairs]
+    )
 
+
+def clear_history() -> None:
+    # Lo pendiente se escribe antes, para que no reaparezca tras borrar
+    # (con el mismo límite que las lecturas: se llama desde la interfaz).
+    flush_history(READ_FLUSH_TIMEOUT)
+    get_history_store().clear()
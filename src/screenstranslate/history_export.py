@@ -0,0 +1,206 @@
+"""Exportación del historial a CSV, JSON Lines o TMX.
+
+Se lee directamente del `HistoryStore`, por bloques, y cada bloque se
+escribe en cuanto llega: la memoria no depende del tamaño del historial.
+El fichero se escribe primero como `<destino>.part` y solo se renombra al
+terminar, así que una exportación cancelada o fallida no deja un fichero
+a medias con el nombre final.
+
+TMX (Translation Memory eXchange 1.4) permite reutilizar el historial
+como memoria de traducción en otras herramientas. TMX exige etiquetas
+BCP-47 en `xml:lang`: las entradas con idioma de origen "auto" (o un
+código que no se pueda convertir) no se exportan a TMX, porque otra
+herramienta las tomaría por texto en un idioma concreto que no sabemos.
+"""
+
+from __future__ import annotations
+
+import csv
+import json
+import logging
+import os
+import re
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterable, List, TextIO
+from xml.sax.saxutils import escape, quoteattr
+
+from . import __version__
+from .history import HistoryStore
+from .jobs import CancellationToken
+
+
+FORMAT_CSV = "csv"
+FORMAT_JSONL = "jsonl"
+FORMAT_TMX = "tmx"
+EXPORT_FORMATS = (FORMAT_CSV, FORMAT_JSONL, FORMAT_TMX)
+
+# Entradas leídas del historial por consulta.
+EXPORT_CHUNK_SIZE = 1000
+
+CSV_HEADER = ["fecha_hora", "origen", "destino", "original", "traducido"]
+
+# Caracteres de control que XML 1.0 no admite ni escapados.
+_XML_INVALID = re.compile("[\x00-\x08\x0b\x0c\x0e-\x1f\ufffe\uffff]")
+
+ProgressCallback = Callable[[int, int], None]
+
+# Códigos de la aplicación cuya etiqueta BCP-47 no es el propio código. El
+# chino se reconoce como simplificado (Tesseract `chi_sim`).
+_BCP47_TAGS = {"zh": "zh-Hans"}
+
+# Etiqueta BCP-47 simplificada: idioma de 2-3 letras y subetiquetas de 2-8.
+_BCP47_RE = re.compile(r"[a-z]{2,3}(-[a-z0-9]{2,8})*")
+
+
+def format_for_path(path: str | Path) -> str:
+    """Formato según la extensión (CSV si no se reconoce)."""
+
+    suffix = Path(path).suffix.lower().lstrip(".")
+    if suffix in ("json", "ndjson"):
+        return FORMAT_JSONL
+    return suffix if suffix in EXPORT_FORMATS else FORMAT_CSV
+
+
+# Cada escritor avisa con `on_chunk(leídas)` tras cada bloque y devuelve
+# cuántas entradas escribió.
+
+
+def _write_csv(stream: TextIO, chunks: Iterable[List[Dict[str, Any]]], on_chunk: Callable[[int], None]) -> int:
+    writer = csv.writer(stream)
+    writer.writerow(CSV_HEADER)
+    written = 0
+    for chunk in chunks:
+        writer.writerows(
+            [entry["timestamp"], entry["source_lang"], entry["target_lang"], entry["original"], entry["translated"]]
+            for entry in chunk
+        )
+        written += len(chunk)
+        on_chunk(len(chunk))
+    return written
+
+
+def _write_jsonl(stream: TextIO, chunks: Iterable[List[Dict[str, Any]]], on_chunk: Callable[[int], None]) -> int:
+    written = 0
+    for chunk in chunks:
+        stream.writelines(json.dumps(entry, ensure_ascii=False) + "\n" for entry in chunk)
+        written += len(chunk)
+        on_chunk(len(chunk))
+    return written
+
+
+def _tmx_text(text: str) -> str:
+    return escape(_XML_INVALID.sub("", text))
+
+
+def _tmx_date(timestamp: str) -> str | None:
+    # TMX usa fechas UTC en formato básico ISO 8601: 20250101T120000Z.
+    try:
+        return datetime.fromisoformat(timestamp).strftime("%Y%m%dT%H%M%SZ")
+    except ValueError:
+        return None
+
+
+def _bcp47(code: str) -> str | None:
+    """Etiqueta BCP-47 de un código de idioma, o None si es "auto" o no válido."""
+
+    code = code.strip().replace("_", "-").lower()
+    if code == "auto" or not _BCP47_RE.fullmatch(code):
+        return None
+    if code in _BCP47_TAGS:
+        return _BCP47_TAGS[code]
+    # Forma canónica: escritura con mayúscula inicial (Hans), región en mayúsculas (GB).
+    language, *subtags = code.split("-")
+    subtags = [s.title() if len(s) == 4 else s.upper() if len(s) == 2 else s for s in subtags]
+    return "-".join([language, *subtags])
+
+
+def _write_tmx(stream: TextIO, chunks: Iterable[List[Dict[str, Any]]], on_chunk: Callable[[int], None]) -> int:
+    stream.write('<?xml version="1.0" encoding="UTF-8"?>\n<tmx version="1.4">\n')
+    stream.write(
+        f'  <header creationtool="ScreensTranslate" creationtoolversion={quoteattr(__version__)}'
+        ' segtype="paragraph" o-tmf="ScreensTranslate" adminlang="en" srclang="*all*" datatype="plaintext"/>\n'
+    )
+    stream.write("  <body>\n")
+    written = skipped = 0
+    for chunk in chunks:
+        parts: List[str] = []
+        for entry in chunk:
+            source, target = _bcp47(entry["source_lang"]), _bcp47(entry["target_lang"])
+            if source is None or target is None:
+                skipped += 1
+                continue
+            date = _tmx_date(entry["timestamp"])
+            parts.append(f'    <tu creationdate="{date}">\n' if date else "    <tu>\n")
+            for lang, text in ((source, entry["original"]), (target, entry["translated"])):
+                parts.append(f"      <tuv xml:lang={quoteattr(lang)}><seg>{_tmx_text(text)}</seg></tuv>\n")
+            parts.append("    </tu>\n")
+            written += 1
+        stream.write("".join(parts))
+        on_chunk(len(chunk))
+    stream.write("  </body>\n</tmx>\n")
+    if skipped:
+        logging.getLogger(__name__).info("TMX: %s entradas sin idioma conocido no se exportan", skipped)
+    return written
+
+
+_WRITERS = {
+    FORMAT_CSV: _write_csv,
+    FORMAT_JSONL: _write_jsonl,
+    FORMAT_TMX: _write_tmx,
+}
+
+
+def export_history(
+    store: HistoryStore,
+    path: str | Path,
+    fmt: str,
+    query: str = "",
+    filters: Dict[str, Any] | None = None,
+    newest_first: bool = True,
+    progress: ProgressCallback | None = None,
+    cancel_token: CancellationToken | None = None,
+    chunk_size: int = EXPORT_CHUNK_SIZE,
+) -> int:
+    """Exporta las entradas de una búsqueda del historial a `path`.
+
+    `progress(leídas, total)` se llama tras cada bloque. Si se cancela
+    `cancel_token` se borra el fichero parcial y se lanza `JobCancelled`.
+    Devuelve el número de entradas exportadas (en TMX pueden ser menos que
+    las leídas: ver el docstring del módulo).
+    """
+
+    if fmt not in _WRITERS:
+        raise ValueError(f"Formato de exportación no soportado: {fmt}")
+    filters = dict(filters or {})
+    total = store.count_matches(query, **filters)
+    done = 0
+
+    def _on_chunk(count: int) -> None:
+        nonlocal done
+        done += count
+        if progress is not None:
+            progress(done, max(total, done))
+
+    def _chunks() -> Iterable[List[Dict[str, Any]]]:
+        for chunk in store.iter_search(query, chunk_size=chunk_size, newest_first=newest_first, **filters):
+            if cancel_token is not None:
+                cancel_token.raise_if_cancelled()
+            yield chunk
+
+    target = Path(path)
+    partial = target.with_name(target.name + ".part")
+    try:
+        # CSV necesita newline="" para que el módulo csv controle los saltos.
+        with open(partial, "w", encoding="utf-8", newline="") as stream:
+            exported = _WRITERS[fmt](stream, _chunks(), _on_chunk)
+        if cancel_token is not None:
+            cancel_token.raise_if_cancelled()
+        os.replace(partial, target)
+    except BaseException:
+        try:
+            partial.unlink()
+        except OSError:
+            pass
+        raise
+    return exported
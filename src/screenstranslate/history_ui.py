@@ -1,56 +1,299 @@
 ﻿from __future__ import annotations
 
-from typing import List
+import logging
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from typing import Any, Dict, List
 
-from PySide6.QtCore import Qt
-from PySide6.QtGui import QGuiApplication
+from PySide6.QtCore import QAbstractTableModel, QModelIndex, QObject, QRunnable, Qt, QThreadPool, QTimer, Signal
+from PySide6.QtGui import QCloseEvent, QGuiApplication, QShowEvent
 from PySide6.QtWidgets import (
+    QAbstractItemView,
+    QComboBox,
     QFileDialog,
     QHBoxLayout,
     QHeaderView,
+    QLineEdit,
     QMainWindow,
     QMessageBox,
+    QProgressDialog,
     QPushButton,
-    QTableWidget,
-    QTableWidgetItem,
+    QTableView,
     QVBoxLayout,
     QWidget,
 )
 
-from .history import clear_history, load_history
+from .history import (
+    MIN_INDEXED_TERM,
+    clear_history,
+    flush_history,
+    get_history_store,
+    get_history_writer,
+    search_history,
+)
+from .history_export import EXPORT_FORMATS, export_history, format_for_path
+from .jobs import CancellationToken, JobCancelled
+
+
+# (cabecera, clave de la entrada) de cada columna.
+COLUMNS = [
+    ("Fecha/Hora", "timestamp"),
+    ("Origen", "source_lang"),
+    ("Destino", "target_lang"),
+    ("Original", "original"),
+    ("Traducido", "translated"),
+]
+# Filas que se piden al historial cada vez que la vista llega al final.
+PAGE_SIZE = 200
+
+# Filtros del diálogo de exportación, en el orden de EXPORT_FORMATS.
+EXPORT_FILTERS = ["CSV (*.csv)", "JSON Lines (*.jsonl)", "TMX (*.tmx)"]
+# Espera tras la última tecla antes de buscar.
+SEARCH_DEBOUNCE_MS = 150
+# Las entradas que llegan en ráfaga se añaden a la tabla de una vez.
+REFRESH_DEBOUNCE_MS = 200
+
+# (etiqueta, antigüedad máxima) del filtro de fechas.
+DATE_RANGES = [
+    ("Cualquier fecha", None),
+    ("Últimas 24 horas", timedelta(days=1)),
+    ("Últimos 7 días", timedelta(days=7)),
+    ("Últimos 30 días", timedelta(days=30)),
+    ("Último año", timedelta(days=365)),
+]
+
+
+class _HistoryNotifier(QObject):
+    # Se emite desde el hilo del escritor; Qt lo entrega en el de la interfaz.
+    entriesAdded = Signal(object)
+
+
+class HistoryExportSignals(QObject):
+    progress = Signal(int, int)
+    finished = Signal(int)
+    failed = Signal(str)
+    cancelled = Signal()
+
+
+class HistoryExportTask(QRunnable):
+    """Exporta una búsqueda del historial fuera del hilo de la interfaz."""
+
+    def __init__(
+        self,
+        path: str,
+        fmt: str,
+        query: str,
+        filters: Dict[str, Any],
+        newest_first: bool,
+        signals: HistoryExportSignals,
+    ) -> None:
+        super().__init__()
+        self.path = path
+        self.fmt = fmt
+        self.query = query
+        self.filters = filters
+        self.newest_first = newest_first
+        self.signals = signals
+        self.token = CancellationToken("export")
+        self._percent = -1
+
+    def _on_progress(self, done: int, total: int) -> None:
+        # Una señal por cada 1 % como mucho: no hace falta inundar la cola
+        # de eventos de la interfaz con un aviso por bloque.
+        percent = done * 100 // total if total else 100
+        if percent != self._percent:
+            self._percent = percent
+            self.signals.progress.emit(done, total)
+
+    def run(self) -> None:
+        try:
+            flush_history()
+            count = export_history(
+                get_history_store(),
+                self.path,
+                self.fmt,
+                query=self.query,
+                filters=self.filters,
+                newest_first=self.newest_first,
+                progress=self._on_progress,
+                cancel_token=self.token,
+            )
+        except JobCancelled:
+            self.signals.cancelled.emit()
+        except Exception as exc:
+            logging.getLogger(__name__).exception("No se pudo exportar el historial")
+            self.signals.failed.emit(str(exc))
+        else:
+            self.signals.finished.emit(count)
+
+
+class HistoryTableModel(QAbstractTableModel):
+    """Resultados de una búsqueda en el historial, cargados por páginas.
+
+    Solo se piden al historial las filas que la vista va necesitando
+    (`canFetchMore`/`fetchMore`), paginando por id en SQLite. Las entradas
+    nuevas se añaden con `add_entries` sin recargar lo ya cargado.
+    """
+
+    def __init__(self, parent: QObject | None = None) -> None:
+        super().__init__(parent)
+        self._rows: List[Dict[str, Any]] = []
+        self._query = ""
+        self._filters: Dict[str, Any] = {}
+        self._newest_first = True
+        self._exhausted = True
+
+    def rowCount(self, parent: QModelIndex = QModelIndex()) -> int:
+        return 0 if parent.isValid() else len(self._rows)
+
+    def columnCount(self, parent: QModelIndex = QModelIndex()) -> int:
+        return 0 if parent.isValid() else len(COLUMNS)
+
+    def data(self, index: QModelIndex, role: int = Qt.DisplayRole) -> Any:
+        if not index.isValid() or role != Qt.DisplayRole:
+            return None
+        return str(self._rows[index.row()].get(COLUMNS[index.column()][1], ""))
+
+    def headerData(self, section: int, orientation: Qt.Orientation, role: int = Qt.DisplayRole) -> Any:
+        if orientation == Qt.Horizontal and role == Qt.DisplayRole:
+            return COLUMNS[section][0]
+        return None
+
+    def entry(self, row: int) -> Dict[str, Any] | None:
+        return self._rows[row] if 0 <= row < len(self._rows) else None
+
+    @property
+    def newest_first(self) -> bool:
+        return self._newest_first
+
+    def set_search(self, query: str, filters: Dict[str, Any], newest_first: bool = True) -> None:
+        self.beginResetModel()
+        self._query = query
+        self._filters = dict(filters)
+        self._newest_first = newest_first
+        self._rows = self._search(limit=PAGE_SIZE)
+        self._exhausted = len(self._rows) < PAGE_SIZE
+        self.endResetModel()
+
+    def canFetchMore(self, parent: QModelIndex = QModelIndex()) -> bool:
+        return not parent.isValid() and not self._exhausted
+
+    def fetchMore(self, parent: QModelIndex = QModelIndex()) -> None:
+        if parent.isValid() or self._exhausted:
+            return
+        page = self._search_after_last(PAGE_SIZE)
+        self._exhausted = len(page) < PAGE_SIZE
+        self._append(page)
+
+    def sort(self, column: int, order: Qt.SortOrder = Qt.AscendingOrder) -> None:
+        # El orden lo da SQLite; solo se ordena por fecha (por id).
+        if column == 0:
+            self.set_search(self._query, self._filters, newest_first=order == Qt.DescendingOrder)
+
+    def add_entries(self, ids: List[int]) -> None:
+        """Añade las entradas recién escritas que cumplan la búsqueda actual."""
+
+        if not ids:
+            return
+        if self._newest_first:
+            newest = self._rows[0]["id"] if self._rows else 0
+            rows = self._search(limit=len(ids), after_id=max(newest, min(ids) - 1), newest_first=True)
+            if rows:
+                self.beginInsertRows(QModelIndex(), 0, len(rows) - 1)
+                self._rows[:0] = rows
+                self.endInsertRows()
+        elif self._exhausted:
+            # Si quedan páginas, las nuevas llegarán al paginar.
+            self._append(self._search_after_last(len(ids)))
+
+    def _search(self, **kwargs: Any) -> List[Dict[str, Any]]:
+        kwargs.setdefault("newest_first", self._newest_first)
+        return search_history(self._query, **self._filters, **kwargs)
+
+    def _search_after_last(self, limit: int) -> List[Dict[str, Any]]:
+        if not self._rows:
+            return self._search(limit=limit)
+        last = self._rows[-1]["id"]
+        if self._newest_first:
+            return self._search(limit=limit, before_id=last)
+        return self._search(limit=limit, after_id=last)
+
+    def _append(self, rows: List[Dict[str, Any]]) -> None:
+        if not rows:
+            return
+        start = len(self._rows)
+        self.beginInsertRows(QModelIndex(), start, start + len(rows) - 1)
+        self._rows.extend(rows)
+        self.endInsertRows()
 
 
 class HistoryWindow(QMainWindow):
     def __init__(self, parent: QWidget | None = None) -> None:  # type: ignore[name-defined]
         super().__init__(parent)
         self.setWindowTitle("Historial de traducciones")
+        self._notifier = _HistoryNotifier(self)
+        # Token de la exportación en curso (la tarea la borra el pool).
+        self._export_token: CancellationToken | None = None
+        self._listening = False
+        self._pending_ids: List[int] = []
         self._build_ui()
+        self._notifier.entriesAdded.connect(self._on_entries_added)
         self._load_entries()
 
     def _build_ui(self) -> None:
         central = QWidget(self)
         layout = QVBoxLayout(central)
 
-        self.table = QTableWidget(0, 5, central)
-        self.table.setHorizontalHeaderLabels([
-            "Fecha/Hora",
-            "Origen",
-            "Destino",
-            "Original",
-            "Traducido",
-        ])
+        search_bar = QHBoxLayout()
+        self.search_edit = QLineEdit(central)
+        self.search_edit.setPlaceholderText("Buscar en el original o en la traducción...")
+        self.search_edit.setClearButtonEnabled(True)
+        self.pair_combo = QComboBox(central)
+        self.date_combo = QComboBox(central)
+        for label, age in DATE_RANGES:
+            self.date_combo.addItem(label, age)
+
+        self._search_timer = QTimer(self)
+        self._search_timer.setSingleShot(True)
+        self._search_timer.setInterval(SEARCH_DEBOUNCE_MS)
+        self._search_timer.timeout.connect(self._load_entries)
+        self._refresh_timer = QTimer(self)
+        self._refresh_timer.setSingleShot(True)
+        self._refresh_timer.setInterval(REFRESH_DEBOUNCE_MS)
+        self._refresh_timer.timeout.connect(self._add_pending_entries)
+        self.search_edit.textChanged.connect(self._on_search_text_changed)
+        # Los términos cortos no usan el índice: se buscan al pulsar Intro.
+        self.search_edit.returnPressed.connect(self._load_entries)
+        self.pair_combo.currentIndexChanged.connect(self._load_entries)
+        self.date_combo.currentIndexChanged.connect(self._load_entries)
+
+        search_bar.addWidget(self.search_edit, 1)
+        search_bar.addWidget(self.pair_combo)
+        search_bar.addWidget(self.date_combo)
+
+        self.model = HistoryTableModel(self)
+        self.table = QTableView(central)
+        self.table.setModel(self.model)
+        # Todas las filas con la misma altura: la vista no tiene que medirlas.
+        self.table.verticalHeader().setSectionResizeMode(QHeaderView.Fixed)
+        self.table.verticalHeader().hide()
+        self.table.setEditTriggers(QAbstractItemView.NoEditTriggers)
         header = self.table.horizontalHeader()
         header.setSectionResizeMode(0, QHeaderView.ResizeToContents)
         header.setSectionResizeMode(1, QHeaderView.ResizeToContents)
         header.setSectionResizeMode(2, QHeaderView.ResizeToContents)
         header.setSectionResizeMode(3, QHeaderView.Stretch)
         header.setSectionResizeMode(4, QHeaderView.Stretch)
-        self.table.setSelectionBehavior(QTableWidget.SelectRows)
-        self.table.setSelectionMode(QTableWidget.SingleSelection)
+        header.setSectionsClickable(True)
+        header.setSortIndicatorShown(True)
+        header.setSortIndicator(0, Qt.DescendingOrder)
+        header.sectionClicked.connect(self._on_header_clicked)
+        self.table.setSelectionBehavior(QAbstractItemView.SelectRows)
+        self.table.setSelectionMode(QAbstractItemView.SingleSelection)
 
         btn_bar = QHBoxLayout()
         self.copy_btn = QPushButton("Copiar traducido", self)
-        self.export_btn = QPushButton("Exportar CSV", self)
+        self.export_btn = QPushButton("Exportar historial...", self)
         self.clear_btn = QPushButton("Borrar historial", self)
 
         self.copy_btn.clicked.connect(self._on_copy_clicked)
@@ -62,47 +305,93 @@ class HistoryWindow(QMainWindow):
         btn_bar.addWidget(self.clear_btn)
         btn_bar.addStretch(1)
 
+        layout.addLayout(search_bar)
         layout.addWidget(self.table)
         layout.addLayout(btn_bar)
 
         self.setCentralWidget(central)
         self.resize(900, 400)
 
-    def _load_entries(self) -> None:
-        entries = load_history()
-        entries_sorted: List[dict] = sorted(
-            entries,
-            key=lambda e: e.get("timestamp") or "",
-            reverse=True,
-        )
+    def _reload_pairs(self) -> None:
+        current = self.pair_combo.currentText()
+        self.pair_combo.blockSignals(True)
+        self.pair_combo.clear()
+        self.pair_combo.addItem("Todos los idiomas", None)
+        for src, tgt in get_history_store().language_pairs():
+            self.pair_combo.addItem(f"{src} → {tgt}", (src, tgt))
+        index = self.pair_combo.findText(current)
+        self.pair_combo.setCurrentIndex(max(0, index))
+        self.pair_combo.blockSignals(False)
 
-        self.table.setRowCount(len(entries_sorted))
-        for row_idx, entry in enumerate(entries_sorted):
-            dt = entry.get("timestamp", "")
-            src = entry.get("source_lang", "")
-            tgt = entry.get("target_lang", "")
-            original = entry.get("original", "")
-            translated = entry.get("translated", "")
-
-            self.table.setItem(row_idx, 0, QTableWidgetItem(dt))
-            self.table.setItem(row_idx, 1, QTableWidgetItem(src))
-            self.table.setItem(row_idx, 2, QTableWidgetItem(tgt))
-            self.table.setItem(row_idx, 3, QTableWidgetItem(original))
-            self.table.setItem(row_idx, 4, QTableWidgetItem(translated))
-
-        if entries_sorted:
+    def _on_search_text_changed(self, text: str) -> None:
+        terms = text.split()
+        if not terms or all(len(term) >= MIN_INDEXED_TERM for term in terms):
+            self._search_timer.start()
+
+    def _search_filters(self) -> Dict[str, Any]:
+        filters: Dict[str, Any] = {}
+        pair = self.pair_combo.currentData()
+        if pair:
+            filters["source_lang"], filters["target_lang"] = pair
+        age = self.date_combo.currentData()
+        if age is not None:
+            filters["since"] = (datetime.now(timezone.utc) - age).isoformat()
+        return filters
+
+    def _load_entries(self) -> None:
+        self._search_timer.stop()
+        if self.pair_combo.count() == 0:
+            self._reload_pairs()
+        self.model.set_search(self.search_edit.text(), self._search_filters(), self.model.newest_first)
+        if self.model.rowCount():
             self.table.selectRow(0)
 
+    def _on_header_clicked(self, section: int) -> None:
+        newest_first = not self.model.newest_first if section == 0 else self.model.newest_first
+        self.table.horizontalHeader().setSortIndicator(0, Qt.DescendingOrder if newest_first else Qt.AscendingOrder)
+        if section == 0:
+            self.model.sort(0, Qt.DescendingOrder if newest_first else Qt.AscendingOrder)
+            if self.model.rowCount():
+                self.table.selectRow(0)
+
+    def _on_entries_added(self, ids: List[int]) -> None:
+        self._pending_ids.extend(ids)
+        # No se reinicia si ya está en marcha: con escrituras continuas la
+        # tabla se sigue actualizando cada REFRESH_DEBOUNCE_MS.
+        if not self._refresh_timer.isActive():
+            self._refresh_timer.start()
+
+    def _add_pending_entries(self) -> None:
+        ids, self._pending_ids = self._pending_ids, []
+        self.model.add_entries(ids)
+
+    def showEvent(self, event: QShowEvent) -> None:
+        # showEvent también llega al restaurar la ventana minimizada.
+        if not self._listening:
+            get_history_writer().add_listener(self._notifier.entriesAdded.emit)
+            self._listening = True
+        super().showEvent(event)
+
+    def closeEvent(self, event: QCloseEvent) -> None:
+        if self._listening:
+            get_history_writer().remove_listener(self._notifier.entriesAdded.emit)
+            self._listening = False
+        self._refresh_timer.stop()
+        self._pending_ids = []
+        if self._export_token is not None:
+            self._export_token.cancel()
+        super().closeEvent(event)
+
     def _current_row_data(self) -> dict | None:
-        row = self.table.currentRow()
-        if row < 0:
+        entry = self.model.entry(self.table.currentIndex().row())
+        if entry is None:
             return None
         return {
-            "datetime": self.table.item(row, 0).text() if self.table.item(row, 0) else "",
-            "source": self.table.item(row, 1).text() if self.table.item(row, 1) else "",
-            "target": self.table.item(row, 2).text() if self.table.item(row, 2) else "",
-            "original": self.table.item(row, 3).text() if self.table.item(row, 3) else "",
-            "translated": self.table.item(row, 4).text() if self.table.item(row, 4) else "",
+            "datetime": entry.get("timestamp", ""),
+            "source": entry.get("source_lang", ""),
+            "target": entry.get("target_lang", ""),
+            "original": entry.get("original", ""),
+            "translated": entry.get("translated", ""),
         }
 
     def _on_copy_clicked(self) -> None:
@@ -116,33 +405,58 @@ class HistoryWindow(QMainWindow):
         self.statusBar().showMessage("Texto traducido copiado al portapapeles", 3000)
 
     def _on_export_clicked(self) -> None:
-        path, _ = QFileDialog.getSaveFileName(
+        if self._export_token is not None:
+            return
+        path, selected_filter = QFileDialog.getSaveFileName(
             self,
-            "Exportar historial a CSV",
+            "Exportar historial",
             "historial_traducciones.csv",
-            "CSV (*.csv)",
+            ";;".join(EXPORT_FILTERS),
         )
         if not path:
             return
+        fmt = format_for_path(path)
+        if not Path(path).suffix and selected_filter in EXPORT_FILTERS:
+            fmt = EXPORT_FORMATS[EXPORT_FILTERS.index(selected_filter)]
+            path = f"{path}.{fmt}"
 
-        rows = self.table.rowCount()
-        import csv
+        # Se exporta la búsqueda actual completa (no solo las filas cargadas),
+        # leyendo del historial por bloques en un hilo aparte.
+        signals = HistoryExportSignals(self)
+        task = HistoryExportTask(
+            path, fmt, self.search_edit.text(), self._search_filters(), self.model.newest_first, signals
+        )
+        dialog = QProgressDialog("Exportando historial...", "Cancelar", 0, 0, self)
+        dialog.setWindowTitle("Exportar historial")
+        dialog.setWindowModality(Qt.WindowModal)
+        dialog.setMinimumDuration(300)
+        token = task.token
+        dialog.canceled.connect(token.cancel)
 
-        try:
-            with open(path, "w", newline="", encoding="utf-8") as f:
-                writer = csv.writer(f)
-                writer.writerow(["fecha_hora", "origen", "destino", "original", "traducido"])
-                for row in range(rows):
-                    row_data = [
-                        self.table.item(row, col).text() if self.table.item(row, col) else ""
-                        for col in range(5)
-                    ]
-                    writer.writerow(row_data)
-        except OSError as exc:
-            QMessageBox.critical(self, "Error", f"No se pudo exportar el CSV: {exc}")
-            return
+        def _on_progress(done: int, total: int) -> None:
+            # QProgressDialog usa int de 32 bits: se muestra en miles si hace falta.
+            scale = 1000 if total > 2**31 - 1 else 1
+            dialog.setMaximum(total // scale)
+            dialog.setValue(done // scale)
+            dialog.setLabelText(f"Exportando historial... {done:,} / {total:,}")
+
+        def _on_done(message: str | None, error: str | None = None) -> None:
+            self._export_token = None
+            # close() emite `canceled`: se desconecta antes.
+            dialog.canceled.disconnect(token.cancel)
+            dialog.close()
+            signals.deleteLater()
+            if error is not None:
+                QMessageBox.critical(self, "Error", f"No se pudo exportar el historial: {error}")
+            elif message:
+                self.statusBar().showMessage(message, 4000)
 
-        self.statusBar().showMessage("Historial exportado a CSV", 4000)
+        signals.progress.connect(_on_progress)
+        signals.finished.connect(lambda count: _on_done(f"Historial exportado: {count} entradas ({fmt.upper()})"))
+        signals.cancelled.connect(lambda: _on_done("Exportación cancelada"))
+        signals.failed.connect(lambda error: _on_done(None, error))
+        self._export_token = token
+        QThreadPool.globalInstance().start(task)
 
     def _on_clear_clicked(self) -> None:
         if QMessageBox.question(
@@ -155,6 +469,7 @@ class HistoryWindow(QMainWindow):
             return
 
         clear_history()
-        self.table.setRowCount(0)
+        self._reload_pairs()
+        self._load_entries()
         self.statusBar().showMessage("Historial borrado", 3000)
 
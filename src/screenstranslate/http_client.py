@@ -0,0 +1,517 @@
+"""Cliente HTTP compartido por los proveedores de traducción.
+
+Antes cada traducción hacía un `requests.post` suelto y pagaba DNS, TCP y
+TLS en cada captura. `HttpClient` mantiene una `requests.Session` de larga
+duración con un pool de conexiones keep-alive y añade:
+
+- Reintentos con backoff exponencial con jitter ante 429/5xx y errores de
+  conexión, respetando `Retry-After`.
+- Un circuit breaker por endpoint: tras varios fallos seguidos se deja de
+  llamar durante un tiempo y se falla al instante.
+- Métricas de reutilización de conexiones (`HttpMetrics`).
+- Cancelación con `CancellationToken`: la espera se abandona en cuanto se
+  cancela el trabajo, el timeout se recorta al plazo restante y la
+  petición abandonada se corta (se cierra su socket) para no ocupar un
+  hilo hasta el timeout.
+- Opcionalmente, un `RateLimiter` que da turno a cada intento y aprende
+  de los 429. Con él, un 429 no gasta reintentos: la petición vuelve a la
+  cola hasta que el plazo del trabajo lo permita.
+"""
+
+from __future__ import annotations
+
+import logging
+import os
+import random
+import socket
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from typing import Any, Dict, Tuple
+from urllib.parse import urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.connection import HTTPConnection, HTTPSConnection
+from urllib3.connectionpool import HTTPConnectionPool, HTTPSConnectionPool
+
+from .jobs import CancellationToken
+from .rate_limit import PRIORITY_INTERACTIVE, RateLimiter
+
+
+RETRY_STATUSES = frozenset({429, 500, 502, 503, 504})
+# Esperas por 429 que no cuentan como reintento cuando hay limitador.
+MAX_THROTTLE_WAITS = 8
+
+
+class CircuitOpenError(requests.RequestException):
+    """El endpoint está en cuarentena tras demasiados fallos seguidos."""
+
+
+def _env_int(name: str, default: int) -> int:
+    try:
+        return int(os.getenv(name, str(default)))
+    except ValueError:
+        return default
+
+
+def _env_float(name: str, default: float) -> float:
+    try:
+        return float(os.getenv(name, str(default)))
+    except ValueError:
+        return default
+
+
+@dataclass(frozen=True)
+class HttpClientConfig:
+    pool_connections: int = 4
+    pool_maxsize: int = 8
+    # Hilos para las peticiones cancelables; independiente del pool de
+    # conexiones para que las abandonadas no acaparen los turnos.
+    max_workers: int = 16
+    max_retries: int = 3
+    backoff_base: float = 0.5
+    backoff_max: float = 8.0
+    breaker_threshold: int = 5
+    breaker_cooldown: float = 30.0
+
+    @classmethod
+    def from_env(cls) -> "HttpClientConfig":
+        """Lee SCREENSTRANSLATE_HTTP_* (tamaños de pool, reintentos, breaker)."""
+
+        defaults = cls()
+        return cls(
+            pool_connections=_env_int("SCREENSTRANSLATE_HTTP_POOL_CONNECTIONS", defaults.pool_connections),
+            pool_maxsize=_env_int("SCREENSTRANSLATE_HTTP_POOL_MAXSIZE", defaults.pool_maxsize),
+            max_workers=_env_int("SCREENSTRANSLATE_HTTP_WORKERS", defaults.max_workers),
+            max_retries=_env_int("SCREENSTRANSLATE_HTTP_MAX_RETRIES", defaults.max_retries),
+            backoff_base=_env_float("SCREENSTRANSLATE_HTTP_BACKOFF_BASE", defaults.backoff_base),
+            backoff_max=_env_float("SCREENSTRANSLATE_HTTP_BACKOFF_MAX", defaults.backoff_max),
+            breaker_threshold=_env_int("SCREENSTRANSLATE_HTTP_BREAKER_THRESHOLD", defaults.breaker_threshold),
+            breaker_cooldown=_env_float("SCREENSTRANSLATE_HTTP_BREAKER_COOLDOWN", defaults.breaker_cooldown),
+        )
+
+
+@dataclass
+class HttpMetrics:
+    requests: int = 0
+    new_connections: int = 0
+    retries: int = 0
+    breaker_rejections: int = 0
+    # Peticiones cancelables esperando hilo, en curso y cortadas al cancelar.
+    queued_requests: int = 0
+    running_requests: int = 0
+    aborted_requests: int = 0
+
+    @property
+    def reused_connections(self) -> int:
+        return max(0, self.requests - self.new_connections)
+
+    @property
+    def reuse_ratio(self) -> float:
+        return self.reused_connections / self.requests if self.requests else 0.0
+
+
+class CircuitBreaker:
+    """Breaker clásico cerrado → abierto → semiabierto.
+
+    Con `threshold` fallos seguidos se abre durante `cooldown` segundos;
+    después deja pasar una única petición de prueba que decide si vuelve a
+    cerrarse o a abrirse.
+    """
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(self, threshold: int, cooldown: float) -> None:
+        self.threshold = max(1, threshold)
+        self.cooldown = cooldown
+        self.state = self.CLOSED
+        self._failures = 0
+        self._opened_at = 0.0
+        self._lock = threading.Lock()
+
+    def allow(self) -> bool:
+        with self._lock:
+            if self.state == self.CLOSED:
+                return True
+            if self.state == self.OPEN and time.monotonic() - self._opened_at >= self.cooldown:
+                self.state = self.HALF_OPEN
+                return True
+            # Abierto, o semiabierto con la petición de prueba en vuelo.
+            return False
+
+    def record_success(self) -> None:
+        with self._lock:
+            self.state = self.CLOSED
+            self._failures = 0
+
+    def release_probe(self) -> None:
+        """Devuelve el turno de prueba si se abandonó sin resultado."""
+
+        with self._lock:
+            if self.state == self.HALF_OPEN:
+                self.state = self.OPEN
+                self._opened_at = time.monotonic() - self.cooldown
+
+    def record_failure(self) -> None:
+        with self._lock:
+            self._failures += 1
+            if self.state == self.HALF_OPEN or self._failures >= self.threshold:
+                self.state = self.OPEN
+                self._opened_at = time.monotonic()
+
+
+def _retry_after_seconds(response: requests.Response) -> float | None:
+    value = response.headers.get("Retry-After")
+    if not value:
+        return None
+    value = value.strip()
+    if value.isdigit():
+        return float(value)
+    try:
+        when = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    if when.tzinfo is None:
+        when = when.replace(tzinfo=timezone.utc)
+    return max(0.0, (when - datetime.now(timezone.utc)).total_seconds())
+
+
+def _endpoint_key(url: str) -> str:
+    parts = urlsplit(url)
+    return f"{parts.scheme}://{parts.netloc}{parts.path}"
+
+
+class _RequestHandle:
+    """Permite cortar desde otro hilo la conexión de una petición en curso."""
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._conn: HTTPConnection | None = None
+        self.aborted = False
+
+    def attach(self, conn: HTTPConnection) -> None:
+        with self._lock:
+            self._conn = conn
+        self.check()
+
+    def check(self) -> None:
+        if self.aborted:
+            raise ConnectionAbortedError("Petición HTTP abandonada")
+
+    def abort(self) -> None:
+        with self._lock:
+            self.aborted = True
+            conn = self._conn
+        sock = conn.sock if conn is not None else None
+        if sock is not None:
+            # Despierta al hilo bloqueado en connect/recv; urllib3 descarta
+            # la conexión al ver el error.
+            try:
+                sock.shutdown(socket.SHUT_RDWR)
+            except OSError:
+                pass
+
+
+# Petición que atiende cada hilo del ejecutor.
+_current_request = threading.local()
+
+
+class _AbortableMixin:
+    def request(self, *args: Any, **kwargs: Any) -> None:
+        handle = getattr(_current_request, "handle", None)
+        if handle is not None:
+            handle.attach(self)
+        super().request(*args, **kwargs)  # type: ignore[misc]
+
+    def getresponse(self) -> Any:
+        # Si se abortó mientras conectaba, aún no había socket que cerrar.
+        handle = getattr(_current_request, "handle", None)
+        if handle is not None:
+            handle.check()
+        return super().getresponse()  # type: ignore[misc]
+
+
+class _AbortableHTTPConnection(_AbortableMixin, HTTPConnection):
+    pass
+
+
+class _AbortableHTTPSConnection(_AbortableMixin, HTTPSConnection):
+    pass
+
+
+class _AbortableHTTPConnectionPool(HTTPConnectionPool):
+    ConnectionCls = _AbortableHTTPConnection
+
+
+class _AbortableHTTPSConnectionPool(HTTPSConnectionPool):
+    ConnectionCls = _AbortableHTTPSConnection
+
+
+class _AbortableAdapter(HTTPAdapter):
+    def init_poolmanager(self, *args: Any, **kwargs: Any) -> None:
+        super().init_poolmanager(*args, **kwargs)
+        self.poolmanager.pool_classes_by_scheme = {
+            "http": _AbortableHTTPConnectionPool,
+            "https": _AbortableHTTPSConnectionPool,
+        }
+
+
+class HttpClient:
+    """Sesión HTTP de larga duración con reintentos y circuit breaker."""
+
+    def __init__(self, config: HttpClientConfig | None = None) -> None:
+        self.config = config or HttpClientConfig()
+        self._session = requests.Session()
+        self._adapter = _AbortableAdapter(
+            pool_connections=self.config.pool_connections,
+            pool_maxsize=self.config.pool_maxsize,
+            max_retries=0,
+        )
+        self._session.mount("https://", self._adapter)
+        self._session.mount("http://", self._adapter)
+        self._breakers: Dict[str, CircuitBreaker] = {}
+        self._lock = threading.Lock()
+        self._metrics = HttpMetrics()
+        # Las peticiones cancelables se lanzan en estos hilos para que quien
+        # espera pueda abandonarlas en cuanto se cancela el trabajo.
+        self._executor = ThreadPoolExecutor(
+            max_workers=max(1, self.config.max_workers),
+            thread_name_prefix="http-client",
+        )
+        self._queued = 0
+        self._running = 0
+        self._aborted = 0
+
+    def breaker_for(self, url: str) -> CircuitBreaker:
+        key = _endpoint_key(url)
+        with self._lock:
+            breaker = self._breakers.get(key)
+            if breaker is None:
+                breaker = CircuitBreaker(self.config.breaker_threshold, self.config.breaker_cooldown)
+                self._breakers[key] = breaker
+            return breaker
+
+    def post(
+        self,
+        url: str,
+        timeout: float,
+        cancel_token: CancellationToken | None = None,
+        rate_limiter: RateLimiter | None = None,
+        cost: int = 0,
+        priority: int = PRIORITY_INTERACTIVE,
+        **kwargs: Any,
+    ) -> requests.Response:
+        """POST con reintentos; devuelve la última respuesta recibida.
+
+        Lanza `CircuitOpenError` si el endpoint está en cuarentena y
+        `requests.RequestException` si fallan todos los intentos sin
+        respuesta. Con `cancel_token` cancelado lanza `JobCancelled`.
+
+        Con `rate_limiter`, cada intento espera turno con `cost` caracteres
+        y la prioridad indicada.
+        """
+
+        logger = logging.getLogger(__name__)
+        breaker = self.breaker_for(url)
+        response: requests.Response | None = None
+        error: requests.RequestException | None = None
+        attempt = 0
+        throttle_waits = 0
+        while True:
+            if cancel_token is not None:
+                cancel_token.raise_if_cancelled()
+            if rate_limiter is not None:
+                rate_limiter.acquire(cost, priority, cancel_token)
+            if not breaker.allow():
+                if attempt > 0:
+                    # El breaker se abrió durante los reintentos: se
+                    # devuelve el último resultado en lugar de insistir.
+                    break
+                with self._lock:
+                    self._metrics.breaker_rejections += 1
+                raise CircuitOpenError(f"Circuito abierto para {_endpoint_key(url)}")
+
+            response, error = None, None
+            try:
+                response = self._send(url, timeout, cancel_token, kwargs)
+            except requests.RequestException as exc:
+                error = exc
+            except BaseException:
+                # Cancelado: no dice nada sobre la salud del endpoint.
+                breaker.release_probe()
+                raise
+
+            if response is not None and response.status_code < 500:
+                # Un 429 no indica que el endpoint esté caído.
+                breaker.record_success()
+            else:
+                breaker.record_failure()
+
+            throttled = response is not None and response.status_code == 429
+            if rate_limiter is not None:
+                if throttled:
+                    rate_limiter.throttled(_retry_after_seconds(response))  # type: ignore[arg-type]
+                elif response is not None and response.status_code < 400:
+                    rate_limiter.succeeded()
+
+            retryable = error is not None or (response is not None and response.status_code in RETRY_STATUSES)
+            if not retryable:
+                break
+            if throttled and rate_limiter is not None and throttle_waits < MAX_THROTTLE_WAITS:
+                # El limitador ya pausa la cola hasta Retry-After.
+                throttle_waits += 1
+                delay = rate_limiter.metrics().paused_for
+            elif attempt >= self.config.max_retries:
+                break
+            else:
+                delay = self._backoff(attempt, response)
+                attempt += 1
+            if cancel_token is not None:
+                remaining = cancel_token.remaining()
+                if remaining is not None and delay >= remaining:
+                    # No da tiempo a otro intento dentro del plazo.
+                    break
+            with self._lock:
+                self._metrics.retries += 1
+            logger.info(
+                "Reintento %s/%s de %s en %.2f s (%s)",
+                attempt,
+                self.config.max_retries,
+                _endpoint_key(url),
+                delay,
+                error if error is not None else f"HTTP {response.status_code}",  # type: ignore[union-attr]
+            )
+            if rate_limiter is not None and throttled:
+                # La espera la hace `acquire`, junto al resto de la cola.
+                continue
+            if cancel_token is not None:
+                cancel_token.wait(delay)
+            else:
+                time.sleep(delay)
+
+        if error is not None:
+            raise error
+        assert response is not None
+        return response
+
+    def _backoff(self, attempt: int, response: requests.Response | None) -> float:
+        if response is not None:
+            retry_after = _retry_after_seconds(response)
+            if retry_after is not None:
+                return min(retry_after, self.config.backoff_max)
+        # "Full jitter": uniforme entre 0 y el tope exponencial.
+        cap = min(self.config.backoff_max, self.config.backoff_base * (2**attempt))
+        return random.uniform(0.0, cap)
+
+    def _send(
+        self,
+        url: str,
+        timeout: float,
+        cancel_token: CancellationToken | None,
+        kwargs: Dict[str, Any],
+    ) -> requests.Response:
+        with self._lock:
+            self._metrics.requests += 1
+        if cancel_token is None:
+            return self._session.post(url, timeout=timeout, **kwargs)
+
+        cancel_token.raise_if_cancelled()
+        timeout = cancel_token.remaining(timeout) or 0.001
+        handle = _RequestHandle()
+        with self._lock:
+            self._queued += 1
+            queued, running = self._queued, self._running
+        if running >= self.config.max_workers:
+            logging.getLogger(__name__).info(
+                "Petición HTTP en cola: %s esperando, %s en curso", queued, running
+            )
+        future = self._executor.submit(self._post_in_worker, handle, url, timeout, kwargs)
+        finished = threading.Event()
+        future.add_done_callback(lambda _f: finished.set())
+        unregister = cancel_token.on_cancel(finished.set)
+        try:
+            finished.wait()
+        finally:
+            unregister()
+        if not future.done():
+            if future.cancel():
+                # No llegó a empezar.
+                with self._lock:
+                    self._queued -= 1
+            else:
+                # Se corta su conexión para liberar el hilo ya, no tras el timeout.
+                handle.abort()
+                with self._lock:
+                    self._aborted += 1
+            logging.getLogger(__name__).info("Petición HTTP abandonada (%s)", cancel_token.reason)
+        cancel_token.raise_if_cancelled()
+        return future.result()
+
+    def _post_in_worker(
+        self,
+        handle: _RequestHandle,
+        url: str,
+        timeout: float,
+        kwargs: Dict[str, Any],
+    ) -> requests.Response:
+        with self._lock:
+            self._queued -= 1
+            self._running += 1
+        _current_request.handle = handle
+        try:
+            handle.check()
+            return self._session.post(url, timeout=timeout, **kwargs)
+        finally:
+            _current_request.handle = None
+            with self._lock:
+                self._running -= 1
+
+    def _pool_counters(self) -> Tuple[int, int]:
+        """(conexiones nuevas, peticiones) según los pools de urllib3."""
+
+        manager = self._adapter.poolmanager
+        connections = requests_sent = 0
+        for key in list(manager.pools.keys()):
+            pool = manager.pools.get(key)
+            if pool is None:
+                continue
+            connections += pool.num_connections
+            requests_sent += pool.num_requests
+        return connections, requests_sent
+
+    def metrics(self) -> HttpMetrics:
+        connections, _ = self._pool_counters()
+        with self._lock:
+            return HttpMetrics(
+                requests=self._metrics.requests,
+                new_connections=connections,
+                retries=self._metrics.retries,
+                breaker_rejections=self._metrics.breaker_rejections,
+                queued_requests=self._queued,
+                running_requests=self._running,
+                aborted_requests=self._aborted,
+            )
+
+    def close(self) -> None:
+        self._executor.shutdown(wait=False, cancel_futures=True)
+        self._session.close()
+
+
+_http_client: HttpClient | None = None
+_http_client_lock = threading.Lock()
+
+
+def get_http_client() -> HttpClient:
+    """Cliente HTTP compartido por todos los proveedores."""
+
+    global _http_client
+    with _http_client_lock:
+        if _http_client is None:
+            _http_client = HttpClient(HttpClientConfig.from_env())
+        return _http_client
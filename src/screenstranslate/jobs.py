@@ -0,0 +1,247 @@
+"""Trabajos de captura → OCR → traducción cancelables.
+
+Cada pulsación del hotkey crea un `Job` con su `CancellationToken`. El
+token se propaga por `extract_text_blocks` (que mata el proceso de
+Tesseract o interrumpe libtesseract) y `TranslationClient.translate_texts`
+(que deja de esperar la respuesta HTTP). `JobManager` aplica la política
+"el último gana": empezar un trabajo nuevo cancela el anterior, y un
+trabajo que ya no es el actual nunca debe mostrar su overlay.
+
+Cada etapa tiene además un plazo máximo (`StageDeadlines`); al agotarse,
+el token de la etapa se cancela con `DeadlineExceeded`.
+"""
+
+from __future__ import annotations
+
+import itertools
+import logging
+import os
+import threading
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass
+from typing import Callable, Dict, Iterator, List
+
+
+REASON_CANCELLED = "cancelled"
+REASON_SUPERSEDED = "superseded"
+REASON_DEADLINE = "deadline"
+
+
+class JobCancelled(Exception):
+    """El trabajo se canceló (o fue reemplazado) antes de terminar."""
+
+    def __init__(self, reason: str = REASON_CANCELLED) -> None:
+        super().__init__(reason)
+        self.reason = reason
+
+
+class DeadlineExceeded(JobCancelled):
+    """Una etapa superó su plazo máximo."""
+
+    def __init__(self, stage: str | None = None) -> None:
+        super().__init__(REASON_DEADLINE)
+        self.stage = stage
+
+
+class CancellationToken:
+    """Señal de cancelación compartida entre hilos.
+
+    Los callbacks registrados con `on_cancel` se ejecutan una sola vez, en
+    el hilo que cancela; deben ser rápidos (matar un proceso, cerrar un
+    socket...). Los tokens hijos se cancelan cuando lo hace el padre.
+    """
+
+    def __init__(self, stage: str | None = None) -> None:
+        self.stage = stage
+        self.reason: str | None = None
+        self.deadline: float | None = None
+        self._event = threading.Event()
+        self._lock = threading.Lock()
+        self._callbacks: List[Callable[[], None]] = []
+
+    @property
+    def cancelled(self) -> bool:
+        return self._event.is_set()
+
+    def cancel(self, reason: str = REASON_CANCELLED) -> bool:
+        """Cancela el token. Devuelve False si ya estaba cancelado."""
+
+        with self._lock:
+            if self._event.is_set():
+                return False
+            self.reason = reason
+            self._event.set()
+            callbacks, self._callbacks = self._callbacks, []
+        for callback in callbacks:
+            try:
+                callback()
+            except Exception:
+                logging.getLogger(__name__).exception("Error en un callback de cancelación")
+        return True
+
+    def on_cancel(self, callback: Callable[[], None]) -> Callable[[], None]:
+        """Registra `callback` y devuelve una función que lo desregistra.
+
+        Si el token ya está cancelado, el callback se ejecuta en el acto.
+        """
+
+        with self._lock:
+            if not self._event.is_set():
+                self._callbacks.append(callback)
+
+                def _unregister() -> None:
+                    with self._lock:
+                        try:
+                            self._callbacks.remove(callback)
+                        except ValueError:
+                            pass
+
+                return _unregister
+        callback()
+        return lambda: None
+
+    def wait(self, timeout: float | None = None) -> bool:
+        return self._event.wait(timeout)
+
+    def remaining(self, default: float | None = None) -> float | None:
+        """Segundos hasta el plazo del token (o `default` si no tiene)."""
+
+        if self.deadline is None:
+            return default
+        left = max(0.0, self.deadline - time.monotonic())
+        return left if default is None else min(default, left)
+
+    def raise_if_cancelled(self) -> None:
+        if not self._event.is_set():
+            return
+        if self.reason == REASON_DEADLINE:
+            raise DeadlineExceeded(self.stage)
+        raise JobCancelled(self.reason or REASON_CANCELLED)
+
+    @contextmanager
+    def child(self, stage: str, timeout: float | None = None) -> Iterator["CancellationToken"]:
+        """Token de una etapa: se cancela con el padre o al agotar `timeout`.
+
+        Sin `timeout` propio hereda el plazo del padre.
+        """
+
+        token = CancellationToken(stage)
+        token.deadline = self.deadline
+        unregister = self.on_cancel(lambda: token.cancel(self.reason or REASON_CANCELLED))
+        timer: threading.Timer | None = None
+        if timeout is not None and timeout > 0:
+            deadline = time.monotonic() + timeout
+            token.deadline = deadline if self.deadline is None else min(deadline, self.deadline)
+            timer = threading.Timer(timeout, token.cancel, args=(REASON_DEADLINE,))
+            timer.daemon = True
+            timer.start()
+        try:
+            yield token
+        finally:
+            if timer is not None:
+                timer.cancel()
+            unregister()
+
+
+def _env_seconds(name: str, default: float) -> float:
+    try:
+        return float(os.getenv(name, str(default)))
+    except ValueError:
+        return default
+
+
+@dataclass(frozen=True)
+class StageDeadlines:
+    """Plazos máximos por etapa, en segundos (0 = sin plazo)."""
+
+    capture: float = 5.0
+    ocr: float = 20.0
+    translate: float = 15.0
+
+    @classmethod
+    def from_env(cls) -> "StageDeadlines":
+        """Lee SCREENSTRANSLATE_DEADLINE_{CAPTURE,OCR,TRANSLATE} (segundos)."""
+
+        defaults = cls()
+        return cls(
+            capture=_env_seconds("SCREENSTRANSLATE_DEADLINE_CAPTURE", defaults.capture),
+            ocr=_env_seconds("SCREENSTRANSLATE_DEADLINE_OCR", defaults.ocr),
+            translate=_env_seconds("SCREENSTRANSLATE_DEADLINE_TRANSLATE", defaults.translate),
+        )
+
+    def for_stage(self, stage: str) -> float | None:
+        value = getattr(self, stage, 0.0)
+        return value if value and value > 0 else None
+
+
+class Job:
+    """Una ejecución del flujo captura → OCR → traducción."""
+
+    def __init__(self, job_id: int, deadlines: StageDeadlines) -> None:
+        self.id = job_id
+        self.deadlines = deadlines
+        self.token = CancellationToken()
+        self.created_at = time.monotonic()
+        self.timings: Dict[str, float] = {}
+
+    @property
+    def cancelled(self) -> bool:
+        return self.token.cancelled
+
+    def cancel(self, reason: str = REASON_CANCELLED) -> bool:
+        return self.token.cancel(reason)
+
+    @contextmanager
+    def stage(self, name: str) -> Iterator[CancellationToken]:
+        """Ejecuta una etapa con su plazo y registra cuánto tardó.
+
+        Al salir se comprueba el token, de modo que una etapa que termina
+        justo tras ser cancelada tampoco deja pasar su resultado.
+        """
+
+        self.token.raise_if_cancelled()
+        started = time.perf_counter()
+        with self.token.child(name, self.deadlines.for_stage(name)) as token:
+            try:
+                yield token
+            finally:
+                self.timings[name] = (time.perf_counter() - started) * 1000
+            token.raise_if_cancelled()
+
+
+class JobManager:
+    """Política "el último gana" para los trabajos de traducción."""
+
+    def __init__(self, deadlines: StageDeadlines | None = None) -> None:
+        self.deadlines = deadlines or StageDeadlines.from_env()
+        self._ids = itertools.count(1)
+        self._lock = threading.Lock()
+        self._current: Job | None = None
+
+    def start(self) -> Job:
+        """Crea un trabajo nuevo y cancela el que estuviera en curso."""
+
+        job = Job(next(self._ids), self.deadlines)
+        with self._lock:
+            previous, self._current = self._current, job
+        if previous is not None and previous.cancel(REASON_SUPERSEDED):
+            logging.getLogger(__name__).info("Trabajo %s reemplazado por %s", previous.id, job.id)
+        return job
+
+    def cancel_current(self, reason: str = REASON_SUPERSEDED) -> None:
+        """Cancela el trabajo actual (seguro desde cualquier hilo)."""
+
+        with self._lock:
+            job = self._current
+        if job is not None and job.cancel(reason):
+            logging.getLogger(__name__).info("Trabajo %s cancelado (%s)", job.id, reason)
+
+    def is_current(self, job: Job) -> bool:
+        with self._lock:
+            return self._current is job and not job.cancelled
+
+    def finish(self, job: Job) -> None:
+        with self._lock:
+            if self._current is job:
+                self._current = None
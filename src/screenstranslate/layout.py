@@ -0,0 +1,142 @@
+"""Reconstrucción de párrafos a partir de las líneas del OCR.
+
+Traducir línea a línea parte los párrafos con salto de línea en trozos
+sin contexto: más segmentos por petición, peores traducciones y menos
+aciertos en la memoria de traducción. `group_lines_into_paragraphs` une
+las líneas consecutivas que forman un mismo párrafo, usando los números
+de bloque/párrafo de Tesseract cuando los hay y, siempre, la geometría
+(interlineado, altura de letra y sangría). `distribute_text` reparte
+después la traducción del párrafo entre las cajas de sus líneas
+originales para el overlay.
+"""
+
+from __future__ import annotations
+
+import os
+import re
+from dataclasses import dataclass, field
+from typing import List, Sequence
+
+from .ocr import TextBlock
+
+
+# Hueco vertical máximo entre líneas de un párrafo, en alturas de línea.
+MAX_LINE_GAP = 0.8
+# Diferencia máxima de altura de letra entre líneas de un párrafo.
+MAX_HEIGHT_RATIO = 1.4
+# Desplazamiento horizontal máximo del borde izquierdo (sangría incluida),
+# en alturas de línea.
+MAX_INDENT = 2.5
+# Sin metadatos de Tesseract solo se unen líneas "llenas", para no juntar
+# elementos de menús o listas cortas.
+MIN_WRAPPED_CHARS = 20
+MIN_WRAPPED_WIDTH = 0.6
+
+_SENTENCE_END = re.compile(r"[.!?:;。！？：]['\")\]»”]*$")
+_HYPHENATED = re.compile(r"\w-$")
+
+
+def paragraphs_enabled() -> bool:
+    """SCREENSTRANSLATE_PARAGRAPHS=0 vuelve a traducir línea a línea."""
+
+    return os.getenv("SCREENSTRANSLATE_PARAGRAPHS", "1") != "0"
+
+
+@dataclass
+class Paragraph:
+    lines: List[TextBlock] = field(default_factory=list)
+    # Posiciones de las líneas en la lista original.
+    indices: List[int] = field(default_factory=list)
+
+    @property
+    def text(self) -> str:
+        parts: List[str] = []
+        for line in self.lines:
+            text = line.text.strip()
+            if parts and _HYPHENATED.search(parts[-1]) and text[:1].islower():
+                # Palabra cortada con guion al final de la línea.
+                parts[-1] = parts[-1][:-1] + text
+            else:
+                parts.append(text)
+        return " ".join(parts)
+
+
+def _continues(paragraph: Paragraph, line: TextBlock) -> bool:
+    previous = paragraph.lines[-1]
+    height = max(1, min(previous.h, line.h))
+    if max(previous.h, line.h) / height > MAX_HEIGHT_RATIO:
+        return False
+    gap = line.y - (previous.y + previous.h)
+    if gap < -height / 2 or gap > MAX_LINE_GAP * height:
+        return False
+    # Se compara con la segunda línea del párrafo si existe, para admitir
+    # sangría en la primera.
+    reference = paragraph.lines[1] if len(paragraph.lines) > 1 else previous
+    if abs(line.x - reference.x) > MAX_INDENT * height and abs(line.x - previous.x) > MAX_INDENT * height:
+        return False
+
+    if previous.par_num is not None and line.par_num is not None:
+        return (previous.block_num, previous.par_num) == (line.block_num, line.par_num)
+
+    text = previous.text.strip()
+    widest = max(block.w for block in paragraph.lines)
+    return (
+        len(text) >= MIN_WRAPPED_CHARS
+        and previous.w >= MIN_WRAPPED_WIDTH * max(widest, line.w)
+        and not _SENTENCE_END.search(text)
+    )
+
+
+def group_lines_into_paragraphs(lines: Sequence[TextBlock]) -> List[Paragraph]:
+    """Agrupa líneas consecutivas (en orden de lectura) en párrafos."""
+
+    paragraphs: List[Paragraph] = []
+    for index, line in enumerate(lines):
+        if not line.text.strip():
+            paragraphs.append(Paragraph([line], [index]))
+            continue
+        current = paragraphs[-1] if paragraphs else None
+        if current is not None and current.lines[-1].text.strip() and _continues(current, line):
+            current.lines.append(line)
+            current.indices.append(index)
+        else:
+            paragraphs.append(Paragraph([line], [index]))
+    return paragraphs
+
+
+def distribute_text(text: str, lines: Sequence[TextBlock]) -> List[str]:
+    """Reparte `text` entre `lines` en proporción al ancho de cada caja.
+
+    Se corta por palabras; los idiomas sin espacios (chino, japonés) se
+    cortan por caracteres. Si sobran cajas, las últimas quedan vacías.
+    """
+
+    if len(lines) <= 1:
+        return [text]
+    words = text.split()
+    separator = " "
+    if len(words) < len(lines) and len(text.replace(" ", "")) >= len(lines) * 2:
+        words, separator = list(text.replace(" ", "")), ""
+
+    total_width = sum(max(1, line.w) for line in lines)
+    total_chars = sum(len(word) for word in words) or 1
+    pieces: List[str] = []
+    position = 0
+    consumed = 0
+    cumulative = 0
+    for line_index, line in enumerate(lines):
+        if line_index == len(lines) - 1:
+            pieces.append(separator.join(words[position:]))
+            break
+        cumulative += max(1, line.w)
+        target = total_chars * cumulative / total_width
+        start = position
+        while position < len(words):
+            size = len(words[position])
+            # La palabra entra si deja la línea más cerca del objetivo.
+            if position > start and consumed + size / 2 > target:
+                break
+            consumed += size
+            position += 1
+        pieces.append(separator.join(words[start:position]))
+    return pieces
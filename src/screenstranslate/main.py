@@ -3,6 +3,7 @@ import os
 import sys
 import signal
 import locale
+import multiprocessing
 
 # Permitir ejecutar este archivo directamente (por ejemplo,
 # `python src/screenstranslate/main.py`) añadiendo el directorio
@@ -12,7 +13,7 @@ if __name__ == "__main__" and "screenstranslate" not in sys.modules:
     _src_root = os.path.dirname(_current_dir)
     if _src_root not in sys.path:
         sys.path.insert(0, _src_root)
-from PySide6.QtCore import QRect, Slot, Signal, QUrl, Qt, QTimer
+from PySide6.QtCore import QRect, Slot, Signal, QUrl, Qt, QTimer, QThreadPool
 from PySide6.QtGui import QGuiApplication, QDesktopServices, QIcon
 from PySide6.QtWidgets import (
     QApplication,
@@ -28,28 +29,33 @@ from PySide6.QtWidgets import (
     QSplashScreen,
 )
 
-from pytesseract import TesseractNotFoundError
-import pytesseract
-
 # Usamos imports absolutos basados en el paquete "screenstranslate" para
 # evitar problemas de imports relativos cuando el script se ejecuta
 # congelado (por ejemplo, con PyInstaller).
 from screenstranslate.config import load_config, save_config
-from screenstranslate.capture import capture_region
-from screenstranslate.history import add_entry
+from screenstranslate.history import shutdown_history
 from screenstranslate.history_ui import HistoryWindow
 from screenstranslate.hotkey import HotkeyListener
 from screenstranslate.hotkey_input import HotkeyLineEdit
+from screenstranslate.jobs import Job, JobManager
 from screenstranslate.licensing import (
     check_and_register_use,
     activate_license,
     is_pro,
     maybe_refresh_license,
 )
-from screenstranslate.ocr import TextBlock, extract_text_blocks
+from screenstranslate.ocr_tiles import shutdown_tile_pool
 from screenstranslate.overlay import OverlayBlock, TranslationOverlay
+from screenstranslate.pipeline import (
+    TIMING_FIRST_LINE,
+    TIMING_LAST_LINE,
+    PipelineRequest,
+    PipelineResult,
+    PipelineSignals,
+    TranslationPipeline,
+)
 from screenstranslate.selector import SelectionOverlay
-from screenstranslate.translation import TranslationClient, TranslationError
+from screenstranslate.translation import TranslationClient
 
 
 APP_NAME = "ScreensTranslate Pro"
@@ -74,6 +80,10 @@ UI_TEXTS = {
         "status_no_text": "No se ha detectado texto en la región seleccionada",
         "status_ocr_not_found": "Tesseract OCR no está instalado o no se encuentra en el PATH.",
         "status_translation_error": "Error de traducción",
+        "status_timeout": "La traducción ha tardado demasiado y se ha cancelado",
+        "status_stage_capture": "Capturando...",
+        "status_stage_ocr": "Reconociendo texto...",
+        "status_stage_translate": "Traduciendo...",
         "status_translation_shown": "Traducción mostrada. Pulsa Esc o haz clic para cerrar.",
         "splash_loading": "Cargando ScreensTranslate Pro...",
         "lang_labels": {
@@ -109,6 +119,10 @@ UI_TEXTS = {
         "status_no_text": "No text detected in the selected region",
         "status_ocr_not_found": "Tesseract OCR is not installed or not found in PATH.",
         "status_translation_error": "Translation error",
+        "status_timeout": "Translation took too long and was cancelled",
+        "status_stage_capture": "Capturing...",
+        "status_stage_ocr": "Recognizing text...",
+        "status_stage_translate": "Translating...",
         "status_translation_shown": "Translation displayed. Press Esc or click to close.",
         "splash_loading": "Loading ScreensTranslate Pro...",
         "lang_labels": {
@@ -144,6 +158,10 @@ UI_TEXTS = {
         "status_no_text": "Aucun texte détecté dans la zone sélectionnée",
         "status_ocr_not_found": "Tesseract OCR n’est pas installé ou introuvable dans le PATH.",
         "status_translation_error": "Erreur de traduction",
+        "status_timeout": "La traduction a pris trop de temps et a été annulée",
+        "status_stage_capture": "Capture...",
+        "status_stage_ocr": "Reconnaissance du texte...",
+        "status_stage_translate": "Traduction...",
         "status_translation_shown": "Traduction affichée. Appuyez sur Échap ou cliquez pour fermer.",
         "splash_loading": "Chargement de ScreensTranslate Pro...",
         "lang_labels": {
@@ -219,6 +237,23 @@ class ConfigWindow(QMainWindow):
         self._hotkey_listener: HotkeyListener | None = None
         self._history_window: HistoryWindow | None = None
         self._selection_overlay: SelectionOverlay | None = None
+        # Solo el último trabajo de captura puede mostrar su overlay.
+        self._jobs = JobManager()
+        # El flujo captura → OCR → traducción corre fuera del hilo de Qt.
+        # Dos hilos permiten arrancar un trabajo nuevo mientras el anterior
+        # termina de cancelarse.
+        self._pipeline_pool = QThreadPool(self)
+        self._pipeline_pool.setMaxThreadCount(2)
+        self._pipeline_signals = PipelineSignals(self)
+        self._pipeline_signals.stageChanged.connect(self._on_pipeline_stage)
+        self._pipeline_signals.ocrReady.connect(self._on_pipeline_ocr_ready)
+        self._pipeline_signals.linesReady.connect(self._on_pipeline_lines)
+        self._pipeline_signals.finished.connect(self._on_pipeline_finished)
+        self._pipeline_signals.failed.connect(self._on_pipeline_failed)
+        self._pipeline_signals.cancelled.connect(self._on_pipeline_cancelled)
+        self._pipeline_rects: dict[int, QRect] = {}
+        # Trabajo cuyo overlay (aún con líneas sin traducir) está en pantalla.
+        self._overlay_job_id: int | None = None
         self.hotkeyTriggered.connect(self._on_test_capture_clicked)
         self._build_ui()
         self._setup_hotkey_listener()
@@ -351,6 +386,9 @@ class ConfigWindow(QMainWindow):
     def _on_test_capture_clicked(self) -> None:
         """Inicia el flujo de selecciÃ³n de regiÃ³n y traducciÃ³n rÃ¡pida."""
 
+        # Una captura nueva deja obsoleta cualquier traducción en curso.
+        self._jobs.cancel_current()
+
         check_result = check_and_register_use(self.config)
         self.config.update(check_result.updated_config)
         save_config(self.config)
@@ -387,6 +425,9 @@ class ConfigWindow(QMainWindow):
     def _on_hotkey_pressed(self) -> None:
         """Callback que se ejecuta en el hilo de pynput cuando se pulsa el hotkey."""
 
+        # Cancelamos ya el trabajo en curso (el token es seguro entre hilos)
+        # para que el hilo de Qt quede libre cuanto antes.
+        self._jobs.cancel_current()
         # Emitimos una seÃ±al para ejecutar la captura en el hilo de Qt.
         self.hotkeyTriggered.emit()
 
@@ -496,66 +537,96 @@ class ConfigWindow(QMainWindow):
             self._selection_overlay.close()
             self._selection_overlay = None
 
-        img = capture_region(rect.left(), rect.top(), rect.width(), rect.height())
-
         source_lang = self.config.get("language_source", "auto")
         target_lang = self.config.get("language_target", "es")
+        request = PipelineRequest(
+            region=(rect.left(), rect.top(), rect.width(), rect.height()),
+            source_lang=source_lang,
+            target_lang=target_lang,
+        )
+        job = self._jobs.start()
+        self._pipeline_rects[job.id] = QRect(rect)
+        self._pipeline_pool.start(
+            TranslationPipeline(job, request, self._pipeline_signals, self._translation_client)
+        )
 
-        try:
-            # Umbral de confianza mÃ¡s bajo para no perder texto durante las pruebas.
-            blocks: list[TextBlock] = extract_text_blocks(img, lang_code=source_lang, min_conf=40.0)
-        except TesseractNotFoundError as exc:
-            logger.exception(
-                "Error al invocar Tesseract (cmd=%s): %s",
-                getattr(pytesseract, "tesseract_cmd", None),
-                exc,
-            )
-            self.statusBar().showMessage(
-                self._texts["status_ocr_not_found"],
-                7000,
-            )
-            return
-
-        logger.info("Bloques de texto detectados por OCR: %s", len(blocks))
-        if not blocks:
-            self.statusBar().showMessage(self._texts["status_no_text"], 4000)
-            return
+    @Slot(object, str)
+    def _on_pipeline_stage(self, job: Job, stage: str) -> None:
+        if self._jobs.is_current(job):
+            self.statusBar().showMessage(self._texts[f"status_stage_{stage}"])
 
-        # Agrupar palabras en lÃ­neas para que el overlay sea mÃ¡s legible.
-        line_blocks: list[TextBlock] = self._group_blocks_by_line(blocks)
-        logger.info("LÃ­neas agrupadas para overlay: %s", len(line_blocks))
+    @Slot(object, object)
+    def _on_pipeline_ocr_ready(self, job: Job, source_blocks: list[OverlayBlock]) -> None:
+        """Muestra el overlay con las líneas originales mientras se traducen."""
 
-        texts = [b.text for b in line_blocks]
-        try:
-            translated = self._translation_client.translate_texts(texts, source_lang, target_lang)
-        except TranslationError as exc:
-            logger.error("Error en la traducciÃ³n: %s", exc)
-            self.statusBar().showMessage(self._texts["status_translation_error"], 5000)
+        rect = self._pipeline_rects.get(job.id)
+        if rect is None or not self._jobs.is_current(job):
             return
+        self._show_overlay(rect, source_blocks, pending=True)
+        self._overlay_job_id = job.id
 
-        overlay_blocks: list[OverlayBlock] = []
-        for block, t_text in zip(line_blocks, translated):
-            overlay_blocks.append(
-                OverlayBlock(
-                    text=t_text,
-                    x=block.x,
-                    y=block.y,
-                    w=block.w,
-                    h=block.h,
-                )
-            )
-            try:
-                add_entry(block.text, t_text, source_lang, target_lang)
-            except Exception:
-                # El fallo en el historial no debe romper el flujo principal.
-                logger.exception("No se pudo guardar la entrada en el historial")
+    @Slot(object, object)
+    def _on_pipeline_lines(self, job: Job, lines: dict[int, str]) -> None:
+        if self._overlay_job_id != job.id or self._current_overlay is None:
+            return
+        if self._jobs.is_current(job):
+            self._current_overlay.update_lines(lines)
+
+    def _close_job_overlay(self, job: Job) -> None:
+        """Cierra el overlay provisional de un trabajo que no va a terminar."""
+
+        if self._overlay_job_id == job.id:
+            self._overlay_job_id = None
+            if self._current_overlay is not None:
+                self._current_overlay.close()
+                self._current_overlay = None
+
+    @Slot(object, str)
+    def _on_pipeline_failed(self, job: Job, status_key: str) -> None:
+        self._pipeline_rects.pop(job.id, None)
+        self._close_job_overlay(job)
+        if not self._jobs.is_current(job):
+            return
+        self._jobs.finish(job)
+        timeout = 7000 if status_key == "status_ocr_not_found" else 5000
+        self.statusBar().showMessage(self._texts[status_key], timeout)
+
+    @Slot(object)
+    def _on_pipeline_cancelled(self, job: Job) -> None:
+        self._pipeline_rects.pop(job.id, None)
+        self._close_job_overlay(job)
+
+    @Slot(object, object)
+    def _on_pipeline_finished(self, job: Job, result: PipelineResult) -> None:
+        """Pinta el overlay de un trabajo terminado (en el hilo de Qt)."""
+
+        rect = self._pipeline_rects.pop(job.id, None)
+        # Un trabajo reemplazado nunca debe llegar a pintar su overlay.
+        if rect is None or not self._jobs.is_current(job):
+            self._close_job_overlay(job)
+            return
+        self._jobs.finish(job)
+        logging.getLogger(__name__).info(
+            "Trabajo %s: primera línea a los %.0f ms, última a los %.0f ms",
+            job.id,
+            result.timings.get(TIMING_FIRST_LINE, 0.0),
+            result.timings.get(TIMING_LAST_LINE, 0.0),
+        )
+        if self._overlay_job_id == job.id and self._current_overlay is not None:
+            # El overlay ya está en pantalla: solo se completan las líneas.
+            self._overlay_job_id = None
+            self._current_overlay.update_lines({i: block.text for i, block in enumerate(result.blocks)})
+            self.statusBar().showMessage(self._texts["status_translation_shown"], 5000)
+            return
+        self._show_overlay(rect, result.blocks)
 
+    def _show_overlay(self, rect: QRect, overlay_blocks: list[OverlayBlock], pending: bool = False) -> None:
         # Definimos una regiÃ³n de overlay con altura mÃ­nima razonable,
         # calculada en funciÃ³n del nÃºmero de lÃ­neas para no exagerar en
         # regiones pequeÃ±as y evitar recortes cuando las lÃ­neas estÃ¡n
         # muy juntas.
         overlay_rect = QRect(rect)
-        line_count = max(1, len(line_blocks))
+        line_count = max(1, len(overlay_blocks))
         approx_line_height = 22  # px aproximados por lÃ­nea en el overlay
         min_height = min(260, line_count * approx_line_height + 40)
         # Usar la pantalla en la que cae la regiÃ³n seleccionada (centro del rect)
@@ -574,102 +645,14 @@ class ConfigWindow(QMainWindow):
         if self._current_overlay is not None:
             self._current_overlay.close()
 
-        self._current_overlay = TranslationOverlay(overlay_rect, overlay_blocks)
+        self._current_overlay = TranslationOverlay(overlay_rect, overlay_blocks, pending=pending)
         self._current_overlay.show()
-        self.statusBar().showMessage(
-            self._texts["status_translation_shown"],
-            5000,
-        )
-
-    @staticmethod
-    def _group_blocks_by_line(blocks: list[TextBlock]) -> list[TextBlock]:
-        """Agrupa bloques palabra a palabra en lÃ­neas mÃ¡s grandes.
-
-        Se basa en la posiciÃ³n vertical (y + h/2) para decidir quÃ© palabras
-        pertenecen a la misma lÃ­nea visual.
-        """
-
-        if not blocks:
-            return []
-
-        # Si Tesseract ha devuelto metadatos de lÃ­nea, los usamos para agrupar.
-        if any(b.line_num is not None for b in blocks):
-            from collections import defaultdict
-
-            groups: dict[tuple[int, int, int], list[TextBlock]] = defaultdict(list)
-            for b in blocks:
-                key = (
-                    b.par_num or 0,
-                    b.block_num or 0,
-                    b.line_num or 0,
-                )
-                groups[key].append(b)
-
-            merged: list[TextBlock] = []
-            for key in sorted(groups.keys()):
-                line = sorted(groups[key], key=lambda t: t.x)
-                text = " ".join(tok.text for tok in line)
-                x = min(tok.x for tok in line)
-                y = min(tok.y for tok in line)
-                right = max(tok.x + tok.w for tok in line)
-                bottom = max(tok.y + tok.h for tok in line)
-                w = right - x
-                h = bottom - y
-                conf = sum(tok.confidence for tok in line) / len(line)
-                merged.append(
-                    TextBlock(
-                        text=text,
-                        x=x,
-                        y=y,
-                        w=w,
-                        h=h,
-                        confidence=conf,
-                    )
-                )
-
-            return merged
-
-        # Fallback geomÃ©trico si no hay metadatos de lÃ­nea.
-        sorted_blocks = sorted(blocks, key=lambda b: (b.y, b.x))
-        max_h = max(b.h for b in sorted_blocks) or 1
-        threshold = max_h * 0.7
-
-        lines: list[list[TextBlock]] = []
-        current_line: list[TextBlock] = []
-        current_center_y: float | None = None
-
-        for b in sorted_blocks:
-            center_y = b.y + b.h / 2.0
-            if current_line and current_center_y is not None:
-                if abs(center_y - current_center_y) <= threshold:
-                    current_line.append(b)
-                    current_center_y = (
-                        (current_center_y * (len(current_line) - 1) + center_y) / len(current_line)
-                    )
-                else:
-                    lines.append(current_line)
-                    current_line = [b]
-                    current_center_y = center_y
-            else:
-                current_line = [b]
-                current_center_y = center_y
-
-        if current_line:
-            lines.append(current_line)
-
-        merged: list[TextBlock] = []
-        for line in lines:
-            text = " ".join(tok.text for tok in line)
-            x = min(tok.x for tok in line)
-            y = min(tok.y for tok in line)
-            right = max(tok.x + tok.w for tok in line)
-            bottom = max(tok.y + tok.h for tok in line)
-            w = right - x
-            h = bottom - y
-            conf = sum(tok.confidence for tok in line) / len(line)
-            merged.append(TextBlock(text=text, x=x, y=y, w=w, h=h, confidence=conf))
-
-        return merged
+        self._overlay_job_id = None
+        if not pending:
+            self.statusBar().showMessage(
+                self._texts["status_translation_shown"],
+                5000,
+            )
 
 
 def setup_logging() -> None:
@@ -680,6 +663,9 @@ def setup_logging() -> None:
 
 
 def main() -> None:
+    # Necesario para el pool de procesos del OCR por franjas en el
+    # ejecutable congelado (PyInstaller).
+    multiprocessing.freeze_support()
     setup_logging()
 
     # Asegurar que PySide6 usa el backend adecuado en cada SO.
@@ -713,6 +699,11 @@ def main() -> None:
         logger.info("SIGINT recibido (Ctrl+C). Cerrando la aplicaciÃ³n...")
         app.quit()
 
+    # El historial se escribe en segundo plano: lo pendiente se guarda al salir.
+    app.aboutToQuit.connect(shutdown_history)
+    # Los procesos del OCR por franjas no deben quedar para el cierre del intérprete.
+    app.aboutToQuit.connect(shutdown_tile_pool)
+
     try:
         signal.signal(signal.SIGINT, _handle_sigint)
     except Exception:
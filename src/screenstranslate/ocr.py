@@ -1,8 +1,10 @@
 ﻿from __future__ import annotations
 
+from collections import OrderedDict
 from dataclasses import dataclass
 from pathlib import Path
-from typing import List
+from array import array
+from typing import Any, Dict, Hashable, Iterable, Iterator, List, Sequence, Tuple
 
 from PIL import Image
 import pytesseract
@@ -12,8 +14,26 @@ import sys
 import platform
 import logging
 import subprocess
-import tempfile
-import csv
+import io
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, wait
+from concurrent.futures.process import BrokenProcessPool
+
+from .preprocess import PreprocessOptions, preprocess
+from .ocr_tiles import (
+    TILE_BLOCK_STRIDE,
+    Tile,
+    get_tile_pool,
+    owned_indices,
+    plan_tiles,
+    reset_tile_pool,
+    tiling_enabled,
+)
+from .text_detect import find_text_regions, text_detection_enabled, union_box
+from .ocr_cache import OcrCache, create_ocr_cache_from_env
+from .tesseract_capi import TesseractCApi, TesseractCApiError, get_tesseract_capi
+from .jobs import CancellationToken
 
 
 LANG_MAP = {
@@ -24,8 +44,52 @@ LANG_MAP = {
     "zh": "chi_sim",
 }
 
+# Modelos mínimos a cargar según el script que detecta el OSD de Tesseract
+# en modo "auto". En los scripts CJK añadimos inglés porque las interfaces
+# suelen mezclar ambos.
+SCRIPT_LANGS = {
+    "Latin": "eng+spa",
+    "Han": "chi_sim+eng",
+    "Japanese": "jpn+eng",
+    "Hiragana": "jpn+eng",
+    "Katakana": "jpn+eng",
+    "Korean": "kor+eng",
+    "Hangul": "kor+eng",
+}
 
-@dataclass
+# Por debajo de esta confianza de OSD usamos el conjunto completo de modelos.
+MIN_SCRIPT_CONFIDENCE = 1.0
+# El OSD trabaja sobre una copia reducida si la captura es muy grande.
+OSD_MAX_SIDE = 1600
+MAX_CACHED_REGIONS = 64
+
+# Modo de segmentación usado para el reconocimiento (bloque uniforme de texto).
+TESSERACT_PSM = 6
+
+# Solo se recorta a la zona con texto si reduce el área al menos un 20 %.
+MAX_CROP_FRACTION = 0.8
+# Cada cuánto se comprueba la cancelación mientras se esperan las franjas.
+CANCEL_POLL_INTERVAL = 0.05
+
+_TSV_FIELDS = (
+    "level",
+    "page_num",
+    "block_num",
+    "par_num",
+    "line_num",
+    "word_num",
+    "left",
+    "top",
+    "width",
+    "height",
+    "conf",
+    "text",
+)
+_TSV_COLUMNS = len(_TSV_FIELDS)
+_TSV_TEXT = _TSV_COLUMNS - 1
+
+
+@dataclass(slots=True)
 class TextBlock:
     text: str
     x: int
@@ -38,6 +102,225 @@ class TextBlock:
     line_num: int | None = None
 
 
+class TextBlockArray:
+    """Colección de bloques almacenada por columnas.
+
+    Evita crear un objeto por palabra en pantallas densas: las coordenadas
+    y metadatos viven en `array`s tipados y solo se materializan
+    `TextBlock` al iterar o indexar. Los números de bloque/párrafo/línea
+    ausentes se guardan como 0.
+    """
+
+    __slots__ = ("text", "x", "y", "w", "h", "confidence", "par_num", "block_num", "line_num")
+
+    def __init__(self) -> None:
+        self.text: List[str] = []
+        self.x = array("i")
+        self.y = array("i")
+        self.w = array("i")
+        self.h = array("i")
+        self.confidence = array("d")
+        self.par_num = array("i")
+        self.block_num = array("i")
+        self.line_num = array("i")
+
+    @classmethod
+    def from_blocks(cls, blocks: Iterable[TextBlock]) -> "TextBlockArray":
+        result = cls()
+        for block in blocks:
+            result.append(block)
+        return result
+
+    @classmethod
+    def from_tsv(cls, tsv: str) -> "TextBlockArray":
+        """Parsea la salida TSV de Tesseract en columnas de una sola pasada.
+
+        Acepta tanto la salida de la CLI (con cabecera) como la de la API C,
+        que no la incluye. Solo se conservan las filas con texto.
+        """
+
+        rows = [
+            fields
+            for fields in (line.split("\t") for line in tsv.split("\n"))
+            if len(fields) == _TSV_COLUMNS and fields[_TSV_TEXT].strip() and fields[0] != "level"
+        ]
+        result = cls()
+        if not rows:
+            return result
+
+        columns = list(zip(*rows))
+        try:
+            result.block_num = array("i", map(int, columns[2]))
+            result.par_num = array("i", map(int, columns[3]))
+            result.line_num = array("i", map(int, columns[4]))
+            result.x = array("i", map(int, columns[6]))
+            result.y = array("i", map(int, columns[7]))
+            result.w = array("i", map(int, columns[8]))
+            result.h = array("i", map(int, columns[9]))
+            result.confidence = array("d", map(float, columns[10]))
+        except ValueError:
+            # Alguna fila malformada: recurrimos al parseo fila a fila.
+            return cls._from_rows(rows)
+        result.text = [text.strip() for text in columns[_TSV_TEXT]]
+        return result
+
+    @classmethod
+    def _from_rows(cls, rows: List[List[str]]) -> "TextBlockArray":
+        result = cls()
+        for fields in rows:
+            try:
+                x, y, w, h = (int(v) for v in fields[6:10])
+            except ValueError:
+                continue
+            try:
+                conf = float(fields[10])
+            except ValueError:
+                conf = 0.0
+            try:
+                block_num, par_num, line_num = (int(v) for v in fields[2:5])
+            except ValueError:
+                block_num = par_num = line_num = 0
+            result.text.append(fields[_TSV_TEXT].strip())
+            result.x.append(x)
+            result.y.append(y)
+            result.w.append(w)
+            result.h.append(h)
+            result.confidence.append(conf)
+            result.block_num.append(block_num)
+            result.par_num.append(par_num)
+            result.line_num.append(line_num)
+        return result
+
+    def __len__(self) -> int:
+        return len(self.text)
+
+    def __bool__(self) -> bool:
+        return bool(self.text)
+
+    def __getitem__(self, index: int) -> TextBlock:
+        return TextBlock(
+            text=self.text[index],
+            x=self.x[index],
+            y=self.y[index],
+            w=self.w[index],
+            h=self.h[index],
+            confidence=self.confidence[index],
+            par_num=self.par_num[index] or None,
+            block_num=self.block_num[index] or None,
+            line_num=self.line_num[index] or None,
+        )
+
+    def __iter__(self) -> Iterator[TextBlock]:
+        for index in range(len(self.text)):
+            yield self[index]
+
+    def append(self, block: TextBlock) -> None:
+        self.text.append(block.text)
+        self.x.append(block.x)
+        self.y.append(block.y)
+        self.w.append(block.w)
+        self.h.append(block.h)
+        self.confidence.append(block.confidence)
+        self.par_num.append(block.par_num or 0)
+        self.block_num.append(block.block_num or 0)
+        self.line_num.append(block.line_num or 0)
+
+    def extend(self, other: "TextBlockArray") -> None:
+        self.text.extend(other.text)
+        self.x.extend(other.x)
+        self.y.extend(other.y)
+        self.w.extend(other.w)
+        self.h.extend(other.h)
+        self.confidence.extend(other.confidence)
+        self.par_num.extend(other.par_num)
+        self.block_num.extend(other.block_num)
+        self.line_num.extend(other.line_num)
+
+    def select(self, indices: Iterable[int]) -> "TextBlockArray":
+        """Nueva colección con las filas indicadas, en ese orden."""
+
+        indices = list(indices)
+        result = TextBlockArray()
+        result.text = [self.text[i] for i in indices]
+        for name in ("x", "y", "w", "h", "confidence", "par_num", "block_num", "line_num"):
+            column = getattr(self, name)
+            setattr(result, name, array(column.typecode, [column[i] for i in indices]))
+        return result
+
+    def with_min_confidence(self, min_conf: float) -> "TextBlockArray":
+        conf = self.confidence
+        return self.select(i for i in range(len(conf)) if conf[i] >= min_conf)
+
+    def has_line_info(self) -> bool:
+        return any(self.line_num)
+
+
+def _merge_line(words: TextBlockArray, indices: List[int]) -> TextBlock:
+    indices = sorted(indices, key=lambda i: words.x[i])
+    xs, ys, ws, hs, conf = words.x, words.y, words.w, words.h, words.confidence
+    x = min(xs[i] for i in indices)
+    y = min(ys[i] for i in indices)
+    right = max(xs[i] + ws[i] for i in indices)
+    bottom = max(ys[i] + hs[i] for i in indices)
+    return TextBlock(
+        text=" ".join(words.text[i] for i in indices),
+        x=x,
+        y=y,
+        w=right - x,
+        h=bottom - y,
+        confidence=sum(conf[i] for i in indices) / len(indices),
+        par_num=words.par_num[indices[0]] or None,
+        block_num=words.block_num[indices[0]] or None,
+        line_num=words.line_num[indices[0]] or None,
+    )
+
+
+def group_blocks_by_line(blocks: TextBlockArray | Iterable[TextBlock]) -> List[TextBlock]:
+    """Agrupa bloques palabra a palabra en líneas más grandes.
+
+    Trabaja sobre las columnas de `TextBlockArray` sin crear un objeto por
+    palabra; solo se materializa un `TextBlock` por línea resultante.
+    """
+
+    words = blocks if isinstance(blocks, TextBlockArray) else TextBlockArray.from_blocks(blocks)
+    if not words:
+        return []
+
+    # Si Tesseract ha devuelto metadatos de línea, los usamos para agrupar.
+    if words.has_line_info():
+        groups: Dict[Tuple[int, int, int], List[int]] = {}
+        for i in range(len(words)):
+            # Bloque antes que párrafo: con franjas, cada una reinicia par_num
+            # y solo block_num (desplazado por franja) da el orden de lectura.
+            key = (words.block_num[i], words.par_num[i], words.line_num[i])
+            groups.setdefault(key, []).append(i)
+        return [_merge_line(words, groups[key]) for key in sorted(groups)]
+
+    # Fallback geométrico si no hay metadatos de línea: se decide qué
+    # palabras pertenecen a la misma línea visual por su centro vertical.
+    ys, hs = words.y, words.h
+    order = sorted(range(len(words)), key=lambda i: (ys[i], words.x[i]))
+    threshold = (max(hs) or 1) * 0.7
+
+    lines: List[List[int]] = []
+    current_line: List[int] = []
+    current_center_y: float | None = None
+    for i in order:
+        center_y = ys[i] + hs[i] / 2.0
+        if current_line and current_center_y is not None and abs(center_y - current_center_y) <= threshold:
+            current_line.append(i)
+            current_center_y = (current_center_y * (len(current_line) - 1) + center_y) / len(current_line)
+        else:
+            if current_line:
+                lines.append(current_line)
+            current_line = [i]
+            current_center_y = center_y
+    if current_line:
+        lines.append(current_line)
+
+    return [_merge_line(words, line) for line in lines]
+
+
 def _tesseract_lang(code: str) -> str:
     if code == "auto":
         codes = set(LANG_MAP.values())
@@ -125,134 +408,576 @@ def _configure_tesseract_cmd_if_needed() -> None:
             return
 
 
-def extract_text_blocks(image: Image.Image, lang_code: str = "auto", min_conf: float = 60.0) -> List[TextBlock]:
-    """Ejecuta Tesseract directamente y parsea la salida TSV.
+@dataclass
+class OcrResult:
+    """Resultado completo de una única pasada de Tesseract.
+
+    Contiene todas las palabras reconocidas, sin filtrar por confianza,
+    para que el llamador pueda aplicar distintos umbrales sin volver a
+    ejecutar el OCR.
+    """
+
+    words: TextBlockArray
+    width: int
+    height: int
+
+    @property
+    def text(self) -> str:
+        """Texto plano reconstruido a partir de la estructura de líneas."""
+
+        words = self.words
+        lines: List[str] = []
+        current: List[str] = []
+        prev_line: tuple | None = None
+        prev_par: tuple | None = None
+        for i in range(len(words)):
+            par_key = (words.block_num[i], words.par_num[i])
+            line_key = (words.block_num[i], words.par_num[i], words.line_num[i])
+            if current and line_key != prev_line:
+                lines.append(" ".join(current))
+                current = []
+                if par_key != prev_par:
+                    lines.append("")
+            current.append(words.text[i])
+            prev_line = line_key
+            prev_par = par_key
+        if current:
+            lines.append(" ".join(current))
+        return "\n".join(lines).strip()
+
+    def to_dict(self) -> Dict[str, Any]:
+        words = self.words
+        return {
+            "width": self.width,
+            "height": self.height,
+            "words": {
+                "text": words.text,
+                "x": words.x.tolist(),
+                "y": words.y.tolist(),
+                "w": words.w.tolist(),
+                "h": words.h.tolist(),
+                "confidence": words.confidence.tolist(),
+                "par_num": words.par_num.tolist(),
+                "block_num": words.block_num.tolist(),
+                "line_num": words.line_num.tolist(),
+            },
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "OcrResult":
+        columns = data.get("words") or {}
+        words = TextBlockArray()
+        words.text = list(columns.get("text", []))
+        for name in ("x", "y", "w", "h", "par_num", "block_num", "line_num"):
+            setattr(words, name, array("i", columns.get(name, [])))
+        words.confidence = array("d", columns.get("confidence", []))
+        return cls(words=words, width=int(data["width"]), height=int(data["height"]))
+
+    def blocks(self, min_conf: float = 60.0) -> TextBlockArray:
+        """Palabras con confianza >= `min_conf`.
+
+        Si ninguna supera el umbral, se devuelve un único bloque con todo
+        el texto reconocido cubriendo la región completa.
+        """
+
+        blocks = self.words.with_min_confidence(min_conf)
+        if blocks:
+            return blocks
+
+        plain_text = self.text
+        if not plain_text:
+            return blocks
+        return TextBlockArray.from_blocks([
+            TextBlock(
+                text=plain_text,
+                x=0,
+                y=0,
+                w=self.width,
+                h=self.height,
+                confidence=100.0,
+            )
+        ])
+
+
+def default_preprocess_options() -> PreprocessOptions:
+    """Opciones de preprocesado por defecto.
+
+    SCREENSTRANSLATE_OCR_PREPROCESS=0 desactiva todos los pasos, útil para
+    comparar tiempos de OCR con y sin preprocesado.
+    """
+
+    if os.getenv("SCREENSTRANSLATE_OCR_PREPROCESS", "1") == "0":
+        return PreprocessOptions(grayscale=False, rescale=False, binarize=False, invert=False)
+    return PreprocessOptions()
+
+
+def _rescale_words(words: TextBlockArray, factor: float) -> None:
+    """Lleva las cajas de la imagen preprocesada a la captura original."""
+
+    xs, ys, ws, hs = words.x, words.y, words.w, words.h
+    for i in range(len(xs)):
+        right = round((xs[i] + ws[i]) * factor)
+        bottom = round((ys[i] + hs[i]) * factor)
+        xs[i] = int(xs[i] * factor)
+        ys[i] = int(ys[i] * factor)
+        ws[i] = max(1, right - xs[i])
+        hs[i] = max(1, bottom - ys[i])
+
+
+def _offset_words(words: TextBlockArray, dx: int, dy: int) -> None:
+    """Desplaza las cajas de un recorte a coordenadas de la captura completa."""
+
+    xs, ys = words.x, words.y
+    for i in range(len(xs)):
+        xs[i] += dx
+        ys[i] += dy
+
+
+_ocr_cache: OcrCache[OcrResult] | None = None
+_ocr_cache_loaded = False
+_ocr_cache_lock = threading.Lock()
+
+
+def get_ocr_cache() -> OcrCache[OcrResult] | None:
+    """Caché compartida de resultados de OCR (None si está desactivada)."""
+
+    global _ocr_cache, _ocr_cache_loaded
+    with _ocr_cache_lock:
+        if not _ocr_cache_loaded:
+            _ocr_cache = create_ocr_cache_from_env(OcrResult.from_dict)
+            _ocr_cache_loaded = True
+        return _ocr_cache
+
+
+_region_langs: "OrderedDict[Hashable, str]" = OrderedDict()
+_region_langs_lock = threading.Lock()
+
+
+def _parse_osd_output(output: str) -> Tuple[str, float] | None:
+    script: str | None = None
+    confidence = 0.0
+    for line in output.splitlines():
+        key, _, value = line.partition(":")
+        key = key.strip()
+        if key == "Script":
+            script = value.strip()
+        elif key == "Script confidence":
+            try:
+                confidence = float(value.strip())
+            except ValueError:
+                confidence = 0.0
+    if not script:
+        return None
+    return script, confidence
+
+
+def _detect_script(
+    image: Image.Image,
+    tesseract_cmd: str,
+    capi: TesseractCApi | None,
+    cancel_token: CancellationToken | None = None,
+) -> Tuple[str, float] | None:
+    """Detecta el script dominante con el OSD de Tesseract (psm 0)."""
+
+    logger = logging.getLogger(__name__)
+
+    if max(image.size) > OSD_MAX_SIDE:
+        image = image.copy()
+        image.thumbnail((OSD_MAX_SIDE, OSD_MAX_SIDE))
+
+    if capi is not None:
+        try:
+            return capi.detect_script(image)
+        except TesseractCApiError as exc:
+            logger.debug("OSD en proceso no disponible: %s", exc)
+
+    exe_path = Path(tesseract_cmd)
+    if not exe_path.is_file():
+        return None
+    proc = _run_tesseract_cli(exe_path, _encode_pnm(image), ["--psm", "0"], cancel_token)
+    if proc.returncode != 0:
+        # Normalmente falta osd.traineddata.
+        logger.debug("OSD de Tesseract no disponible: %s", proc.stderr[:200])
+        return None
+    return _parse_osd_output(proc.stdout)
+
+
+def _auto_lang(
+    image: Image.Image,
+    region_key: Hashable | None,
+    tesseract_cmd: str,
+    capi: TesseractCApi | None,
+    cancel_token: CancellationToken | None = None,
+) -> str:
+    """Elige el conjunto mínimo de modelos para el modo "auto".
+
+    El resultado se recuerda por región para que las capturas repetidas
+    de la misma zona no vuelvan a pagar la detección.
+    """
+
+    logger = logging.getLogger(__name__)
+
+    if region_key is not None:
+        with _region_langs_lock:
+            cached = _region_langs.get(region_key)
+            if cached is not None:
+                _region_langs.move_to_end(region_key)
+                return cached
+
+    lang = _tesseract_lang("auto")
+    detected = _detect_script(image, tesseract_cmd, capi, cancel_token)
+    if detected is not None:
+        script, confidence = detected
+        logger.info("Script detectado por OSD: %s (confianza %.2f)", script, confidence)
+        if confidence >= MIN_SCRIPT_CONFIDENCE:
+            lang = SCRIPT_LANGS.get(script, lang)
+
+    if region_key is not None:
+        with _region_langs_lock:
+            _region_langs[region_key] = lang
+            while len(_region_langs) > MAX_CACHED_REGIONS:
+                _region_langs.popitem(last=False)
+    return lang
+
+
+def _forget_region_lang(region_key: Hashable | None) -> None:
+    if region_key is None:
+        return
+    with _region_langs_lock:
+        _region_langs.pop(region_key, None)
+
+
+def recognize(
+    image: Image.Image,
+    lang_code: str = "auto",
+    region_key: Hashable | None = None,
+    preprocess_options: PreprocessOptions | None = None,
+    cancel_token: CancellationToken | None = None,
+) -> OcrResult:
+    """Ejecuta una única pasada de OCR sobre la imagen capturada.
+
+    Se usa el motor en proceso (libtesseract vía ctypes) cuando está
+    disponible; si no, o si falla, se ejecuta el binario de Tesseract.
+
+    Con `lang_code="auto"`, un pre-paso de OSD elige los modelos a cargar;
+    `region_key` (por ejemplo, el rectángulo capturado) permite reutilizar
+    esa elección en capturas posteriores de la misma región.
+
+    La captura se preprocesa (ver `preprocess`) con `preprocess_options`
+    o, si es None, con las opciones por defecto; las cajas devueltas están
+    siempre en coordenadas de la captura original.
+
+    Antes del OCR, un detector rápido de texto (ver `text_detect`) permite
+    omitir capturas sin texto y recortar a la zona que lo contiene.
+
+    Si `cancel_token` se cancela, se mata el proceso de Tesseract en curso
+    (o se interrumpe libtesseract) y se lanza `JobCancelled`.
+    """
+
+    _configure_tesseract_cmd_if_needed()
+    logger = logging.getLogger(__name__)
+
+    tesseract_cmd = getattr(pytesseract, "tesseract_cmd", "tesseract")
+
+    # El resultado se guarda sin filtrar, así que min_conf no forma parte
+    # de la clave: cualquier umbral se aplica después sobre el mismo valor.
+    cache = get_ocr_cache()
+    options = preprocess_options if preprocess_options is not None else default_preprocess_options()
+    cache_key = cache.make_key(image, (lang_code, TESSERACT_PSM, options)) if cache is not None else None
+    if cache is not None and cache_key is not None:
+        cached = cache.get(cache_key)
+        stats = cache.stats()
+        logger.debug(
+            "Caché OCR: hits=%s misses=%s disco=%s perceptual=%s entradas=%s",
+            stats.hits,
+            stats.misses,
+            stats.disk_hits,
+            stats.perceptual_hits,
+            stats.entries,
+        )
+        if cached is not None:
+            logger.info("Resultado de OCR servido desde caché")
+            return cached
+
+    started = time.perf_counter()
+    img_w, img_h = image.size
+
+    # Pre-paso barato: si no hay nada parecido a texto no se lanza el OCR,
+    # y si el texto ocupa solo una parte se reconoce únicamente esa zona.
+    source = image
+    offset_x = offset_y = 0
+    if text_detection_enabled():
+        regions = find_text_regions(image)
+        detect_ms = (time.perf_counter() - started) * 1000
+        if not regions:
+            logger.info("No se detecta texto en la captura (%.1f ms); se omite el OCR", detect_ms)
+            result = OcrResult(words=TextBlockArray(), width=img_w, height=img_h)
+            if cache is not None and cache_key is not None:
+                cache.put(cache_key, result)
+            return result
+
+        crop_x, crop_y, crop_w, crop_h = union_box(regions)
+        if crop_w * crop_h < img_w * img_h * MAX_CROP_FRACTION:
+            logger.info("Zona con texto %sx%s de %sx%s (%.1f ms)", crop_w, crop_h, img_w, img_h, detect_ms)
+            source = image.crop((crop_x, crop_y, crop_x + crop_w, crop_y + crop_h))
+            offset_x, offset_y = crop_x, crop_y
+
+    if cancel_token is not None:
+        cancel_token.raise_if_cancelled()
+    prepared = preprocess(source, options)
+    ocr_image = prepared.image
+
+    capi = get_tesseract_capi(tesseract_cmd)
+
+    if lang_code == "auto":
+        lang = _auto_lang(ocr_image, region_key, tesseract_cmd, capi, cancel_token)
+    else:
+        lang = _tesseract_lang(lang_code)
+
+    words = _recognize_words(ocr_image, lang, tesseract_cmd, cancel_token)
+    if prepared.scale != 1.0:
+        _rescale_words(words, 1.0 / prepared.scale)
+    if offset_x or offset_y:
+        _offset_words(words, offset_x, offset_y)
+
+    result = OcrResult(words=words, width=img_w, height=img_h)
+    logger.info(
+        "OCR completado en %.1f ms (preprocesado %.1f ms, escala %.2f, idiomas %s)",
+        (time.perf_counter() - started) * 1000,
+        sum(prepared.timings.values()),
+        prepared.scale,
+        lang,
+    )
+    if lang_code == "auto" and not result.words:
+        # El contenido de la región puede haber cambiado de idioma.
+        _forget_region_lang(region_key)
+    if cache is not None and cache_key is not None:
+        cache.put(cache_key, result)
+    return result
+
+
+def _run_engine(
+    image: Image.Image,
+    lang: str,
+    tesseract_cmd: str,
+    cancel_token: CancellationToken | None = None,
+) -> str:
+    """Reconoce `image` y devuelve el TSV, con el motor en proceso o la CLI."""
+
+    capi = get_tesseract_capi(tesseract_cmd)
+    if capi is not None:
+        should_cancel = (lambda: cancel_token.cancelled) if cancel_token is not None else None
+        try:
+            return capi.recognize_tsv(image, lang, psm=TESSERACT_PSM, should_cancel=should_cancel)
+        except TesseractCApiError as exc:
+            if cancel_token is not None:
+                # Un Recognize interrumpido también falla: no es motivo para
+                # repetir el trabajo con la CLI.
+                cancel_token.raise_if_cancelled()
+            logging.getLogger(__name__).warning("Fallo del motor OCR en proceso, se usa la CLI: %s", exc)
+    return _recognize_tsv_with_cli(image, tesseract_cmd, lang, cancel_token)
+
+
+def _recognize_tile_worker(image: Image.Image, lang: str, tesseract_cmd: str) -> str | None:
+    """Punto de entrada en los procesos del pool de franjas.
+
+    Devuelve None si no hay Tesseract: TesseractNotFoundError no se puede
+    reconstruir al volver del proceso hijo.
+    """
+
+    try:
+        return _run_engine(image, lang, tesseract_cmd)
+    except TesseractNotFoundError:
+        return None
+
+
+def _merge_tile_words(tiles: Sequence[Tile], tile_words: Iterable[TextBlockArray]) -> TextBlockArray:
+    """Une las palabras de cada franja en coordenadas de la imagen completa.
+
+    Se ajusta `y` al origen de la imagen, se descartan las palabras cuyo
+    centro cae fuera de la zona de la franja (duplicados del solape) y se
+    desplaza `block_num` para no mezclar bloques de franjas distintas. El
+    resultado queda en orden de lectura: franja a franja, de arriba abajo.
+    """
+
+    merged = TextBlockArray()
+    for index, (tile, words) in enumerate(zip(tiles, tile_words)):
+        owned = words.select(owned_indices(tile, words.y, words.h))
+        for i in range(len(owned)):
+            owned.y[i] += tile.top
+            if owned.block_num[i]:
+                owned.block_num[i] += index * TILE_BLOCK_STRIDE
+        merged.extend(owned)
+    return merged
+
+
+def _wait_tiles(futures: List[Any], cancel_token: CancellationToken | None) -> List[Any]:
+    """Espera los resultados de las franjas atendiendo a la cancelación.
+
+    Al cancelar se descartan las franjas pendientes; las que ya se están
+    reconociendo terminan en su proceso, pero su resultado se ignora.
+    """
+
+    pending = set(futures)
+    while pending:
+        if cancel_token is not None and cancel_token.cancelled:
+            for future in pending:
+                future.cancel()
+            cancel_token.raise_if_cancelled()
+        timeout = CANCEL_POLL_INTERVAL if cancel_token is not None else None
+        _, pending = wait(pending, timeout=timeout, return_when=FIRST_COMPLETED)
+    return [future.result() for future in futures]
+
+
+def _recognize_words(
+    image: Image.Image,
+    lang: str,
+    tesseract_cmd: str,
+    cancel_token: CancellationToken | None = None,
+) -> TextBlockArray:
+    """Reconoce la imagen completa o, si es muy alta, por franjas en paralelo."""
+
+    logger = logging.getLogger(__name__)
+
+    tiles = plan_tiles(image) if tiling_enabled() else []
+    if len(tiles) > 1:
+        logger.info("OCR por franjas: %s franjas", len(tiles))
+        try:
+            pool = get_tile_pool()
+            futures = [
+                pool.submit(_recognize_tile_worker, image.crop((0, tile.top, image.width, tile.bottom)), lang, tesseract_cmd)
+                for tile in tiles
+            ]
+            tsvs = _wait_tiles(futures, cancel_token)
+        except BrokenProcessPool:
+            logger.warning("El pool de OCR por franjas ha fallado; se reconoce la imagen completa")
+            reset_tile_pool()
+        else:
+            if any(tsv is None for tsv in tsvs):
+                raise TesseractNotFoundError()
+            return _merge_tile_words(tiles, (TextBlockArray.from_tsv(tsv or "") for tsv in tsvs))
+
+    return TextBlockArray.from_tsv(_run_engine(image, lang, tesseract_cmd, cancel_token))
+
+
+def extract_text_block_array(
+    image: Image.Image,
+    lang_code: str = "auto",
+    min_conf: float = 60.0,
+    region_key: Hashable | None = None,
+    cancel_token: CancellationToken | None = None,
+) -> TextBlockArray:
+    """Extrae los bloques de texto de la imagen capturada, por columnas.
+
+    Equivale a `recognize(image, lang_code, region_key).blocks(min_conf)`
+    con el preprocesado por defecto. Es lo que usa el flujo de traducción:
+    no crea un `TextBlock` por palabra.
+    """
+
+    return recognize(image, lang_code, region_key, cancel_token=cancel_token).blocks(min_conf)
+
+
+def extract_text_blocks(
+    image: Image.Image,
+    lang_code: str = "auto",
+    min_conf: float = 60.0,
+    region_key: Hashable | None = None,
+    cancel_token: CancellationToken | None = None,
+) -> List[TextBlock]:
+    """Extrae bloques de texto con coordenadas de la imagen capturada.
+
+    Devuelve una lista de `TextBlock`, como siempre; `extract_text_block_array`
+    da lo mismo por columnas.
+    """
+
+    return list(extract_text_block_array(image, lang_code, min_conf, region_key, cancel_token))
+
+
+def _recognize_tsv_with_cli(
+    image: Image.Image,
+    tesseract_cmd: str,
+    lang: str,
+    cancel_token: CancellationToken | None = None,
+) -> str:
+    """Ejecuta Tesseract directamente y devuelve la salida TSV.
 
     Se evita el chequeo interno de versiÃ³n de pytesseract, que en este
     entorno concreto estÃ¡ devolviendo TesseractNotFoundError a pesar de
     que el ejecutable funciona.
     """
 
-    _configure_tesseract_cmd_if_needed()
     logger = logging.getLogger(__name__)
 
-    tesseract_cmd = getattr(pytesseract, "tesseract_cmd", "tesseract")
     exe_path = Path(tesseract_cmd)
     if not exe_path.is_file():
         logger.error("No se ha encontrado el ejecutable de Tesseract en: %s", exe_path)
         raise TesseractNotFoundError()
 
-    lang = _tesseract_lang(lang_code)
+    # La imagen viaja en memoria por stdin como PNM (sin compresión ni
+    # ficheros temporales).
+    proc = _run_tesseract_cli(
+        exe_path,
+        _encode_pnm(image),
+        ["-l", lang, "--psm", str(TESSERACT_PSM), "tsv"],
+        cancel_token,
+    )
+    if proc.returncode != 0:
+        logger.error("Tesseract devolviÃ³ cÃ³digo %s: %s", proc.returncode, proc.stderr[:500])
+        # Si no se puede ejecutar, lo tratamos como no encontrado.
+        raise TesseractNotFoundError()
 
-    # Guardar la imagen en un fichero temporal para pasarlo a Tesseract.
-    with tempfile.NamedTemporaryFile(suffix=".png", delete=False) as tmp:
-        tmp_path = Path(tmp.name)
-        image.save(tmp_path, format="PNG")
+    return proc.stdout
 
-    try:
-        # Primero intentamos obtener bloques con coordenadas vÃ­a TSV.
-        cmd = f'"{exe_path}" "{tmp_path}" stdout -l {lang} --psm 6 tsv'
-        logger.info("Ejecutando comando Tesseract: %s", cmd)
-        proc = subprocess.run(
-            cmd,
-            shell=True,
-            stdout=subprocess.PIPE,
-            stderr=subprocess.PIPE,
-            encoding="utf-8",
-            errors="ignore",
-            check=False,
-        )
 
-        if proc.returncode != 0:
-            logger.error("Tesseract devolviÃ³ cÃ³digo %s: %s", proc.returncode, proc.stderr[:500])
-            # Si no se puede ejecutar, lo tratamos como no encontrado.
-            raise TesseractNotFoundError()
-
-        lines = proc.stdout.splitlines()
-        blocks: List[TextBlock] = []
-        if lines:
-            reader = csv.DictReader(lines, delimiter="\t")
-            for row in reader:
-                text = (row.get("text") or "").strip()
-                if not text:
-                    continue
-
-                try:
-                    conf = float(row.get("conf") or "0")
-                except ValueError:
-                    conf = 0.0
-
-                if conf < min_conf:
-                    continue
-
-                try:
-                    x = int(row.get("left") or 0)
-                    y = int(row.get("top") or 0)
-                    w = int(row.get("width") or 0)
-                    h = int(row.get("height") or 0)
-                except ValueError:
-                    continue
-
-                try:
-                    par_num = int(row.get("par_num") or 0)
-                    block_num = int(row.get("block_num") or 0)
-                    line_num = int(row.get("line_num") or 0)
-                except ValueError:
-                    par_num = block_num = line_num = 0
-
-                blocks.append(
-                    TextBlock(
-                        text=text,
-                        x=x,
-                        y=y,
-                        w=w,
-                        h=h,
-                        confidence=conf,
-                        par_num=par_num or None,
-                        block_num=block_num or None,
-                        line_num=line_num or None,
-                    )
-                )
+def _encode_pnm(image: Image.Image) -> bytes:
+    """Serializa la imagen como PPM/PGM binario (cabecera + pÃ­xeles en crudo)."""
 
-        if blocks:
-            return blocks
+    if image.mode not in ("RGB", "L"):
+        image = image.convert("RGB")
+    buf = io.BytesIO()
+    image.save(buf, format="PPM")
+    return buf.getvalue()
 
-        # Fallback: si no hay bloques, pedimos solo texto plano y
-        # devolvemos un Ãºnico bloque que cubre toda la regiÃ³n.
-        cmd_plain = f'"{exe_path}" "{tmp_path}" stdout -l {lang}'
-        logger.info("Ejecutando comando Tesseract (texto plano): %s", cmd_plain)
-        proc2 = subprocess.run(
-            cmd_plain,
-            shell=True,
-            stdout=subprocess.PIPE,
-            stderr=subprocess.PIPE,
-            encoding="utf-8",
-            errors="ignore",
-            check=False,
-        )
 
-        if proc2.returncode != 0:
-            logger.error("Tesseract (texto plano) devolviÃ³ cÃ³digo %s: %s", proc2.returncode, proc2.stderr[:500])
-            return []
+def _run_tesseract_cli(
+    exe_path: Path,
+    image_bytes: bytes,
+    args: List[str],
+    cancel_token: CancellationToken | None = None,
+) -> subprocess.CompletedProcess:
+    """Lanza Tesseract con la imagen por stdin.
 
-        plain_text = proc2.stdout.strip()
-        if not plain_text:
-            return []
+    Si `cancel_token` se cancela mientras se ejecuta, el proceso hijo se
+    mata y se lanza `JobCancelled` (o `DeadlineExceeded`).
+    """
 
-        img_w, img_h = image.size
-        return [
-            TextBlock(
-                text=plain_text,
-                x=0,
-                y=0,
-                w=img_w,
-                h=img_h,
-                confidence=100.0,
-            )
-        ]
+    cmd = [str(exe_path), "stdin", "stdout", *args]
+    logging.getLogger(__name__).info("Ejecutando comando Tesseract: %s", subprocess.list2cmdline(cmd))
+    if cancel_token is not None:
+        cancel_token.raise_if_cancelled()
+    proc = subprocess.Popen(
+        cmd,
+        stdin=subprocess.PIPE,
+        stdout=subprocess.PIPE,
+        stderr=subprocess.PIPE,
+        # Evita que se abra una consola en Windows al lanzar Tesseract.
+        creationflags=getattr(subprocess, "CREATE_NO_WINDOW", 0),
+    )
+    unregister = cancel_token.on_cancel(proc.kill) if cancel_token is not None else None
+    try:
+        stdout, stderr = proc.communicate(image_bytes)
+    except BaseException:
+        proc.kill()
+        proc.wait()
+        raise
     finally:
-        try:
-            tmp_path.unlink(missing_ok=True)
-        except Exception:
-            logger.debug("No se pudo eliminar el fichero temporal de imagen: %s", tmp_path)
-
+        if unregister is not None:
+            unregister()
+    if cancel_token is not None:
+        cancel_token.raise_if_cancelled()
+    return subprocess.CompletedProcess(
+        proc.args,
+        proc.returncode,
+        stdout=stdout.decode("utf-8", errors="ignore"),
+        stderr=stderr.decode("utf-8", errors="ignore"),
+    )
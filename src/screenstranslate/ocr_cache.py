@@ -0,0 +1,256 @@
+"""Caché de resultados de OCR direccionada por contenido.
+
+Las capturas repetidas del mismo diálogo, menú o subtítulo producen los
+mismos píxeles, así que guardamos el resultado de OCR indexado por un hash
+rápido de la imagen y de los parámetros de reconocimiento.
+
+- Nivel en memoria: LRU acotado.
+- Nivel en disco (opcional): un JSON por entrada bajo `get_app_dir()`.
+- Modo perceptual (opcional): un dHash de la imagen permite reutilizar
+  resultados cuando solo cambian unos pocos píxeles (cursor parpadeando,
+  antialiasing, etc.).
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import logging
+import os
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Callable, Dict, Generic, Hashable, Tuple, TypeVar
+
+from PIL import Image
+
+from .config import get_app_dir
+
+
+OCR_CACHE_DIR_NAME = "ocr_cache"
+
+# Lado de la rejilla del dHash: 16x16 comparaciones = 256 bits.
+PHASH_SIZE = 16
+
+T = TypeVar("T")
+
+
+@dataclass(frozen=True)
+class OcrCacheKey:
+    digest: str
+    params: Tuple[Hashable, ...]
+    size: Tuple[int, int]
+    phash: int | None = None
+
+
+@dataclass
+class OcrCacheStats:
+    hits: int = 0
+    misses: int = 0
+    disk_hits: int = 0
+    perceptual_hits: int = 0
+    entries: int = 0
+
+    @property
+    def hit_rate(self) -> float:
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+
+def _dhash(image: Image.Image, size: int = PHASH_SIZE) -> int:
+    """Hash perceptual por diferencias horizontales de una miniatura en grises."""
+
+    small = image.convert("L").resize((size + 1, size), Image.BILINEAR)
+    pixels = small.tobytes()
+    value = 0
+    row_len = size + 1
+    for row in range(size):
+        offset = row * row_len
+        for col in range(size):
+            value = (value << 1) | (pixels[offset + col] > pixels[offset + col + 1])
+    return value
+
+
+class OcrCache(Generic[T]):
+    """LRU de resultados de OCR con nivel opcional en disco.
+
+    Los valores deben exponer `to_dict()`; `from_dict` se usa para
+    reconstruirlos al leer del disco.
+    """
+
+    def __init__(
+        self,
+        from_dict: Callable[[Dict[str, Any]], T],
+        max_entries: int = 128,
+        persist_dir: Path | None = None,
+        max_disk_entries: int = 2000,
+        perceptual: bool = False,
+        max_distance: int = 6,
+    ) -> None:
+        self._from_dict = from_dict
+        self.max_entries = max_entries
+        self.persist_dir = persist_dir
+        self.max_disk_entries = max_disk_entries
+        self.perceptual = perceptual
+        self.max_distance = max_distance
+        self._entries: "OrderedDict[OcrCacheKey, T]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._stats = OcrCacheStats()
+        self._disk_count: int | None = None
+
+        if self.persist_dir is not None:
+            self.persist_dir.mkdir(parents=True, exist_ok=True)
+
+    def make_key(self, image: Image.Image, params: Tuple[Hashable, ...]) -> OcrCacheKey:
+        hasher = hashlib.blake2b(digest_size=16)
+        hasher.update(f"{image.mode}:{image.size[0]}x{image.size[1]}:{params!r}".encode("utf-8"))
+        hasher.update(image.tobytes())
+        phash = _dhash(image) if self.perceptual else None
+        return OcrCacheKey(digest=hasher.hexdigest(), params=params, size=image.size, phash=phash)
+
+    def _disk_path(self, digest: str) -> Path:
+        assert self.persist_dir is not None
+        return self.persist_dir / digest[:2] / f"{digest}.json"
+
+    def get(self, key: OcrCacheKey) -> T | None:
+        with self._lock:
+            value = self._entries.get(key)
+            if value is not None:
+                self._entries.move_to_end(key)
+                self._stats.hits += 1
+                return value
+
+            if self.perceptual and key.phash is not None:
+                for other_key in reversed(self._entries):
+                    if (
+                        other_key.phash is not None
+                        and other_key.params == key.params
+                        and other_key.size == key.size
+                        and (other_key.phash ^ key.phash).bit_count() <= self.max_distance
+                    ):
+                        self._entries.move_to_end(other_key)
+                        self._stats.hits += 1
+                        self._stats.perceptual_hits += 1
+                        return self._entries[other_key]
+
+        value = self._load_from_disk(key)
+        with self._lock:
+            if value is None:
+                self._stats.misses += 1
+                return None
+            self._stats.hits += 1
+            self._stats.disk_hits += 1
+            self._remember(key, value)
+            return value
+
+    def put(self, key: OcrCacheKey, value: T) -> None:
+        with self._lock:
+            self._remember(key, value)
+        self._store_on_disk(key, value)
+
+    def _remember(self, key: OcrCacheKey, value: T) -> None:
+        self._entries[key] = value
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def _load_from_disk(self, key: OcrCacheKey) -> T | None:
+        if self.persist_dir is None:
+            return None
+        path = self._disk_path(key.digest)
+        try:
+            data = json.loads(path.read_text(encoding="utf-8"))
+            # Actualizamos mtime para que la expulsión en disco sea LRU.
+            os.utime(path)
+        except FileNotFoundError:
+            return None
+        except Exception:
+            logging.getLogger(__name__).debug("Entrada de caché OCR ilegible: %s", path)
+            return None
+        return self._from_dict(data)
+
+    def _store_on_disk(self, key: OcrCacheKey, value: T) -> None:
+        if self.persist_dir is None:
+            return
+        path = self._disk_path(key.digest)
+        try:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            path.write_text(json.dumps(value.to_dict(), ensure_ascii=False), encoding="utf-8")  # type: ignore[attr-defined]
+        except OSError:
+            logging.getLogger(__name__).exception("No se pudo guardar la entrada de caché OCR")
+            return
+
+        with self._lock:
+            if self._disk_count is None:
+                self._disk_count = sum(1 for _ in self.persist_dir.glob("*/*.json"))
+            else:
+                self._disk_count += 1
+            needs_eviction = self._disk_count > self.max_disk_entries
+        if needs_eviction:
+            self._evict_disk()
+
+    def _evict_disk(self) -> None:
+        assert self.persist_dir is not None
+        files = sorted(self.persist_dir.glob("*/*.json"), key=lambda p: p.stat().st_mtime)
+        # Dejamos margen para no recorrer el directorio en cada escritura.
+        target = int(self.max_disk_entries * 0.9)
+        excess = len(files) - target
+        for path in files[: max(0, excess)]:
+            try:
+                path.unlink()
+            except OSError:
+                pass
+        with self._lock:
+            self._disk_count = min(len(files), target)
+
+    def stats(self) -> OcrCacheStats:
+        with self._lock:
+            return OcrCacheStats(
+                hits=self._stats.hits,
+                misses=self._stats.misses,
+                disk_hits=self._stats.disk_hits,
+                perceptual_hits=self._stats.perceptual_hits,
+                entries=len(self._entries),
+            )
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._stats = OcrCacheStats()
+            self._disk_count = None
+        if self.persist_dir is not None:
+            for path in self.persist_dir.glob("*/*.json"):
+                try:
+                    path.unlink()
+                except OSError:
+                    pass
+
+
+def get_ocr_cache_dir() -> Path:
+    return get_app_dir() / OCR_CACHE_DIR_NAME
+
+
+def create_ocr_cache_from_env(from_dict: Callable[[Dict[str, Any]], T]) -> OcrCache[T] | None:
+    """Crea la caché según las variables de entorno.
+
+    - SCREENSTRANSLATE_OCR_CACHE_SIZE: entradas en memoria (0 la desactiva).
+    - SCREENSTRANSLATE_OCR_CACHE_DISK=1: activa el nivel persistente.
+    - SCREENSTRANSLATE_OCR_CACHE_PERCEPTUAL=1: activa el modo perceptual.
+    """
+
+    try:
+        max_entries = int(os.getenv("SCREENSTRANSLATE_OCR_CACHE_SIZE", "128"))
+    except ValueError:
+        max_entries = 128
+    if max_entries <= 0:
+        return None
+
+    persist_dir = get_ocr_cache_dir() if os.getenv("SCREENSTRANSLATE_OCR_CACHE_DISK", "0") == "1" else None
+    perceptual = os.getenv("SCREENSTRANSLATE_OCR_CACHE_PERCEPTUAL", "0") == "1"
+    return OcrCache(
+        from_dict,
+        max_entries=max_entries,
+        persist_dir=persist_dir,
+        perceptual=perceptual,
+    )
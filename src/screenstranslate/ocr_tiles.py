@@ -0,0 +1,178 @@
+"""OCR en paralelo por franjas para capturas grandes.
+
+Una captura de pantalla completa se reconoce en un único núcleo aunque el
+resto de la CPU esté libre. Aquí se divide la imagen en franjas
+horizontales, preferentemente por huecos en blanco entre líneas y, si no
+los hay, con solape, y se reconocen en un pool de procesos.
+
+Cada franja "posee" las palabras cuyo centro vertical cae en su zona, de
+modo que las palabras duplicadas en los solapes se descartan al unir.
+"""
+
+from __future__ import annotations
+
+import logging
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+from typing import List, Sequence
+
+import numpy as np
+from PIL import Image
+
+
+# Solo se divide a partir de esta altura (px de la imagen ya preprocesada).
+TILE_MIN_HEIGHT = 1400
+TILE_HEIGHT = 700
+# Solape cuando no se encuentra un hueco: debe superar la altura de línea.
+TILE_OVERLAP = 64
+# Filas en blanco consecutivas necesarias para cortar sin solape.
+MIN_GUTTER_ROWS = 6
+# Desplazamiento de block_num por franja para que sigan siendo únicos.
+TILE_BLOCK_STRIDE = 1000
+MAX_TILE_WORKERS = 4
+
+
+@dataclass(frozen=True)
+class Tile:
+    """Franja a reconocer (top/bottom) y zona cuyas palabras le pertenecen."""
+
+    top: int
+    bottom: int
+    own_top: int
+    own_bottom: int
+
+
+def tiling_enabled() -> bool:
+    if os.getenv("SCREENSTRANSLATE_OCR_TILING", "1") == "0":
+        return False
+    return tile_worker_count() > 1
+
+
+def tile_worker_count() -> int:
+    return max(1, min(MAX_TILE_WORKERS, (os.cpu_count() or 1) - 1))
+
+
+def _blank_rows(image: Image.Image) -> np.ndarray:
+    gray = np.asarray(image.convert("L"), dtype=np.uint8)
+    ink_per_row = (gray < 128).sum(axis=1)
+    # Toleramos algo de ruido (p. ej. bordes o líneas finas de la interfaz).
+    return ink_per_row <= max(1, gray.shape[1] // 500)
+
+
+def _find_gutter(blank: np.ndarray, start: int, end: int) -> int | None:
+    """Centro del hueco en blanco más bajo entre `start` y `end`, si existe."""
+
+    run_end: int | None = None
+    for y in range(end - 1, start - 1, -1):
+        if blank[y]:
+            if run_end is None:
+                run_end = y
+            if run_end - y + 1 >= MIN_GUTTER_ROWS:
+                # Extendemos el hueco hacia arriba para cortar por su centro.
+                top = y
+                while top > start and blank[top - 1]:
+                    top -= 1
+                return (top + run_end + 1) // 2
+        else:
+            run_end = None
+    return None
+
+
+def plan_tiles(image: Image.Image, tile_height: int = TILE_HEIGHT, overlap: int = TILE_OVERLAP) -> List[Tile]:
+    """Divide la imagen en franjas horizontales.
+
+    Devuelve una sola franja si la imagen no es lo bastante alta.
+    """
+
+    height = image.height
+    if height < TILE_MIN_HEIGHT:
+        return [Tile(0, height, 0, height)]
+
+    blank = _blank_rows(image)
+    cuts: List[tuple[int, bool]] = []
+    pos = 0
+    while height - pos > tile_height * 1.5:
+        target = pos + tile_height
+        gutter = _find_gutter(blank, target - tile_height // 4, target)
+        if gutter is not None:
+            cuts.append((gutter, False))
+            pos = gutter
+        else:
+            cuts.append((target, True))
+            pos = target
+
+    tiles: List[Tile] = []
+    own_top = 0
+    top = 0
+    for cut, overlapped in cuts:
+        bottom = min(height, cut + overlap) if overlapped else cut
+        tiles.append(Tile(top, bottom, own_top, cut))
+        own_top = cut
+        top = max(0, cut - overlap) if overlapped else cut
+    tiles.append(Tile(top, height, own_top, height))
+    return tiles
+
+
+def owned_indices(tile: Tile, ys: Sequence[int], hs: Sequence[int]) -> List[int]:
+    """Índices de las palabras (coordenadas relativas a la franja) que le pertenecen.
+
+    Una palabra pertenece a la franja cuyo centro vertical cae en su zona;
+    así se descartan los duplicados de los solapes.
+    """
+
+    offset = tile.top
+    return [
+        i
+        for i in range(len(ys))
+        if tile.own_top <= offset + ys[i] + hs[i] / 2.0 < tile.own_bottom
+    ]
+
+
+def _init_worker() -> None:
+    # Cada proceso del pool usa un solo hilo de OpenMP para no
+    # sobresuscribir la máquina (aplica también a la CLI que lance).
+    os.environ["OMP_THREAD_LIMIT"] = "1"
+
+
+_pool: ProcessPoolExecutor | None = None
+_pool_lock = threading.Lock()
+
+
+def get_tile_pool() -> ProcessPoolExecutor:
+    """Pool de procesos persistente para reconocer franjas.
+
+    Se usa "spawn" en todas las plataformas: los procesos arrancan limpios
+    y OMP_THREAD_LIMIT se fija antes de cargar libtesseract.
+    """
+
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = ProcessPoolExecutor(
+                max_workers=tile_worker_count(),
+                mp_context=multiprocessing.get_context("spawn"),
+                initializer=_init_worker,
+            )
+        return _pool
+
+
+def reset_tile_pool() -> None:
+    """Descarta el pool (por ejemplo, tras un BrokenProcessPool)."""
+
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.shutdown(wait=False, cancel_futures=True)
+            _pool = None
+            logging.getLogger(__name__).info("Pool de OCR por franjas reiniciado")
+
+
+def shutdown_tile_pool() -> None:
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.shutdown(wait=True, cancel_futures=True)
+            _pool = None
@@ -1,13 +1,18 @@
 ﻿from __future__ import annotations
 
 from dataclasses import dataclass
-from typing import Iterable, List
+from typing import Dict, Iterable, List, Set
 
 from PySide6.QtCore import QRect, Qt
 from PySide6.QtGui import QColor, QKeyEvent
 from PySide6.QtWidgets import QLabel, QWidget, QVBoxLayout
 
 
+# Estilo de las líneas aún sin traducir (se muestra el texto original).
+_LABEL_STYLE = "color: white; font-size: 15px;"
+_PENDING_LABEL_STYLE = "color: rgba(255, 255, 255, 140); font-size: 15px; font-style: italic;"
+
+
 @dataclass
 class OverlayBlock:
     text: str
@@ -18,11 +23,23 @@ class OverlayBlock:
 
 
 class TranslationOverlay(QWidget):
-    """Overlay que muestra los textos traducidos sobre la regiÃ³n capturada."""
-
-    def __init__(self, region: QRect, blocks: Iterable[OverlayBlock], parent: QWidget | None = None) -> None:
+    """Overlay que muestra los textos traducidos sobre la regiÃ³n capturada.
+
+    Con `pending=True` los bloques traen aún el texto original: se pintan
+    atenuados y `update_lines` los va sustituyendo por su traducción.
+    """
+
+    def __init__(
+        self,
+        region: QRect,
+        blocks: Iterable[OverlayBlock],
+        parent: QWidget | None = None,
+        pending: bool = False,
+    ) -> None:
         super().__init__(parent)
         self._blocks: List[OverlayBlock] = list(blocks)
+        self._labels: List[QLabel | None] = []
+        self._pending: Set[int] = set(range(len(self._blocks))) if pending else set()
 
         self.setWindowFlags(
             Qt.WindowStaysOnTopHint
@@ -56,16 +73,16 @@ class TranslationOverlay(QWidget):
         layout.setContentsMargins(12, 8, 12, 8)
         layout.setSpacing(4)
 
-        for block in self._blocks:
+        for index, block in enumerate(self._blocks):
             if not block.text.strip():
+                self._pending.discard(index)
+                self._labels.append(None)
                 continue
             label = QLabel(block.text, card)
             label.setWordWrap(True)
-            label.setStyleSheet(
-                "color: white;"
-                "font-size: 15px;"
-            )
+            label.setStyleSheet(_PENDING_LABEL_STYLE if index in self._pending else _LABEL_STYLE)
             layout.addWidget(label)
+            self._labels.append(label)
 
         # Estilo del panel de subtÃ­tulos.
         self.setStyleSheet(
@@ -78,6 +95,26 @@ class TranslationOverlay(QWidget):
         )
         self.show()
 
+    @property
+    def pending_lines(self) -> int:
+        """Líneas que todavía muestran el texto original."""
+
+        return len(self._pending)
+
+    def update_lines(self, lines: Dict[int, str]) -> None:
+        """Sustituye las líneas indicadas (posición → texto traducido)."""
+
+        for index, text in lines.items():
+            if not 0 <= index < len(self._blocks):
+                continue
+            label = self._labels[index]
+            if label is None:
+                continue
+            label.setText(text)
+            if index in self._pending:
+                self._pending.discard(index)
+                label.setStyleSheet(_LABEL_STYLE)
+
     def mousePressEvent(self, event) -> None:  # type: ignore[override]
         # Un clic en cualquier parte cierra el overlay.
         self.close()
@@ -0,0 +1,231 @@
+"""Flujo captura → OCR → traducción fuera del hilo de Qt.
+
+`TranslationPipeline` es un `QRunnable` que ejecuta las etapas de un
+`Job` en un `QThreadPool` y comunica su avance con `PipelineSignals`.
+Al hilo de la interfaz solo le llegan los `OverlayBlock` ya traducidos,
+para pintarlos, o la clave del mensaje de estado que debe mostrar.
+
+En cuanto termina el OCR se emite `ocrReady` con las líneas originales,
+para que el overlay aparezca ya, y después `linesReady` con cada grupo de
+líneas traducidas según llega. Se registran en `Job.timings` el tiempo
+hasta la primera y la última línea traducida (desde el inicio del trabajo).
+
+Los motores (captura, OCR, traducción e historial) se inyectan en el
+constructor, de modo que se pueden sustituir por versiones falsas.
+"""
+
+from __future__ import annotations
+
+import logging
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Callable, Dict, List, Set, Tuple
+
+from PIL import Image
+from PySide6.QtCore import QObject, QRunnable, Signal
+from pytesseract import TesseractNotFoundError
+
+from .capture import capture_region
+from .history import add_entries
+from .jobs import DeadlineExceeded, Job, JobCancelled
+from .layout import Paragraph, distribute_text, group_lines_into_paragraphs, paragraphs_enabled
+from .ocr import TextBlockArray, extract_text_block_array, group_blocks_by_line
+from .overlay import OverlayBlock
+from .translation import TranslationClient, TranslationError
+
+
+STAGE_CAPTURE = "capture"
+STAGE_OCR = "ocr"
+STAGE_TRANSLATE = "translate"
+
+TIMING_FIRST_LINE = "first_line"
+TIMING_LAST_LINE = "last_line"
+
+# Confianza mínima de OCR; baja para no perder texto en capturas difíciles.
+MIN_OCR_CONFIDENCE = 40.0
+
+Region = Tuple[int, int, int, int]
+
+
+@dataclass
+class PipelineRequest:
+    region: Region
+    source_lang: str
+    target_lang: str
+
+
+@dataclass
+class PipelineResult:
+    blocks: List[OverlayBlock]
+    source_texts: List[str]
+    timings: Dict[str, float] = field(default_factory=dict)
+
+
+class PipelineSignals(QObject):
+    """Señales del flujo; se crean en el hilo de Qt para recibirlas en él.
+
+    - stageChanged(job, etapa)
+    - ocrReady(job, lista de OverlayBlock con el texto original)
+    - linesReady(job, dict posición → texto traducido)
+    - finished(job, PipelineResult)
+    - failed(job, clave de UI_TEXTS con el mensaje de estado)
+    - cancelled(job)
+    """
+
+    stageChanged = Signal(object, str)
+    ocrReady = Signal(object, object)
+    linesReady = Signal(object, object)
+    finished = Signal(object, object)
+    failed = Signal(object, str)
+    cancelled = Signal(object)
+
+
+class TranslationPipeline(QRunnable):
+    def __init__(
+        self,
+        job: Job,
+        request: PipelineRequest,
+        signals: PipelineSignals,
+        translation_client: TranslationClient,
+        capture: Callable[[int, int, int, int], Image.Image] = capture_region,
+        ocr: Callable[..., TextBlockArray] = extract_text_block_array,
+        record_history: Callable[[List[Tuple[str, str]], str, str], object] = add_entries,
+    ) -> None:
+        super().__init__()
+        self.job = job
+        self.request = request
+        self.signals = signals
+        self._translation_client = translation_client
+        self._capture = capture
+        self._ocr = ocr
+        self._record_history = record_history
+
+    def run(self) -> None:
+        logger = logging.getLogger(__name__)
+        job = self.job
+        try:
+            result = self._run_stages()
+        except DeadlineExceeded as exc:
+            logger.warning("Trabajo %s: la etapa '%s' superó su plazo", job.id, exc.stage)
+            self.signals.failed.emit(job, "status_timeout")
+        except JobCancelled as exc:
+            logger.info("Trabajo %s cancelado (%s)", job.id, exc.reason)
+            self.signals.cancelled.emit(job)
+        except TesseractNotFoundError:
+            logger.exception("Error al invocar Tesseract")
+            self.signals.failed.emit(job, "status_ocr_not_found")
+        except TranslationError as exc:
+            logger.error("Error en la traducción: %s", exc)
+            self.signals.failed.emit(job, "status_translation_error")
+        except Exception:
+            # Una excepción en el pool se perdería sin dejar rastro.
+            logger.exception("Error inesperado en el trabajo %s", job.id)
+            self.signals.failed.emit(job, "status_translation_error")
+        else:
+            if result is None:
+                self.signals.failed.emit(job, "status_no_text")
+            else:
+                self.signals.finished.emit(job, result)
+
+    def _run_stages(self) -> PipelineResult | None:
+        logger = logging.getLogger(__name__)
+        job = self.job
+        request = self.request
+
+        self.signals.stageChanged.emit(job, STAGE_CAPTURE)
+        with job.stage(STAGE_CAPTURE):
+            img = self._capture(*request.region)
+
+        self.signals.stageChanged.emit(job, STAGE_OCR)
+        with job.stage(STAGE_OCR) as token:
+            blocks = self._ocr(
+                img,
+                lang_code=request.source_lang,
+                min_conf=MIN_OCR_CONFIDENCE,
+                region_key=request.region,
+                cancel_token=token,
+            )
+        logger.info("Bloques de texto detectados por OCR: %s", len(blocks))
+        if not blocks:
+            return None
+
+        # Agrupar palabras en líneas para que el overlay sea más legible.
+        line_blocks = group_blocks_by_line(blocks)
+        logger.info("Líneas agrupadas para overlay: %s", len(line_blocks))
+        self.signals.ocrReady.emit(
+            job, [OverlayBlock(text=b.text, x=b.x, y=b.y, w=b.w, h=b.h) for b in line_blocks]
+        )
+        # Se traduce por párrafos y la traducción se reparte luego entre
+        # las cajas de sus líneas.
+        if paragraphs_enabled():
+            paragraphs = group_lines_into_paragraphs(line_blocks)
+        else:
+            paragraphs = [Paragraph([block], [i]) for i, block in enumerate(line_blocks)]
+        texts = [p.text for p in paragraphs]
+        logger.info(
+            "Segmentos a traducir: %s (%s líneas, %s -> %s caracteres)",
+            len(texts),
+            len(line_blocks),
+            sum(len(b.text) for b in line_blocks),
+            sum(len(t) for t in texts),
+        )
+
+        self.signals.stageChanged.emit(job, STAGE_TRANSLATE)
+        on_lines = self._progress_callback(paragraphs)
+        with job.stage(STAGE_TRANSLATE) as token:
+            translated = self._translation_client.translate_texts(
+                texts, request.source_lang, request.target_lang, cancel_token=token, on_lines=on_lines
+            )
+        job.token.raise_if_cancelled()
+        # Líneas que el proveedor no devolvió por separado (p. ej. vacías).
+        job.timings.setdefault(TIMING_FIRST_LINE, self._elapsed_ms())
+        job.timings.setdefault(TIMING_LAST_LINE, self._elapsed_ms())
+
+        overlay_blocks: List[OverlayBlock] = []
+        for paragraph, t_text in zip(paragraphs, translated):
+            for block, piece in zip(paragraph.lines, distribute_text(t_text, paragraph.lines)):
+                overlay_blocks.append(OverlayBlock(text=piece, x=block.x, y=block.y, w=block.w, h=block.h))
+        try:
+            # Toda la captura va en un lote; se escribe en segundo plano.
+            self._record_history(list(zip(texts, translated)), request.source_lang, request.target_lang)
+        except Exception:
+            # El fallo en el historial no debe romper el flujo principal.
+            logger.exception("No se pudo guardar la captura en el historial")
+
+        logger.info(
+            "Trabajo %s: tiempos (ms) %s",
+            job.id,
+            {k: round(v, 1) for k, v in job.timings.items()},
+        )
+        return PipelineResult(blocks=overlay_blocks, source_texts=texts, timings=dict(job.timings))
+
+    def _elapsed_ms(self) -> float:
+        return (time.monotonic() - self.job.created_at) * 1000
+
+    def _progress_callback(self, paragraphs: List[Paragraph]) -> Callable[[Dict[int, str]], None]:
+        """Reenvía las líneas parciales a la interfaz y mide su llegada.
+
+        Recibe traducciones por párrafo y emite las de cada línea. Se llama
+        desde los hilos de los lotes de traducción.
+        """
+
+        job = self.job
+        seen: Set[int] = set()
+        lock = threading.Lock()
+
+        def _on_lines(lines: Dict[int, str]) -> None:
+            if not lines or job.cancelled:
+                return
+            with lock:
+                seen.update(lines)
+                job.timings.setdefault(TIMING_FIRST_LINE, self._elapsed_ms())
+                if len(seen) >= len(paragraphs):
+                    job.timings.setdefault(TIMING_LAST_LINE, self._elapsed_ms())
+            by_line: Dict[int, str] = {}
+            for index, text in lines.items():
+                paragraph = paragraphs[index]
+                by_line.update(zip(paragraph.indices, distribute_text(text, paragraph.lines)))
+            self.signals.linesReady.emit(job, by_line)
+
+        return _on_lines
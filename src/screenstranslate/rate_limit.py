@@ -0,0 +1,230 @@
+"""Limitador de ritmo del lado del cliente para el tráfico de traducción.
+
+Con capturas repetidas o trabajo por lotes los proveedores empiezan a
+responder 429. Cada proveedor tiene un `RateLimiter` compartido por todo
+el proceso con dos cubetas de tokens (peticiones/s y caracteres/s):
+
+- Quien no tiene presupuesto espera en cola en lugar de fallar.
+- Las capturas interactivas adelantan al trabajo en segundo plano.
+- Un 429 reduce el ritmo a la mitad y pausa la cola hasta `Retry-After`;
+  cada respuesta correcta lo recupera poco a poco (AIMD).
+"""
+
+from __future__ import annotations
+
+import heapq
+import itertools
+import logging
+import os
+import threading
+import time
+from dataclasses import dataclass
+from typing import Dict, List, Tuple
+
+from .jobs import CancellationToken
+
+
+PRIORITY_INTERACTIVE = 0
+PRIORITY_BACKGROUND = 1
+
+# Ritmo por defecto de cada proveedor: (peticiones/s, caracteres/s).
+DEFAULT_RATES: Dict[str, Tuple[float, float]] = {
+    "deepl": (10.0, 50_000.0),
+    "generic": (5.0, 20_000.0),
+}
+# Fracción mínima del ritmo configurado tras varios 429 seguidos.
+MIN_RATE_FACTOR = 0.05
+# Recuperación por respuesta correcta (fracción del ritmo configurado).
+RATE_RECOVERY_STEP = 0.05
+# Pausa tras un 429 sin `Retry-After`.
+DEFAULT_THROTTLE_PAUSE = 1.0
+# Cada cuánto comprueba la cancelación quien espera en cola.
+_CANCEL_POLL_INTERVAL = 0.05
+
+
+@dataclass
+class RateLimiterMetrics:
+    requests_per_second: float
+    chars_per_second: float
+    request_budget: float
+    char_budget: float
+    queue_depth: int
+    interactive_waiting: int
+    background_waiting: int
+    throttled: int
+    paused_for: float
+
+
+class _Bucket:
+    def __init__(self, rate: float, burst_seconds: float) -> None:
+        self.rate = rate
+        self.burst_seconds = burst_seconds
+        self.tokens = self.capacity
+
+    @property
+    def capacity(self) -> float:
+        return max(1.0, self.rate * self.burst_seconds)
+
+    def refill(self, elapsed: float) -> None:
+        self.tokens = min(self.capacity, self.tokens + elapsed * self.rate)
+
+    def wait_time(self, cost: float) -> float:
+        # Un coste mayor que la capacidad se admite con la cubeta llena y
+        # la deja en negativo, para que no se quede esperando para siempre.
+        needed = min(cost, self.capacity) - self.tokens
+        return max(0.0, needed / self.rate) if self.rate > 0 else 0.0
+
+
+class RateLimiter:
+    def __init__(
+        self,
+        name: str,
+        requests_per_second: float,
+        chars_per_second: float,
+        burst_seconds: float = 1.0,
+    ) -> None:
+        self.name = name
+        self.max_requests_per_second = requests_per_second
+        self.max_chars_per_second = chars_per_second
+        self._factor = 1.0
+        self._requests = _Bucket(requests_per_second, burst_seconds)
+        self._chars = _Bucket(chars_per_second, burst_seconds)
+        self._updated = time.monotonic()
+        self._paused_until = 0.0
+        self._throttled = 0
+        self._waiters: List[Tuple[int, int]] = []
+        self._sequence = itertools.count()
+        self._cond = threading.Condition()
+
+    def _refill_locked(self) -> None:
+        now = time.monotonic()
+        elapsed = now - self._updated
+        self._updated = now
+        self._requests.refill(elapsed)
+        self._chars.refill(elapsed)
+
+    def _wait_time_locked(self, cost: int) -> float:
+        pause = self._paused_until - time.monotonic()
+        return max(pause, self._requests.wait_time(1), self._chars.wait_time(cost))
+
+    def acquire(
+        self,
+        cost: int,
+        priority: int = PRIORITY_INTERACTIVE,
+        cancel_token: CancellationToken | None = None,
+    ) -> float:
+        """Espera turno para una petición de `cost` caracteres.
+
+        Devuelve los segundos esperados. Solo la cabeza de la cola (menor
+        prioridad, y después orden de llegada) puede gastar presupuesto.
+        """
+
+        started = time.monotonic()
+        ticket = (priority, next(self._sequence))
+        with self._cond:
+            heapq.heappush(self._waiters, ticket)
+            try:
+                while True:
+                    if cancel_token is not None:
+                        cancel_token.raise_if_cancelled()
+                    self._refill_locked()
+                    timeout: float | None = None
+                    if self._waiters[0] == ticket:
+                        timeout = self._wait_time_locked(cost)
+                        if timeout <= 0:
+                            self._requests.tokens -= 1
+                            self._chars.tokens -= cost
+                            heapq.heappop(self._waiters)
+                            return time.monotonic() - started
+                    if cancel_token is not None:
+                        timeout = _CANCEL_POLL_INTERVAL if timeout is None else min(timeout, _CANCEL_POLL_INTERVAL)
+                    self._cond.wait(timeout)
+            finally:
+                if ticket in self._waiters:
+                    self._waiters.remove(ticket)
+                    heapq.heapify(self._waiters)
+                self._cond.notify_all()
+
+    def _set_factor_locked(self, factor: float) -> None:
+        self._factor = min(1.0, max(MIN_RATE_FACTOR, factor))
+        self._requests.rate = self.max_requests_per_second * self._factor
+        self._chars.rate = self.max_chars_per_second * self._factor
+
+    def throttled(self, retry_after: float | None = None) -> None:
+        """El proveedor respondió 429: se reduce el ritmo y se pausa la cola."""
+
+        pause = retry_after if retry_after is not None else DEFAULT_THROTTLE_PAUSE
+        with self._cond:
+            self._refill_locked()
+            self._throttled += 1
+            self._set_factor_locked(self._factor / 2)
+            self._paused_until = max(self._paused_until, time.monotonic() + pause)
+            # El presupuesto acumulado ya no vale con el ritmo nuevo.
+            self._requests.tokens = min(self._requests.tokens, 0.0)
+            self._chars.tokens = min(self._chars.tokens, 0.0)
+            self._cond.notify_all()
+        logging.getLogger(__name__).warning(
+            "429 de %s: ritmo al %.0f %%, pausa de %.2f s", self.name, self._factor * 100, pause
+        )
+
+    def succeeded(self) -> None:
+        with self._cond:
+            if self._factor < 1.0:
+                self._refill_locked()
+                self._set_factor_locked(self._factor + RATE_RECOVERY_STEP)
+
+    def metrics(self) -> RateLimiterMetrics:
+        with self._cond:
+            self._refill_locked()
+            interactive = sum(1 for priority, _ in self._waiters if priority == PRIORITY_INTERACTIVE)
+            return RateLimiterMetrics(
+                requests_per_second=self._requests.rate,
+                chars_per_second=self._chars.rate,
+                request_budget=self._requests.tokens,
+                char_budget=self._chars.tokens,
+                queue_depth=len(self._waiters),
+                interactive_waiting=interactive,
+                background_waiting=len(self._waiters) - interactive,
+                throttled=self._throttled,
+                paused_for=max(0.0, self._paused_until - time.monotonic()),
+            )
+
+
+def _env_float(name: str, default: float) -> float:
+    try:
+        return float(os.getenv(name, str(default)))
+    except ValueError:
+        return default
+
+
+_rate_limiters: Dict[str, RateLimiter] = {}
+_rate_limiters_lock = threading.Lock()
+
+
+def get_rate_limiter(provider: str) -> RateLimiter:
+    """Limitador compartido del proveedor.
+
+    SCREENSTRANSLATE_RATE_<PROVEEDOR>_RPS y _CPS ajustan el ritmo máximo
+    (peticiones y caracteres por segundo).
+    """
+
+    with _rate_limiters_lock:
+        limiter = _rate_limiters.get(provider)
+        if limiter is None:
+            rps, cps = DEFAULT_RATES.get(provider, DEFAULT_RATES["generic"])
+            prefix = f"SCREENSTRANSLATE_RATE_{provider.upper()}"
+            limiter = RateLimiter(
+                provider,
+                requests_per_second=_env_float(f"{prefix}_RPS", rps),
+                chars_per_second=_env_float(f"{prefix}_CPS", cps),
+            )
+            _rate_limiters[provider] = limiter
+        return limiter
+
+
+def rate_limiter_metrics() -> Dict[str, RateLimiterMetrics]:
+    """Presupuesto y cola de cada proveedor usado hasta ahora."""
+
+    with _rate_limiters_lock:
+        limiters = list(_rate_limiters.values())
+    return {limiter.name: limiter.metrics() for limiter in limiters}
@@ -0,0 +1,107 @@
+"""Agrupación de traducciones idénticas en vuelo ("single-flight").
+
+Dos capturas solapadas (o una tabla con la misma línea muchas veces)
+piden traducir los mismos segmentos a la vez. `SingleFlight` asigna cada
+clave (proveedor, origen, destino, texto normalizado) a un único
+propietario que la envía al proveedor; el resto de llamadas que la piden
+mientras tanto esperan su resultado en lugar de repetir la petición.
+
+Si el propietario falla o se cancela, quienes esperaban reciben None y
+traducen la clave por su cuenta.
+"""
+
+from __future__ import annotations
+
+import threading
+from dataclasses import dataclass
+from typing import Dict, Hashable, Iterable, List, Tuple
+
+from .jobs import CancellationToken
+
+
+# Cada cuánto comprueba la cancelación quien espera a otro propietario.
+WAIT_POLL_INTERVAL = 0.05
+
+
+@dataclass
+class SingleFlightStats:
+    """Trabajo ahorrado al no enviar segmentos repetidos."""
+
+    duplicate_segments: int = 0
+    coalesced_segments: int = 0
+    saved_requests: int = 0
+    saved_chars: int = 0
+
+
+class Flight:
+    def __init__(self) -> None:
+        self._done = threading.Event()
+        self.result: str | None = None
+
+    def wait(self, cancel_token: CancellationToken | None = None) -> str | None:
+        """Resultado del propietario, o None si falló o se canceló."""
+
+        if cancel_token is None:
+            self._done.wait()
+        else:
+            while not self._done.wait(WAIT_POLL_INTERVAL):
+                cancel_token.raise_if_cancelled()
+        return self.result
+
+
+class SingleFlight:
+    def __init__(self) -> None:
+        self._flights: Dict[Hashable, Flight] = {}
+        self._lock = threading.Lock()
+        self._stats = SingleFlightStats()
+
+    def claim(self, keys: Iterable[Hashable]) -> Tuple[Dict[Hashable, Flight], Dict[Hashable, Flight]]:
+        """Reparte `keys` entre las propias (a enviar) y las ya en vuelo.
+
+        Las claves propias deben cerrarse siempre con `resolve` o `abandon`,
+        pasando el mismo `Flight` que devolvió `claim`.
+        """
+
+        owned: Dict[Hashable, Flight] = {}
+        joined: Dict[Hashable, Flight] = {}
+        with self._lock:
+            for key in keys:
+                flight = self._flights.get(key)
+                if flight is None:
+                    flight = self._flights[key] = Flight()
+                    owned[key] = flight
+                else:
+                    joined[key] = flight
+        return owned, joined
+
+    def _release(self, key: Hashable, flight: Flight) -> None:
+        # Con el lock tomado. Si la clave ya se cerró, puede haberla
+        # reclamado otra llamada: su vuelo no es el nuestro y no se toca.
+        if self._flights.get(key) is flight:
+            del self._flights[key]
+
+    def resolve(self, key: Hashable, flight: Flight, result: str) -> None:
+        with self._lock:
+            self._release(key, flight)
+        flight.result = result
+        flight._done.set()
+
+    def abandon(self, flights: Dict[Hashable, Flight]) -> None:
+        """Libera claves propias sin resultado (error o cancelación)."""
+
+        with self._lock:
+            for key, flight in flights.items():
+                self._release(key, flight)
+        for flight in flights.values():
+            flight._done.set()
+
+    def record(self, duplicates: int = 0, coalesced: int = 0, requests: int = 0, chars: int = 0) -> None:
+        with self._lock:
+            self._stats.duplicate_segments += duplicates
+            self._stats.coalesced_segments += coalesced
+            self._stats.saved_requests += requests
+            self._stats.saved_chars += chars
+
+    def stats(self) -> SingleFlightStats:
+        with self._lock:
+            return SingleFlightStats(**vars(self._stats))
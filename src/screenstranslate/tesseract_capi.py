@@ -0,0 +1,351 @@
+"""Motor OCR en proceso basado en la API C de libtesseract.
+
+En lugar de lanzar un proceso `tesseract` por captura (con la recarga
+completa de los `.traineddata` que eso implica), cargamos la librería una
+sola vez mediante ctypes y mantenemos handles `TessBaseAPI` ya
+inicializados por combinación de idiomas.
+
+Si la librería no está disponible, `get_tesseract_capi()` devuelve None y
+el módulo `ocr` sigue usando el ejecutable de Tesseract.
+"""
+
+from __future__ import annotations
+
+import ctypes
+import ctypes.util
+import locale
+import logging
+import os
+import platform
+import threading
+from collections import OrderedDict
+from pathlib import Path
+from typing import Callable, List, Tuple
+
+from PIL import Image
+
+
+# Número máximo de handles calientes. Cada handle mantiene sus modelos en
+# memoria, así que no conviene acumular muchas combinaciones de idiomas.
+MAX_CACHED_HANDLES = 4
+
+_LIBRARY_NAMES_WINDOWS = (
+    "libtesseract-5.dll",
+    "libtesseract-4.dll",
+    "tesseract55.dll",
+    "tesseract54.dll",
+    "tesseract53.dll",
+    "tesseract50.dll",
+    "tesseract41.dll",
+)
+
+
+class TesseractCApiError(Exception):
+    pass
+
+
+# bool (*TessCancelFunc)(void* cancel_this, int words): True cancela.
+_CANCEL_FUNC = ctypes.CFUNCTYPE(ctypes.c_bool, ctypes.c_void_p, ctypes.c_int)
+
+
+class _ApiHandle:
+    """Handle `TessBaseAPI` inicializado para un conjunto de idiomas."""
+
+    def __init__(self, lib: ctypes.CDLL, datapath: str | None, lang: str) -> None:
+        self._lib = lib
+        self.lang = lang
+        self.lock = threading.Lock()
+        self.ptr = lib.TessBaseAPICreate()
+        if not self.ptr:
+            raise TesseractCApiError("TessBaseAPICreate devolvió NULL")
+
+        datapath_arg = datapath.encode("utf-8") if datapath else None
+        rc = lib.TessBaseAPIInit3(self.ptr, datapath_arg, lang.encode("utf-8"))
+        if rc != 0:
+            lib.TessBaseAPIDelete(self.ptr)
+            self.ptr = None
+            raise TesseractCApiError(f"No se pudo inicializar Tesseract con idiomas '{lang}' (datapath={datapath})")
+
+    def close(self) -> None:
+        with self.lock:
+            if self.ptr:
+                self._lib.TessBaseAPIEnd(self.ptr)
+                self._lib.TessBaseAPIDelete(self.ptr)
+                self.ptr = None
+
+
+class TesseractCApi:
+    """Envoltorio mínimo sobre libtesseract con handles reutilizables."""
+
+    def __init__(self, lib: ctypes.CDLL, datapath: str | None) -> None:
+        self._lib = lib
+        self._datapath = datapath
+        self._handles: "OrderedDict[str, _ApiHandle]" = OrderedDict()
+        self._handles_lock = threading.Lock()
+        _declare_signatures(lib)
+
+    @property
+    def version(self) -> str:
+        raw = self._lib.TessVersion()
+        return raw.decode("utf-8", errors="ignore") if raw else ""
+
+    def _get_handle(self, lang: str) -> _ApiHandle:
+        with self._handles_lock:
+            handle = self._handles.get(lang)
+            if handle is not None:
+                self._handles.move_to_end(lang)
+                return handle
+
+            _ensure_c_numeric_locale()
+            handle = _ApiHandle(self._lib, self._datapath, lang)
+            self._handles[lang] = handle
+            while len(self._handles) > MAX_CACHED_HANDLES:
+                _, evicted = self._handles.popitem(last=False)
+                evicted.close()
+            return handle
+
+    def _set_image(self, handle: _ApiHandle, image: Image.Image, psm: int) -> None:
+        if image.mode not in ("RGB", "L"):
+            image = image.convert("RGB")
+        width, height = image.size
+        bytes_per_pixel = 3 if image.mode == "RGB" else 1
+
+        self._lib.TessBaseAPISetPageSegMode(handle.ptr, psm)
+        self._lib.TessBaseAPISetImage(
+            handle.ptr,
+            image.tobytes(),
+            width,
+            height,
+            bytes_per_pixel,
+            width * bytes_per_pixel,
+        )
+
+    def recognize_tsv(
+        self,
+        image: Image.Image,
+        lang: str,
+        psm: int = 6,
+        should_cancel: Callable[[], bool] | None = None,
+    ) -> str:
+        """Devuelve la salida TSV (sin cabecera) de reconocer `image`.
+
+        Si se indica `should_cancel` y la librería expone los monitores de
+        progreso, Tesseract lo consulta durante el reconocimiento y se
+        detiene (con TesseractCApiError) en cuanto devuelve True.
+        """
+
+        handle = self._get_handle(lang)
+        lib = self._lib
+        with handle.lock:
+            if not handle.ptr:
+                raise TesseractCApiError("Handle de Tesseract cerrado")
+            monitor = None
+            # La referencia al callback debe vivir mientras dure Recognize.
+            callback = None
+            try:
+                self._set_image(handle, image, psm)
+                if should_cancel is not None and hasattr(lib, "TessMonitorCreate"):
+                    monitor = lib.TessMonitorCreate()
+                    callback = _CANCEL_FUNC(lambda _this, _words: bool(should_cancel()))
+                    lib.TessMonitorSetCancelFunc(monitor, callback)
+                if lib.TessBaseAPIRecognize(handle.ptr, monitor) != 0:
+                    raise TesseractCApiError("TessBaseAPIRecognize falló")
+
+                text_ptr = lib.TessBaseAPIGetTsvText(handle.ptr, 0)
+                if not text_ptr:
+                    return ""
+                try:
+                    return ctypes.string_at(text_ptr).decode("utf-8", errors="ignore")
+                finally:
+                    lib.TessDeleteText(text_ptr)
+            finally:
+                if monitor:
+                    lib.TessMonitorDelete(monitor)
+                lib.TessBaseAPIClear(handle.ptr)
+
+    def detect_script(self, image: Image.Image) -> Tuple[str, float] | None:
+        """Ejecuta solo OSD y devuelve (script, confianza), o None si no hay datos.
+
+        Requiere `osd.traineddata`; si falta, lanza TesseractCApiError.
+        """
+
+        detect = getattr(self._lib, "TessBaseAPIDetectOrientationScript", None)
+        if detect is None:
+            return None
+
+        handle = self._get_handle("osd")
+        with handle.lock:
+            if not handle.ptr:
+                raise TesseractCApiError("Handle de Tesseract cerrado")
+            try:
+                self._set_image(handle, image, 0)
+                orient_deg = ctypes.c_int()
+                orient_conf = ctypes.c_float()
+                script_name = ctypes.c_char_p()
+                script_conf = ctypes.c_float()
+                ok = detect(
+                    handle.ptr,
+                    ctypes.byref(orient_deg),
+                    ctypes.byref(orient_conf),
+                    ctypes.byref(script_name),
+                    ctypes.byref(script_conf),
+                )
+                if not ok or not script_name.value:
+                    return None
+                return script_name.value.decode("utf-8", errors="ignore"), float(script_conf.value)
+            finally:
+                self._lib.TessBaseAPIClear(handle.ptr)
+
+    def close(self) -> None:
+        with self._handles_lock:
+            for handle in self._handles.values():
+                handle.close()
+            self._handles.clear()
+
+
+def _declare_signatures(lib: ctypes.CDLL) -> None:
+    vp = ctypes.c_void_p
+    lib.TessVersion.restype = ctypes.c_char_p
+    lib.TessVersion.argtypes = []
+    lib.TessBaseAPICreate.restype = vp
+    lib.TessBaseAPICreate.argtypes = []
+    lib.TessBaseAPIDelete.restype = None
+    lib.TessBaseAPIDelete.argtypes = [vp]
+    lib.TessBaseAPIEnd.restype = None
+    lib.TessBaseAPIEnd.argtypes = [vp]
+    lib.TessBaseAPIInit3.restype = ctypes.c_int
+    lib.TessBaseAPIInit3.argtypes = [vp, ctypes.c_char_p, ctypes.c_char_p]
+    lib.TessBaseAPISetPageSegMode.restype = None
+    lib.TessBaseAPISetPageSegMode.argtypes = [vp, ctypes.c_int]
+    lib.TessBaseAPISetImage.restype = None
+    lib.TessBaseAPISetImage.argtypes = [
+        vp,
+        ctypes.c_char_p,
+        ctypes.c_int,
+        ctypes.c_int,
+        ctypes.c_int,
+        ctypes.c_int,
+    ]
+    lib.TessBaseAPIRecognize.restype = ctypes.c_int
+    lib.TessBaseAPIRecognize.argtypes = [vp, vp]
+    lib.TessBaseAPIGetTsvText.restype = vp
+    lib.TessBaseAPIGetTsvText.argtypes = [vp, ctypes.c_int]
+    lib.TessBaseAPIClear.restype = None
+    lib.TessBaseAPIClear.argtypes = [vp]
+    lib.TessDeleteText.restype = None
+    lib.TessDeleteText.argtypes = [vp]
+
+    # Monitores de progreso/cancelación (API C de Tesseract 4 y 5).
+    if hasattr(lib, "TessMonitorCreate"):
+        lib.TessMonitorCreate.restype = vp
+        lib.TessMonitorCreate.argtypes = []
+        lib.TessMonitorDelete.restype = None
+        lib.TessMonitorDelete.argtypes = [vp]
+        lib.TessMonitorSetCancelFunc.restype = None
+        lib.TessMonitorSetCancelFunc.argtypes = [vp, _CANCEL_FUNC]
+
+    # Disponible desde Tesseract 4.1; sin ella no hay detección de script.
+    detect = getattr(lib, "TessBaseAPIDetectOrientationScript", None)
+    if detect is not None:
+        detect.restype = ctypes.c_int
+        detect.argtypes = [
+            vp,
+            ctypes.POINTER(ctypes.c_int),
+            ctypes.POINTER(ctypes.c_float),
+            ctypes.POINTER(ctypes.c_char_p),
+            ctypes.POINTER(ctypes.c_float),
+        ]
+
+
+def _ensure_c_numeric_locale() -> None:
+    """Tesseract 4 aborta si LC_NUMERIC no es "C" (Qt lo cambia en Unix)."""
+
+    try:
+        locale.setlocale(locale.LC_NUMERIC, "C")
+    except locale.Error:
+        logging.getLogger(__name__).debug("No se pudo fijar LC_NUMERIC=C")
+
+
+def _library_candidates(tesseract_cmd: str | None) -> List[str]:
+    candidates: List[str] = []
+
+    env_lib = os.getenv("TESSERACT_LIB")
+    if env_lib:
+        candidates.append(env_lib)
+
+    # Librería junto al ejecutable (instalación de Windows o copia embebida).
+    if tesseract_cmd:
+        exe_dir = Path(tesseract_cmd).parent
+        if platform.system() == "Windows":
+            for name in _LIBRARY_NAMES_WINDOWS:
+                candidates.append(str(exe_dir / name))
+        else:
+            for name in ("libtesseract.dylib", "libtesseract.so.5", "libtesseract.so.4"):
+                candidates.append(str(exe_dir.parent / "lib" / name))
+
+    found = ctypes.util.find_library("tesseract")
+    if found:
+        candidates.append(found)
+    if platform.system() == "Linux":
+        candidates.extend(["libtesseract.so.5", "libtesseract.so.4"])
+    return candidates
+
+
+def _tessdata_dir(tesseract_cmd: str | None) -> str | None:
+    env_prefix = os.getenv("TESSDATA_PREFIX")
+    if env_prefix:
+        return env_prefix
+    if tesseract_cmd:
+        tessdata = Path(tesseract_cmd).parent / "tessdata"
+        if tessdata.is_dir():
+            return str(tessdata)
+    # Sin datapath explícito, libtesseract usa su ruta de compilación.
+    return None
+
+
+_capi: TesseractCApi | None = None
+_capi_loaded = False
+_capi_lock = threading.Lock()
+
+
+def get_tesseract_capi(tesseract_cmd: str | None = None) -> TesseractCApi | None:
+    """Devuelve el motor en proceso compartido, o None si no está disponible.
+
+    El resultado (incluido un fallo de carga) se memoriza para no repetir
+    la búsqueda de la librería en cada captura. Se puede desactivar con
+    SCREENSTRANSLATE_OCR_ENGINE=cli.
+    """
+
+    global _capi, _capi_loaded
+
+    if os.getenv("SCREENSTRANSLATE_OCR_ENGINE", "auto").lower() == "cli":
+        return None
+
+    with _capi_lock:
+        if _capi_loaded:
+            return _capi
+        _capi_loaded = True
+
+        logger = logging.getLogger(__name__)
+        if platform.system() == "Windows" and tesseract_cmd:
+            # En Windows las DLL dependientes (leptonica, etc.) están junto
+            # al ejecutable de Tesseract.
+            add_dll_directory = getattr(os, "add_dll_directory", None)
+            if add_dll_directory is not None and Path(tesseract_cmd).parent.is_dir():
+                add_dll_directory(str(Path(tesseract_cmd).parent))
+
+        for candidate in _library_candidates(tesseract_cmd):
+            try:
+                lib = ctypes.CDLL(candidate)
+            except OSError:
+                continue
+            try:
+                _capi = TesseractCApi(lib, _tessdata_dir(tesseract_cmd))
+            except AttributeError as exc:
+                logger.warning("libtesseract sin API C compatible (%s): %s", candidate, exc)
+                continue
+            logger.info("libtesseract %s cargada desde %s", _capi.version, candidate)
+            return _capi
+
+        logger.info("libtesseract no disponible; se usará el ejecutable de Tesseract")
+        return None
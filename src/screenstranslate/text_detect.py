@@ -0,0 +1,125 @@
+"""Detección rápida de zonas con texto antes del OCR.
+
+Muchas selecciones son sobre todo márgenes, imágenes o fondos lisos. Este
+paso trabaja sobre una copia reducida de la captura, calcula la densidad
+de bordes horizontales por celdas y agrupa las celdas candidatas en
+componentes conexas. Si no hay nada parecido a texto se puede omitir el
+OCR; si lo hay, basta con reconocer la unión de las cajas.
+"""
+
+from __future__ import annotations
+
+import os
+from typing import List, Tuple
+
+import numpy as np
+from PIL import Image
+
+
+# Ancho máximo de la copia reducida sobre la que se analiza la captura.
+ANALYSIS_MAX_WIDTH = 960
+CELL_SIZE = 8
+# Diferencia mínima de gris entre píxeles vecinos para contar como borde.
+EDGE_THRESHOLD = 28
+# Fracción de píxeles de borde a partir de la cual una celda parece texto.
+MIN_CELL_DENSITY = 0.06
+# Componentes con densidad media mayor suelen ser fotos o ruido.
+MAX_COMPONENT_DENSITY = 0.5
+MIN_COMPONENT_CELLS = 2
+
+Box = Tuple[int, int, int, int]
+
+
+def text_detection_enabled() -> bool:
+    return os.getenv("SCREENSTRANSLATE_OCR_TEXT_DETECTION", "1") != "0"
+
+
+def _analysis_gray(image: Image.Image) -> Tuple[np.ndarray, int]:
+    factor = max(1, -(-image.width // ANALYSIS_MAX_WIDTH))
+    if factor > 1:
+        # NEAREST solo lee los píxeles muestreados: es varias veces más
+        # rápido que promediar y basta para estimar densidad de bordes.
+        image = image.resize((image.width // factor, image.height // factor), Image.NEAREST)
+    return np.asarray(image.convert("L"), dtype=np.int16), factor
+
+
+def _text_cells(gray: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """Máscara de celdas candidatas y densidad de bordes por celda."""
+
+    edges = np.abs(np.diff(gray, axis=1)) > EDGE_THRESHOLD
+    rows = edges.shape[0] // CELL_SIZE
+    cols = edges.shape[1] // CELL_SIZE
+    if rows == 0 or cols == 0:
+        return np.zeros((0, 0), dtype=bool), np.zeros((0, 0), dtype=np.float32)
+
+    cropped = edges[: rows * CELL_SIZE, : cols * CELL_SIZE]
+    counts = cropped.reshape(rows, CELL_SIZE, cols, CELL_SIZE).sum(axis=(1, 3), dtype=np.int32)
+    density = counts.astype(np.float32) / float(CELL_SIZE * CELL_SIZE)
+    return density >= MIN_CELL_DENSITY, density
+
+
+def _components(mask: np.ndarray, density: np.ndarray) -> List[Box]:
+    """Cajas (en celdas) de las componentes 8-conexas de la máscara."""
+
+    rows, cols = mask.shape
+    seen = np.zeros_like(mask)
+    boxes: List[Box] = []
+    for start_r, start_c in zip(*np.nonzero(mask)):
+        if seen[start_r, start_c]:
+            continue
+        seen[start_r, start_c] = True
+        stack = [(int(start_r), int(start_c))]
+        top, left, bottom, right = start_r, start_c, start_r, start_c
+        cells = 0
+        total_density = 0.0
+        while stack:
+            r, c = stack.pop()
+            cells += 1
+            total_density += float(density[r, c])
+            top, bottom = min(top, r), max(bottom, r)
+            left, right = min(left, c), max(right, c)
+            for nr in (r - 1, r, r + 1):
+                if nr < 0 or nr >= rows:
+                    continue
+                for nc in (c - 1, c, c + 1):
+                    if 0 <= nc < cols and mask[nr, nc] and not seen[nr, nc]:
+                        seen[nr, nc] = True
+                        stack.append((nr, nc))
+
+        if cells < MIN_COMPONENT_CELLS or total_density / cells > MAX_COMPONENT_DENSITY:
+            continue
+        boxes.append((int(left), int(top), int(right - left + 1), int(bottom - top + 1)))
+    return boxes
+
+
+def find_text_regions(image: Image.Image) -> List[Box]:
+    """Devuelve cajas candidatas a contener texto, en coordenadas de `image`.
+
+    Cada caja se amplía una celda por cada lado para no recortar glifos.
+    Solo se devuelve una lista vacía cuando no hay ninguna celda con
+    bordes suficientes; si hay bordes pero ninguna componente parece
+    texto, se devuelve la imagen completa para no perder palabras sueltas.
+    """
+
+    gray, factor = _analysis_gray(image)
+    mask, density = _text_cells(gray)
+    if not mask.any():
+        return []
+
+    scale = CELL_SIZE * factor
+    regions: List[Box] = []
+    for left, top, width, height in _components(mask, density):
+        x0 = max(0, (left - 1) * scale)
+        y0 = max(0, (top - 1) * scale)
+        x1 = min(image.width, (left + width + 1) * scale)
+        y1 = min(image.height, (top + height + 1) * scale)
+        regions.append((x0, y0, x1 - x0, y1 - y0))
+    return regions or [(0, 0, image.width, image.height)]
+
+
+def union_box(regions: List[Box]) -> Box:
+    x0 = min(x for x, _, _, _ in regions)
+    y0 = min(y for _, y, _, _ in regions)
+    x1 = max(x + w for x, _, w, _ in regions)
+    y1 = max(y + h for _, y, _, h in regions)
+    return x0, y0, x1 - x0, y1 - y0
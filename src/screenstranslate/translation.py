@@ -1,15 +1,56 @@
 ﻿from __future__ import annotations
 
+import json
 import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from dataclasses import dataclass
-from typing import List, Optional
+from typing import Callable, Dict, List, Optional, Set, Tuple
 
 import logging
 import requests
 
+from .batching import BatchLimits, combined_limits, concurrency_from_env, dispatch_batches, is_transient, split_batches
+from .hedging import HedgedGroup, HedgeStats
+from .http_client import RETRY_STATUSES, CircuitOpenError, HttpClient, HttpMetrics, get_http_client
+from .jobs import CancellationToken
+from .rate_limit import PRIORITY_INTERACTIVE, RateLimiterMetrics, get_rate_limiter
+from .singleflight import Flight, SingleFlight, SingleFlightStats
+from .translation_memory import TranslationMemory, get_translation_memory, normalize_text
+
 
 class TranslationError(Exception):
-    pass
+    def __init__(self, message: str = "", transient: bool = False) -> None:
+        super().__init__(message)
+        # Fallo pasajero (red, 429, 5xx): tiene sentido volver a intentarlo.
+        # Un 401/403/400 o una respuesta mal formada no, y los lotes no
+        # deben reintentarlo.
+        self.transient = transient
+
+
+_TRANSIENT_REQUEST_ERRORS = (requests.Timeout, requests.ConnectionError, requests.exceptions.ChunkedEncodingError)
+
+
+def _request_error(exc: requests.RequestException) -> TranslationError:
+    # CircuitOpenError también es RequestException, pero no es pasajero.
+    return TranslationError(str(exc), transient=isinstance(exc, _TRANSIENT_REQUEST_ERRORS))
+
+
+def _can_fail_over(exc: BaseException) -> bool:
+    # Con el circuito abierto no sirve reintentar el mismo proveedor, pero
+    # sí pasar a otro.
+    return is_transient(exc) or isinstance(exc.__cause__, CircuitOpenError)
+
+
+def _http_error(resp: requests.Response) -> TranslationError:
+    return TranslationError(
+        f"HTTP {resp.status_code}: {resp.text[:200]}", transient=resp.status_code in RETRY_STATUSES
+    )
+
+
+# Recibe líneas ya traducidas (posición en la lista original → texto)
+# según van estando disponibles, antes de que termine toda la llamada.
+LinesCallback = Callable[[Dict[int, str]], None]
 
 
 @dataclass
@@ -31,6 +72,11 @@ DEFAULT_TRANSLATION_API_KEY = os.getenv(
     "SCREENSTRANSLATE_TRANSLATION_API_KEY",
     "screenstranslate-public",
 )
+# Con "1" se pide al backend genérico una respuesta NDJSON (una línea
+# {"index": i, "translation": "..."} por texto) para pintar cada línea en
+# cuanto llega. Si el backend responde JSON normal se usa tal cual.
+STREAM_GENERIC_RESPONSES = os.getenv("SCREENSTRANSLATE_TRANSLATION_STREAM", "0") == "1"
+NDJSON_CONTENT_TYPE = "application/x-ndjson"
 
 
 def _load_config_from_env() -> TranslationConfig:
@@ -42,7 +88,19 @@ def _load_config_from_env() -> TranslationConfig:
     3) Modo demo (sin traducciÃ³n real)
     """
 
+    return _load_provider_configs_from_env()[0]
+
+
+def _load_provider_configs_from_env() -> List[TranslationConfig]:
+    """Proveedores configurados, en orden de preferencia.
+
+    Si hay más de uno (DeepL y backend genérico), el resto sirve de
+    respaldo del primero (ver `hedging`). El backend por defecto solo se
+    usa cuando no hay ninguno configurado.
+    """
+
     logger = logging.getLogger(__name__)
+    configs: List[TranslationConfig] = []
 
     deepl_key = os.getenv("DEEPL_AUTH_KEY")
     if deepl_key:
@@ -51,13 +109,16 @@ def _load_config_from_env() -> TranslationConfig:
             use_free = os.getenv("DEEPL_API_FREE", "1") == "1"
             deepl_url = "https://api-free.deepl.com/v2/translate" if use_free else "https://api.deepl.com/v2/translate"
         logger.info("Proveedor de traducciÃ³n seleccionado: DeepL (%s)", deepl_url)
-        return TranslationConfig(provider="deepl", api_key=deepl_key, base_url=deepl_url)
+        configs.append(TranslationConfig(provider="deepl", api_key=deepl_key, base_url=deepl_url))
 
     api_key = os.getenv("TRANSLATION_API_KEY")
     base_url = os.getenv("TRANSLATION_API_URL")
     if api_key and base_url:
         logger.info("Proveedor de traducción genérico configurado: %s", base_url)
-        return TranslationConfig(provider="generic", api_key=api_key, base_url=base_url)
+        configs.append(TranslationConfig(provider="generic", api_key=api_key, base_url=base_url))
+
+    if configs:
+        return configs
 
     # Sin configuración explícita, usamos el backend HTTP por
     # defecto (la API de la web) en lugar del modo DEMO.
@@ -65,11 +126,13 @@ def _load_config_from_env() -> TranslationConfig:
         "Proveedor de traducción genérico por defecto: %s (sin claves en el cliente)",
         DEFAULT_TRANSLATION_API_URL,
     )
-    return TranslationConfig(
-        provider="generic",
-        api_key=DEFAULT_TRANSLATION_API_KEY,
-        base_url=DEFAULT_TRANSLATION_API_URL,
-    )
+    return [
+        TranslationConfig(
+            provider="generic",
+            api_key=DEFAULT_TRANSLATION_API_KEY,
+            base_url=DEFAULT_TRANSLATION_API_URL,
+        )
+    ]
 
 
 def _deepl_lang(code: str) -> str:
@@ -90,8 +153,26 @@ def _deepl_lang(code: str) -> str:
 
 
 class TranslationClient:
-    def __init__(self, api_key: Optional[str] = None, base_url: Optional[str] = None) -> None:
-        cfg = _load_config_from_env()
+    def __init__(
+        self,
+        api_key: Optional[str] = None,
+        base_url: Optional[str] = None,
+        http_client: HttpClient | None = None,
+        memory: TranslationMemory | None = None,
+    ) -> None:
+        configs = _load_provider_configs_from_env()
+        cfg = configs[0]
+        # Sesión compartida: reutiliza conexiones keep-alive entre capturas.
+        self._http = http_client or get_http_client()
+        self._memory = memory if memory is not None else get_translation_memory()
+        # Los lotes de una captura larga se envían en paralelo, con un tope.
+        self._batch_concurrency = concurrency_from_env()
+        self._batch_executor = ThreadPoolExecutor(
+            max_workers=self._batch_concurrency,
+            thread_name_prefix="translate-batch",
+        )
+        # Segmentos en vuelo, compartidos entre capturas simultáneas.
+        self._flights = SingleFlight()
         # Permitir override manual, Ãºtil para tests.
         if api_key or base_url:
             self.config = TranslationConfig(
@@ -99,16 +180,82 @@ class TranslationClient:
                 api_key=api_key or cfg.api_key,
                 base_url=base_url or cfg.base_url,
             )
+            self.providers = [self.config]
         else:
             self.config = cfg
+            self.providers = configs
+
+        # Con varios proveedores, cada lote se cubre con hedging y failover.
+        self._hedger: HedgedGroup[List[str]] | None = None
+        if len(self.providers) > 1:
+            self._hedger = HedgedGroup(
+                [c.provider for c in self.providers],
+                max_workers=self._batch_concurrency * len(self.providers),
+                failover_on=_can_fail_over,
+            )
 
         logging.getLogger(__name__).info(
-            "TranslationClient inicializado: provider=%s, url=%s",
+            "TranslationClient inicializado: provider=%s, url=%s, respaldo=%s",
             self.config.provider,
             self.config.base_url,
+            [c.provider for c in self.providers[1:]],
         )
 
-    def translate_texts(self, texts: List[str], source_lang: str, target_lang: str) -> List[str]:
+    @property
+    def memory(self) -> TranslationMemory | None:
+        """Memoria de traducción en uso (para precargarla o invalidarla)."""
+
+        return self._memory
+
+    def http_metrics(self) -> HttpMetrics:
+        """Métricas de la sesión HTTP (reutilización, reintentos, breaker)."""
+
+        return self._http.metrics()
+
+    def hedge_stats(self) -> HedgeStats | None:
+        """Duplicados, victorias del respaldo y failovers (None con un solo proveedor)."""
+
+        return self._hedger.stats() if self._hedger is not None else None
+
+    def rate_limit_metrics(self) -> Dict[str, RateLimiterMetrics]:
+        """Ritmo actual, presupuesto y cola del limitador de cada proveedor."""
+
+        return {c.provider: get_rate_limiter(c.provider).metrics() for c in self.providers}
+
+    def dedupe_stats(self) -> SingleFlightStats:
+        """Segmentos, peticiones y caracteres que no se enviaron por repetidos."""
+
+        return self._flights.stats()
+
+    def translate_texts(
+        self,
+        texts: List[str],
+        source_lang: str,
+        target_lang: str,
+        cancel_token: CancellationToken | None = None,
+        on_lines: LinesCallback | None = None,
+        priority: int = PRIORITY_INTERACTIVE,
+    ) -> List[str]:
+        """Traduce `texts` con el proveedor configurado.
+
+        Primero se consulta la memoria de traducción; solo las líneas que no
+        están en ella se envían al proveedor, en lotes que respetan sus
+        límites (ver `batching`), y el resultado se devuelve en el orden
+        original. Cada lote se guarda en la memoria al llegar, así que si
+        otro falla no se vuelve a pagar lo ya traducido.
+
+        Si `cancel_token` se cancela mientras se espera al backend, se lanza
+        `JobCancelled` sin esperar a la respuesta.
+
+        `on_lines` recibe las traducciones parciales en cuanto se conocen
+        (aciertos de la memoria, cada lote o cada línea en streaming), desde
+        el hilo que las obtiene. Una misma línea puede llegar más de una vez.
+
+        Las peticiones pasan por el limitador de ritmo de cada proveedor
+        (`rate_limit`); el trabajo en segundo plano debe usar
+        `PRIORITY_BACKGROUND` para no retrasar las capturas interactivas.
+        """
+
         if not texts:
             return []
 
@@ -117,27 +264,314 @@ class TranslationClient:
             # Modo demo: Ãºtil mientras no se configure un backend real.
             logging.getLogger(__name__).info("Usando modo DEMO de traducciÃ³n (%s -> %s)", source_lang, target_lang)
             suffix = f" [{target_lang}]"
-            return [t + suffix if t.strip() else t for t in texts]
+            result = [t + suffix if t.strip() else t for t in texts]
+            if on_lines is not None:
+                on_lines(dict(enumerate(result)))
+            return result
+
+        memory = self._memory
+        found: Dict[int, str] = {}
+        if memory is not None:
+            try:
+                found = self._memory_lookup(memory, source_lang, target_lang, texts)
+            except Exception:
+                # La memoria es una optimización: si falla, se traduce todo.
+                logging.getLogger(__name__).exception("No se pudo consultar la memoria de traducción")
+                memory = None
+            else:
+                logging.getLogger(__name__).info(
+                    "Memoria de traducción: %s/%s líneas reutilizadas", len(found), len(texts)
+                )
+                if found and on_lines is not None:
+                    on_lines(dict(found))
+
+        missing = [i for i in range(len(texts)) if i not in found]
+        if missing:
+            found.update(
+                self._translate_missing(
+                    texts, missing, source_lang, target_lang, cancel_token, memory, on_lines, priority
+                )
+            )
+        return [found.get(i, texts[i]) for i in range(len(texts))]
+
+    def _memory_lookup(
+        self,
+        memory: TranslationMemory,
+        source_lang: str,
+        target_lang: str,
+        texts: List[str],
+    ) -> Dict[int, str]:
+        """Aciertos de la memoria, por posición en `texts`.
+
+        Cada lote se guarda con el proveedor que lo sirvió, así que con
+        respaldo se consultan todos en orden de preferencia: primero el
+        principal y, para lo que falte, los demás.
+        """
+
+        found: Dict[int, str] = {}
+        for config in self.providers:
+            pending = [i for i in range(len(texts)) if i not in found]
+            if not pending:
+                break
+            hits = memory.get_many(config.provider, source_lang, target_lang, [texts[i] for i in pending])
+            found.update((pending[position], translated) for position, translated in hits.items())
+        return found
+
+    def _translate_missing(
+        self,
+        texts: List[str],
+        missing: List[int],
+        source_lang: str,
+        target_lang: str,
+        cancel_token: CancellationToken | None,
+        memory: TranslationMemory | None,
+        on_lines: LinesCallback | None = None,
+        priority: int = PRIORITY_INTERACTIVE,
+    ) -> Dict[int, str]:
+        """Traduce `texts[i]` para cada i de `missing`, sin repetir segmentos.
+
+        Los segmentos iguales (tras normalizar) se envían una sola vez, y los
+        que ya está traduciendo otra llamada se esperan en lugar de
+        reenviarse (`SingleFlight`).
+        """
 
-        if provider == "deepl":
-            return self._translate_deepl(texts, source_lang, target_lang)
+        provider = self.config.provider
+        by_key: Dict[Tuple[str, str, str, str], List[int]] = {}
+        for i in missing:
+            # Los textos solo de espacios se agrupan tal cual.
+            key = (provider, source_lang, target_lang, normalize_text(texts[i]) or texts[i])
+            by_key.setdefault(key, []).append(i)
+
+        owned, joined = self._flights.claim(by_key)
+        results: Dict[int, str] = {}
+
+        def _resolve(key: Tuple[str, str, str, str], translated: str) -> Dict[int, str]:
+            lines = {i: translated for i in by_key[key]}
+            results.update(lines)
+            return lines
+
+        def _send(keys: List[Tuple[str, str, str, str]], flights: Dict[Tuple[str, str, str, str], Flight] | None) -> None:
+            # `flights`: los vuelos propios de `keys`, o None si no se comparten.
+            pending = [texts[by_key[key][0]] for key in keys]
+            resolved: Set[Tuple[str, str, str, str]] = set()
+
+            def _on_line(index: int, translated: str) -> None:
+                # Llega desde los hilos de los lotes: solo se notifica.
+                if on_lines is not None:
+                    on_lines({i: translated for i in by_key[keys[index]]})
+
+            def _on_batch(batch: range, translated: List[str], served_by: str) -> None:
+                lines: Dict[int, str] = {}
+                for key, text in zip(keys[batch.start : batch.stop], translated):
+                    lines.update(_resolve(key, text))
+                    if flights is not None:
+                        self._flights.resolve(key, flights[key], text)
+                        resolved.add(key)
+                if on_lines is not None:
+                    on_lines(lines)
+                if memory is not None:
+                    try:
+                        # Con respaldo, la clave es el proveedor que respondió, no el configurado.
+                        memory.put_many(
+                            served_by, source_lang, target_lang, zip(pending[batch.start : batch.stop], translated)
+                        )
+                    except Exception:
+                        logging.getLogger(__name__).exception("No se pudo guardar en la memoria de traducción")
+
+            try:
+                self._translate_with_provider(
+                    pending,
+                    source_lang,
+                    target_lang,
+                    cancel_token,
+                    on_batch=_on_batch,
+                    on_line=_on_line if on_lines is not None else None,
+                    priority=priority,
+                )
+            finally:
+                if flights is not None:
+                    # Las que no llegaron a resolverse: que las reintente quien espere.
+                    self._flights.abandon({key: flights[key] for key in keys if key not in resolved})
+
+        sent: List[str] = []
+        if owned:
+            sent.extend(texts[by_key[key][0]] for key in owned)
+            _send(list(owned), owned)
+
+        retry = []
+        for key, flight in joined.items():
+            translated = flight.wait(cancel_token)
+            if translated is None:
+                retry.append(key)
+            else:
+                lines = _resolve(key, translated)
+                if on_lines is not None:
+                    on_lines(lines)
+        if retry:
+            logging.getLogger(__name__).info("%s segmentos compartidos fallaron; se traducen aquí", len(retry))
+            sent.extend(texts[by_key[key][0]] for key in retry)
+            _send(retry, None)
+
+        limits = self._batch_limits()
+        requested = [texts[i] for i in missing]
+        saved_requests = len(split_batches(requested, limits)) - len(split_batches(sent, limits))
+        saved_chars = sum(len(t) for t in requested) - sum(len(t) for t in sent)
+        self._flights.record(
+            duplicates=len(missing) - len(by_key),
+            coalesced=len(joined) - len(retry),
+            requests=max(0, saved_requests),
+            chars=saved_chars,
+        )
+        if len(sent) < len(missing):
+            logging.getLogger(__name__).info(
+                "Segmentos repetidos o en vuelo: %s/%s sin enviar (%s caracteres)",
+                len(missing) - len(sent),
+                len(missing),
+                saved_chars,
+            )
+        return results
+
+    def _translate_with_provider(
+        self,
+        texts: List[str],
+        source_lang: str,
+        target_lang: str,
+        cancel_token: CancellationToken | None,
+        on_batch: Callable[[range, List[str], str], None] | None = None,
+        on_line: Callable[[int, str], None] | None = None,
+        priority: int = PRIORITY_INTERACTIVE,
+    ) -> List[str]:
+        """Traduce `texts` por lotes; `on_line` recibe (posición, traducción)
+        de cada línea recibida en streaming, si el proveedor lo admite.
+
+        `on_batch` recibe además el proveedor que sirvió el lote, que con
+        respaldo puede no ser el configurado.
+        """
 
-        if provider == "generic":
-            return self._translate_generic(texts, source_lang, target_lang)
+        provider = self.config.provider
+        translate_batch: Callable[[range, List[str]], List[str]] | None = None
+        # Inicio del lote -> proveedor ganador (solo con respaldo).
+        served_by: Dict[int, str] = {}
+        if provider in ("deepl", "generic"):
+
+            def translate_batch(batch: range, chunk: List[str]) -> List[str]:
+                chunk_line = None
+                if on_line is not None:
+
+                    def chunk_line(index: int, text: str) -> None:
+                        on_line(batch.start + index, text)
+
+                if self._hedger is None:
+                    return self._call_provider(
+                        self.config, chunk, source_lang, target_lang, cancel_token, chunk_line, priority
+                    )
+                configs = {c.provider: c for c in self.providers}
+                # Con varios intentos en vuelo, solo uno pinta líneas: el
+                # primero que emite, mientras no falle ni se cancele. Si no,
+                # el overlay mezclaría las traducciones de dos proveedores.
+                streamer: List[str] = []
+                stream_lock = threading.Lock()
+
+                def attempt(name: str, token: CancellationToken) -> List[str]:
+                    attempt_line = None
+                    if chunk_line is not None:
+
+                        def attempt_line(index: int, text: str) -> None:
+                            if token.cancelled:
+                                return
+                            with stream_lock:
+                                if not streamer:
+                                    streamer.append(name)
+                                elif streamer[0] != name:
+                                    return
+                            chunk_line(index, text)
+
+                    try:
+                        return self._call_provider(
+                            configs[name], chunk, source_lang, target_lang, token, attempt_line, priority
+                        )
+                    except BaseException:
+                        with stream_lock:
+                            if streamer == [name]:
+                                streamer.clear()
+                        raise
+
+                winner, result = self._hedger.call(attempt, cancel_token)
+                if winner != provider:
+                    logging.getLogger(__name__).info("Lote de %s líneas servido por %s", len(chunk), winner)
+                    served_by[batch.start] = winner
+                return result
+
+        batch_done = None
+        if on_batch is not None:
+
+            def batch_done(batch: range, translated: List[str]) -> None:
+                on_batch(batch, translated, served_by.pop(batch.start, provider))
+
+        if translate_batch is not None:
+            batches = split_batches(texts, self._batch_limits())
+            if len(batches) > 1:
+                logging.getLogger(__name__).info(
+                    "Traduciendo %s líneas en %s lotes (%s en paralelo)",
+                    len(texts),
+                    len(batches),
+                    self._batch_concurrency,
+                )
+            return dispatch_batches(
+                texts,
+                batches,
+                translate_batch,
+                self._batch_executor,
+                max_concurrency=self._batch_concurrency,
+                cancel_token=cancel_token,
+                on_batch=batch_done,
+            )
 
         # Fallback de seguridad.
         suffix = f" [{target_lang}]"
-        return [t + suffix if t.strip() else t for t in texts]
+        result = [t + suffix if t.strip() else t for t in texts]
+        if on_batch is not None:
+            on_batch(range(len(texts)), result, provider)
+        return result
+
+    def _batch_limits(self) -> BatchLimits:
+        # Con respaldo, un lote debe caber en cualquiera de los proveedores.
+        return combined_limits([c.provider for c in self.providers])
+
+    def _call_provider(
+        self,
+        config: TranslationConfig,
+        texts: List[str],
+        source_lang: str,
+        target_lang: str,
+        cancel_token: CancellationToken | None,
+        on_line: Callable[[int, str], None] | None,
+        priority: int = PRIORITY_INTERACTIVE,
+    ) -> List[str]:
+        if config.provider == "deepl":
+            return self._translate_deepl(texts, source_lang, target_lang, cancel_token, config=config, priority=priority)
+        return self._translate_generic(
+            texts, source_lang, target_lang, cancel_token, on_line=on_line, config=config, priority=priority
+        )
 
     # ---------------------------------------------------------
     # Proveedor DeepL
     # ---------------------------------------------------------
-    def _translate_deepl(self, texts: List[str], source_lang: str, target_lang: str) -> List[str]:
-        assert self.config.api_key and self.config.base_url
+    def _translate_deepl(
+        self,
+        texts: List[str],
+        source_lang: str,
+        target_lang: str,
+        cancel_token: CancellationToken | None = None,
+        config: TranslationConfig | None = None,
+        priority: int = PRIORITY_INTERACTIVE,
+    ) -> List[str]:
+        config = config or self.config
+        assert config.api_key and config.base_url
 
         target = _deepl_lang(target_lang)
         source = _deepl_lang(source_lang)
-        data: List[tuple[str, str]] = [("auth_key", self.config.api_key)]
+        data: List[tuple[str, str]] = [("auth_key", config.api_key)]
         for t in texts:
             data.append(("text", t))
 
@@ -146,12 +580,20 @@ class TranslationClient:
             data.append(("source_lang", source))
 
         try:
-            resp = requests.post(self.config.base_url, data=data, timeout=15)
+            resp = self._http.post(
+                config.base_url,
+                15,
+                cancel_token,
+                rate_limiter=get_rate_limiter(config.provider),
+                cost=sum(len(t) for t in texts),
+                priority=priority,
+                data=data,
+            )
         except requests.RequestException as exc:
-            raise TranslationError(str(exc)) from exc
+            raise _request_error(exc) from exc
 
         if resp.status_code >= 400:
-            raise TranslationError(f"HTTP {resp.status_code}: {resp.text[:200]}")
+            raise _http_error(resp)
 
         payload = resp.json()
         translations = payload.get("translations")
@@ -166,8 +608,18 @@ class TranslationClient:
     # ---------------------------------------------------------
     # Proveedor genÃ©rico HTTP (backend propio)
     # ---------------------------------------------------------
-    def _translate_generic(self, texts: List[str], source_lang: str, target_lang: str) -> List[str]:
-        assert self.config.api_key and self.config.base_url
+    def _translate_generic(
+        self,
+        texts: List[str],
+        source_lang: str,
+        target_lang: str,
+        cancel_token: CancellationToken | None = None,
+        on_line: Callable[[int, str], None] | None = None,
+        config: TranslationConfig | None = None,
+        priority: int = PRIORITY_INTERACTIVE,
+    ) -> List[str]:
+        config = config or self.config
+        assert config.api_key and config.base_url
 
         payload = {
             "texts": texts,
@@ -175,17 +627,35 @@ class TranslationClient:
             "target": target_lang,
         }
         headers = {
-            "Authorization": f"Bearer {self.config.api_key}",
+            "Authorization": f"Bearer {config.api_key}",
             "Content-Type": "application/json",
         }
+        stream = STREAM_GENERIC_RESPONSES and on_line is not None
+        if stream:
+            payload["stream"] = True
+            headers["Accept"] = f"{NDJSON_CONTENT_TYPE}, application/json"
 
         try:
-            resp = requests.post(self.config.base_url, json=payload, headers=headers, timeout=10)
+            resp = self._http.post(
+                config.base_url,
+                10,
+                cancel_token,
+                rate_limiter=get_rate_limiter(config.provider),
+                cost=sum(len(t) for t in texts),
+                priority=priority,
+                json=payload,
+                headers=headers,
+                stream=stream,
+            )
         except requests.RequestException as exc:
-            raise TranslationError(str(exc)) from exc
+            raise _request_error(exc) from exc
 
         if resp.status_code >= 400:
-            raise TranslationError(f"HTTP {resp.status_code}: {resp.text[:200]}")
+            raise _http_error(resp)
+
+        if stream and resp.headers.get("Content-Type", "").startswith(NDJSON_CONTENT_TYPE):
+            assert on_line is not None
+            return self._read_ndjson(resp, len(texts), cancel_token, on_line)
 
         data = resp.json()
         translations = data.get("translations")
@@ -197,3 +667,38 @@ class TranslationClient:
 
         return [str(t) for t in translations]
 
+    def _read_ndjson(
+        self,
+        resp: requests.Response,
+        count: int,
+        cancel_token: CancellationToken | None,
+        on_line: Callable[[int, str], None],
+    ) -> List[str]:
+        """Lee una respuesta NDJSON del backend genérico línea a línea."""
+
+        result: List[str | None] = [None] * count
+        try:
+            for raw in resp.iter_lines():
+                if cancel_token is not None:
+                    cancel_token.raise_if_cancelled()
+                if not raw:
+                    continue
+                item = json.loads(raw)
+                if "error" in item:
+                    raise TranslationError(f"Error del motor de traducción: {str(item['error'])[:200]}")
+                index = item.get("index")
+                if not isinstance(index, int) or not 0 <= index < count:
+                    raise TranslationError("Respuesta inesperada del motor de traducción (streaming)")
+                result[index] = str(item.get("translation", ""))
+                on_line(index, result[index])  # type: ignore[arg-type]
+        except requests.RequestException as exc:
+            # Conexión cortada a mitad del stream.
+            raise _request_error(exc) from exc
+        except ValueError as exc:
+            raise TranslationError(str(exc)) from exc
+        finally:
+            resp.close()
+
+        if any(text is None for text in result):
+            raise TranslationError("Número de traducciones distinto al de textos de entrada (streaming)")
+        return [text for text in result if text is not None]
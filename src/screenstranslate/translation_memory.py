@@ -0,0 +1,452 @@
+"""Memoria de traducción persistente (SQLite).
+
+Menús, etiquetas de interfaz de juegos o subtítulos recurrentes se
+capturan una y otra vez con el mismo texto. Antes de llamar al proveedor,
+`TranslationClient` consulta aquí cada línea y solo envía las que faltan.
+
+Las entradas se indexan por (proveedor, idioma origen, idioma destino,
+texto normalizado) y se guardan en `get_app_dir()`. Cuando la base supera
+`max_entries` filas o `max_bytes` de texto se eliminan las entradas usadas
+hace más tiempo (LRU).
+
+Si no hay coincidencia exacta, un índice de casi duplicados (`FuzzyIndex`)
+permite reutilizar la traducción de un segmento a distancia de edición
+pequeña, típico del ruido de OCR (`l`/`1`, puntuación suelta...).
+"""
+
+from __future__ import annotations
+
+import logging
+import os
+import re
+import sqlite3
+import threading
+import time
+import unicodedata
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Dict, Iterable, List, Sequence, Tuple
+
+from .config import get_app_dir
+from .fuzzy_index import FuzzyIndex
+
+
+TM_FILE_NAME = "translation_memory.sqlite3"
+
+# Tras una expulsión se deja la base en este porcentaje de los límites
+# para no expulsar en cada inserción.
+EVICTION_HEADROOM = 0.9
+# Límite de parámetros por consulta (SQLite antiguo admite 999).
+_MAX_SQL_PARAMS = 900
+# Filas leídas por consulta al construir un índice difuso.
+INDEX_SNAPSHOT_CHUNK = 5000
+
+_DIGITS_RE = re.compile(r"\d+")
+
+IndexKey = Tuple[str, str, str]
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS tm (
+    provider TEXT NOT NULL,
+    source_lang TEXT NOT NULL,
+    target_lang TEXT NOT NULL,
+    norm_text TEXT NOT NULL,
+    translation TEXT NOT NULL,
+    size INTEGER NOT NULL,
+    created_at REAL NOT NULL,
+    last_used REAL NOT NULL,
+    hits INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (provider, source_lang, target_lang, norm_text)
+);
+CREATE INDEX IF NOT EXISTS tm_last_used ON tm (last_used);
+"""
+
+
+def normalize_text(text: str) -> str:
+    """Forma canónica de una línea: NFC, espacios colapsados y sin bordes.
+
+    Se conservan mayúsculas y puntuación, que cambian la traducción.
+    """
+
+    return " ".join(unicodedata.normalize("NFC", text).split())
+
+
+def _same_numbers(a: str, b: str) -> bool:
+    """Evita reutilizar "Nivel 1" para "Nivel 2".
+
+    Si ambos textos tienen números deben coincidir; si solo uno los tiene
+    se acepta, porque suele ser ruido de OCR (`l` leída como `1`).
+    """
+
+    numbers_a = _DIGITS_RE.findall(a)
+    numbers_b = _DIGITS_RE.findall(b)
+    return not numbers_a or not numbers_b or numbers_a == numbers_b
+
+
+@dataclass
+class TranslationMemoryStats:
+    hits: int = 0
+    fuzzy_hits: int = 0
+    misses: int = 0
+    entries: int = 0
+
+    @property
+    def hit_rate(self) -> float:
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+
+class TranslationMemory:
+    """Almacén clave → traducción con expulsión LRU por filas y tamaño."""
+
+    def __init__(
+        self,
+        path: Path | str,
+        max_entries: int = 50_000,
+        max_bytes: int = 32 * 1024 * 1024,
+        fuzzy: bool = True,
+        fuzzy_max_distance: int = 2,
+        fuzzy_min_similarity: float = 0.9,
+    ) -> None:
+        self.path = str(path)
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.fuzzy = fuzzy
+        self.fuzzy_max_distance = fuzzy_max_distance
+        self.fuzzy_min_similarity = fuzzy_min_similarity
+        # Un índice por (proveedor, origen, destino), construido al primer uso.
+        self._indexes: Dict[IndexKey, FuzzyIndex] = {}
+        # Índices en construcción (fuera de _lock): segmentos guardados
+        # mientras tanto, para añadirlos al registrar. None si se invalidó.
+        self._building: Dict[IndexKey, List[str] | None] = {}
+        # Un solo hilo construye cada índice; el resto espera ese, no _lock.
+        self._build_locks: Dict[IndexKey, threading.Lock] = {}
+        self._lock = threading.Lock()
+        # Se usa desde los hilos del flujo de traducción, siempre bajo _lock.
+        self._conn = sqlite3.connect(self.path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(_SCHEMA)
+        self._conn.commit()
+        self._stats = TranslationMemoryStats()
+        self._entries, self._bytes = self._count()
+
+    def _count(self) -> Tuple[int, int]:
+        row = self._conn.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM tm").fetchone()
+        return int(row[0]), int(row[1])
+
+    def get_many(self, provider: str, source_lang: str, target_lang: str, texts: Sequence[str]) -> Dict[int, str]:
+        """Traducciones guardadas, indexadas por la posición en `texts`."""
+
+        by_key: Dict[str, List[int]] = {}
+        for index, text in enumerate(texts):
+            key = normalize_text(text)
+            if key:
+                by_key.setdefault(key, []).append(index)
+        if not by_key:
+            return {}
+
+        found: Dict[int, str] = {}
+        now = time.time()
+        keys = list(by_key)
+        with self._lock:
+            for start in range(0, len(keys), _MAX_SQL_PARAMS):
+                chunk = keys[start : start + _MAX_SQL_PARAMS]
+                placeholders = ",".join("?" * len(chunk))
+                rows = self._conn.execute(
+                    "SELECT norm_text, translation FROM tm"
+                    " WHERE provider = ? AND source_lang = ? AND target_lang = ?"
+                    f" AND norm_text IN ({placeholders})",
+                    (provider, source_lang, target_lang, *chunk),
+                ).fetchall()
+                for norm_text, translation in rows:
+                    for index in by_key[norm_text]:
+                        found[index] = translation
+                if rows:
+                    self._conn.executemany(
+                        "UPDATE tm SET last_used = ?, hits = hits + 1"
+                        " WHERE provider = ? AND source_lang = ? AND target_lang = ? AND norm_text = ?",
+                        [(now, provider, source_lang, target_lang, norm_text) for norm_text, _ in rows],
+                    )
+            self._conn.commit()
+
+        exact_hits = len(found)
+        if self.fuzzy:
+            missing = [key for key in keys if by_key[key][0] not in found]
+            if missing:
+                for key, translation in self._fuzzy_lookup((provider, source_lang, target_lang), missing).items():
+                    for index in by_key[key]:
+                        found[index] = translation
+
+        with self._lock:
+            looked_up = sum(len(indices) for indices in by_key.values())
+            self._stats.hits += len(found)
+            self._stats.fuzzy_hits += len(found) - exact_hits
+            self._stats.misses += looked_up - len(found)
+        return found
+
+    def _index_for(self, index_key: IndexKey) -> FuzzyIndex:
+        with self._lock:
+            index = self._indexes.get(index_key)
+            if index is not None:
+                return index
+            build_lock = self._build_locks.setdefault(index_key, threading.Lock())
+        with build_lock:
+            with self._lock:
+                index = self._indexes.get(index_key)
+                if index is not None:
+                    return index
+                self._building[index_key] = []
+            started = time.perf_counter()
+            # Se lee por tramos (en el orden del índice único) y se calculan las firmas MinHash sin
+            # _lock: el resto de lecturas y escrituras de la memoria siguen
+            # mientras tanto, y lo que escriban se apunta en `_building`.
+            texts: List[str] = []
+            while True:
+                with self._lock:
+                    rows = self._conn.execute(
+                        "SELECT norm_text FROM tm"
+                        " WHERE provider = ? AND source_lang = ? AND target_lang = ? AND norm_text > ?"
+                        " ORDER BY norm_text LIMIT ?",
+                        (*index_key, texts[-1] if texts else "", INDEX_SNAPSHOT_CHUNK),
+                    ).fetchall()
+                if not rows:
+                    break
+                texts.extend(row[0] for row in rows)
+            index = FuzzyIndex()
+            index.add_many(texts)
+            with self._lock:
+                added = self._building.pop(index_key)
+                if added is None:
+                    # Se invalidó durante la construcción: sirve para esta
+                    # consulta (que verifica en la base), pero no se guarda.
+                    return index
+                index.add_many(added)
+                self._indexes[index_key] = index
+        logging.getLogger(__name__).info(
+            "Índice difuso de la memoria %s construido: %s segmentos en %.1f ms",
+            "/".join(index_key),
+            len(index),
+            (time.perf_counter() - started) * 1000,
+        )
+        return index
+
+    def _fuzzy_lookup(self, index_key: IndexKey, keys: Sequence[str]) -> Dict[str, str]:
+        """Traducciones de segmentos casi idénticos a `keys` (clave → traducción)."""
+
+        index = self._index_for(index_key)
+        matches: Dict[str, str] = {}
+        for key in keys:
+            match = index.nearest(key, self.fuzzy_max_distance, self.fuzzy_min_similarity)
+            if match is not None and _same_numbers(key, match.text):
+                matches[key] = match.text
+        if not matches:
+            return {}
+
+        wanted = list(set(matches.values()))
+        translations: Dict[str, str] = {}
+        with self._lock:
+            for start in range(0, len(wanted), _MAX_SQL_PARAMS):
+                chunk = wanted[start : start + _MAX_SQL_PARAMS]
+                placeholders = ",".join("?" * len(chunk))
+                # El índice puede conservar segmentos ya expulsados: solo
+                # cuentan los que siguen en la base.
+                translations.update(
+                    self._conn.execute(
+                        "SELECT norm_text, translation FROM tm"
+                        " WHERE provider = ? AND source_lang = ? AND target_lang = ?"
+                        f" AND norm_text IN ({placeholders})",
+                        (*index_key, *chunk),
+                    ).fetchall()
+                )
+        return {key: translations[text] for key, text in matches.items() if text in translations}
+
+    def put_many(
+        self,
+        provider: str,
+        source_lang: str,
+        target_lang: str,
+        pairs: Iterable[Tuple[str, str]],
+    ) -> None:
+        """Guarda pares (texto original, traducción)."""
+
+        now = time.time()
+        rows = []
+        added_bytes = 0
+        for text, translation in pairs:
+            key = normalize_text(text)
+            if not key:
+                continue
+            # Varias formas del mismo texto comparten entrada: se guarda la
+            # traducción sin espacios de borde para que sirva a todas.
+            translation = translation.strip()
+            size = len(key.encode("utf-8")) + len(translation.encode("utf-8"))
+            added_bytes += size
+            rows.append((provider, source_lang, target_lang, key, translation, size, now, now))
+        if not rows:
+            return
+
+        with self._lock:
+            self._conn.executemany(
+                "INSERT INTO tm (provider, source_lang, target_lang, norm_text, translation, size, created_at, last_used)"
+                " VALUES (?, ?, ?, ?, ?, ?, ?, ?)"
+                " ON CONFLICT (provider, source_lang, target_lang, norm_text)"
+                " DO UPDATE SET translation = excluded.translation, size = excluded.size,"
+                " last_used = excluded.last_used",
+                rows,
+            )
+            self._conn.commit()
+            # Aproximado por exceso (las actualizaciones también suman); solo
+            # se recuenta de verdad cuando parece superar algún límite.
+            self._entries += len(rows)
+            self._bytes += added_bytes
+            index_key = (provider, source_lang, target_lang)
+            index = self._indexes.get(index_key)
+            if index is not None:
+                index.add_many(row[3] for row in rows)
+            elif self._building.get(index_key) is not None:
+                self._building[index_key].extend(row[3] for row in rows)
+            if self._entries > self.max_entries or self._bytes > self.max_bytes:
+                self._entries, self._bytes = self._count()
+                self._evict_locked()
+
+    def prewarm(self, provider: str, source_lang: str, target_lang: str, pairs: Iterable[Tuple[str, str]]) -> None:
+        """Carga traducciones conocidas (por ejemplo, un glosario) de antemano."""
+
+        self.put_many(provider, source_lang, target_lang, pairs)
+
+    def _evict_locked(self) -> None:
+        if self._entries <= self.max_entries and self._bytes <= self.max_bytes:
+            return
+        target = int(self.max_entries * EVICTION_HEADROOM)
+        if self._bytes > self.max_bytes * EVICTION_HEADROOM and self._bytes:
+            # Suponemos un tamaño medio por entrada para estimar cuántas sobran.
+            target = min(target, int(self._entries * self.max_bytes * EVICTION_HEADROOM / self._bytes))
+        excess = self._entries - max(0, target)
+        if excess <= 0:
+            return
+        victims = self._conn.execute(
+            "SELECT rowid, provider, source_lang, target_lang, norm_text FROM tm ORDER BY last_used LIMIT ?",
+            (excess,),
+        ).fetchall()
+        self._conn.executemany("DELETE FROM tm WHERE rowid = ?", [(row[0],) for row in victims])
+        self._conn.commit()
+        self._entries, self._bytes = self._count()
+        # Los índices difusos no deben proponer segmentos que ya no están.
+        evicted: Dict[IndexKey, List[str]] = {}
+        for _, provider, source_lang, target_lang, norm_text in victims:
+            evicted.setdefault((provider, source_lang, target_lang), []).append(norm_text)
+        for index_key, texts in evicted.items():
+            index = self._indexes.get(index_key)
+            if index is not None:
+                index.remove_many(texts)
+            if index_key in self._building:
+                # Más simple descartar esa construcción que apuntar las bajas.
+                self._building[index_key] = None
+        logging.getLogger(__name__).info("Memoria de traducción: %s entradas expulsadas", excess)
+
+    def invalidate(
+        self,
+        provider: str | None = None,
+        source_lang: str | None = None,
+        target_lang: str | None = None,
+        text: str | None = None,
+    ) -> int:
+        """Elimina las entradas que coinciden con los filtros dados.
+
+        Sin filtros vacía la memoria. Devuelve el número de entradas borradas.
+        """
+
+        clauses: List[str] = []
+        params: List[str] = []
+        for column, value in (
+            ("provider", provider),
+            ("source_lang", source_lang),
+            ("target_lang", target_lang),
+            ("norm_text", normalize_text(text) if text is not None else None),
+        ):
+            if value is not None:
+                clauses.append(f"{column} = ?")
+                params.append(value)
+        where = f" WHERE {' AND '.join(clauses)}" if clauses else ""
+        with self._lock:
+            deleted = self._conn.execute(f"DELETE FROM tm{where}", params).rowcount
+            self._conn.commit()
+            self._entries, self._bytes = self._count()
+            # Los índices se reconstruyen con lo que quede al siguiente uso.
+            for index_key in list(self._indexes) + list(self._building):
+                if all(value is None or value == part for value, part in zip((provider, source_lang, target_lang), index_key)):
+                    self._indexes.pop(index_key, None)
+                    if index_key in self._building:
+                        self._building[index_key] = None
+        return deleted
+
+    def clear(self) -> None:
+        self.invalidate()
+        with self._lock:
+            self._stats = TranslationMemoryStats()
+
+    def stats(self) -> TranslationMemoryStats:
+        with self._lock:
+            return TranslationMemoryStats(
+                hits=self._stats.hits,
+                fuzzy_hits=self._stats.fuzzy_hits,
+                misses=self._stats.misses,
+                entries=self._entries,
+            )
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+
+def get_translation_memory_path() -> Path:
+    return get_app_dir() / TM_FILE_NAME
+
+
+def create_translation_memory_from_env() -> TranslationMemory | None:
+    """Crea la memoria de traducción según las variables de entorno.
+
+    - SCREENSTRANSLATE_TM=0: la desactiva.
+    - SCREENSTRANSLATE_TM_MAX_ENTRIES: número máximo de entradas.
+    - SCREENSTRANSLATE_TM_MAX_MB: tamaño máximo del texto guardado.
+    - SCREENSTRANSLATE_TM_FUZZY=0: desactiva la búsqueda aproximada.
+    - SCREENSTRANSLATE_TM_FUZZY_SIMILARITY: similitud mínima (0-1) para
+      reutilizar la traducción de un segmento parecido.
+    """
+
+    if os.getenv("SCREENSTRANSLATE_TM", "1") == "0":
+        return None
+    try:
+        max_entries = int(os.getenv("SCREENSTRANSLATE_TM_MAX_ENTRIES", "50000"))
+        max_mb = float(os.getenv("SCREENSTRANSLATE_TM_MAX_MB", "32"))
+        min_similarity = float(os.getenv("SCREENSTRANSLATE_TM_FUZZY_SIMILARITY", "0.9"))
+    except ValueError:
+        max_entries, max_mb, min_similarity = 50_000, 32.0, 0.9
+    try:
+        return TranslationMemory(
+            get_translation_memory_path(),
+            max_entries=max_entries,
+            max_bytes=int(max_mb * 1024 * 1024),
+            fuzzy=os.getenv("SCREENSTRANSLATE_TM_FUZZY", "1") != "0",
+            fuzzy_min_similarity=min_similarity,
+        )
+    except sqlite3.Error:
+        logging.getLogger(__name__).exception("No se pudo abrir la memoria de traducción")
+        return None
+
+
+_translation_memory: TranslationMemory | None = None
+_translation_memory_loaded = False
+_translation_memory_lock = threading.Lock()
+
+
+def get_translation_memory() -> TranslationMemory | None:
+    """Memoria de traducción compartida (None si está desactivada)."""
+
+    global _translation_memory, _translation_memory_loaded
+    with _translation_memory_lock:
+        if not _translation_memory_loaded:
+            _translation_memory = create_translation_memory_from_env()
+            _translation_memory_loaded = True
+        return _translation_memory
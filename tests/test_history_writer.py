@@ -0,0 +1,88 @@
+"""Escritor del historial: un lote por transacción, aunque el proceso muera."""
+
+import os
+import random
+import sqlite3
+import subprocess
+import sys
+from pathlib import Path
+
+import pytest
+
+# Líneas por captura: lotes grandes para que el cierre caiga a menudo en
+# mitad de una transacción.
+LINES_PER_BATCH = 400
+CONFIRMED_BEFORE_KILL = 5
+
+# Proceso hijo: encola capturas una tras otra, como la aplicación, y avisa
+# por stdout de cada lote encolado ("sub N") y de cada lote escrito ("ok N").
+CHILD = """
+import sys
+from screenstranslate.history import HistoryStore, HistoryWriter
+
+store = HistoryStore(sys.argv[1])
+writer = HistoryWriter(store, flush_interval=0.01)
+batch = 0
+while True:
+    rows = [(f"{batch}:{line}", "traducido", "en", "es", "2026-01-01T00:00:00") for line in range(int(sys.argv[2]))]
+    print("sub", batch, flush=True)
+    writer.submit(rows)
+    if writer.flush(10):
+        print("ok", batch, flush=True)
+    batch += 1
+"""
+
+
+def _run_and_kill(db_path: Path, delay: float) -> tuple[int, int]:
+    src = Path(__file__).resolve().parents[1] / "src"
+    env = dict(os.environ, PYTHONPATH=str(src) + os.pathsep + os.environ.get("PYTHONPATH", ""))
+    proc = subprocess.Popen(
+        [sys.executable, "-c", CHILD, str(db_path), str(LINES_PER_BATCH)],
+        stdout=subprocess.PIPE,
+        text=True,
+        env=env,
+    )
+    try:
+        for line in proc.stdout:
+            if line.split() == ["ok", str(CONFIRMED_BEFORE_KILL)]:
+                break
+        else:
+            pytest.fail("el proceso hijo terminó antes de tiempo")
+        try:
+            proc.wait(delay)
+        except subprocess.TimeoutExpired:
+            pass
+    finally:
+        # SIGKILL en POSIX, TerminateProcess en Windows: sin cierre ordenado.
+        proc.kill()
+        output = proc.communicate()[0]
+    submitted = confirmed = -1
+    for line in output.splitlines():
+        kind, _, number = line.partition(" ")
+        if kind == "sub":
+            submitted = int(number)
+        elif kind == "ok":
+            confirmed = int(number)
+    return max(submitted, CONFIRMED_BEFORE_KILL), max(confirmed, CONFIRMED_BEFORE_KILL)
+
+
+@pytest.mark.parametrize("delay", [0.0, 0.01, 0.05, 0.2])
+def test_crash_kill_loses_at_most_the_last_batch(tmp_path: Path, delay: float) -> None:
+    db_path = tmp_path / "history.sqlite3"
+    submitted, confirmed = _run_and_kill(db_path, delay + random.uniform(0, 0.01))
+
+    conn = sqlite3.connect(db_path)
+    rows = conn.execute("SELECT original FROM history").fetchall()
+    conn.close()
+    counts: dict[int, int] = {}
+    for (original,) in rows:
+        batch = int(original.split(":")[0])
+        counts[batch] = counts.get(batch, 0) + 1
+
+    # Ningún lote a medias.
+    assert all(count == LINES_PER_BATCH for count in counts.values()), counts
+    # Lo escrito es un prefijo de lo encolado: sin huecos ni desorden.
+    assert sorted(counts) == list(range(len(counts)))
+    # Todo lo confirmado sigue ahí, y como mucho falta el último lote encolado.
+    assert len(counts) > confirmed
+    assert len(counts) >= submitted
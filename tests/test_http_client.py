@@ -0,0 +1,130 @@
+"""HttpClient contra un servidor HTTP local de pega."""
+
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Iterator, List, Tuple
+
+import pytest
+
+from screenstranslate.http_client import HttpClient, HttpClientConfig
+from screenstranslate.jobs import CancellationToken, JobCancelled
+
+
+class _StubHandler(BaseHTTPRequestHandler):
+    # Keep-alive: sin HTTP/1.1 cada petición abriría una conexión nueva.
+    protocol_version = "HTTP/1.1"
+
+    def do_POST(self) -> None:
+        server = self.server
+        body = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        with server.lock:
+            server.hits.append((time.monotonic(), self.path))
+            status, headers, delay = server.script.pop(0) if server.script else (200, {}, 0.0)
+        if delay:
+            time.sleep(delay)
+        payload = b"ok:" + body
+        self.send_response(status)
+        for name, value in headers.items():
+            self.send_header(name, value)
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def log_message(self, *args: object) -> None:
+        pass
+
+
+class _StubServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self) -> None:
+        super().__init__(("127.0.0.1", 0), _StubHandler)
+        self.lock = threading.Lock()
+        self.hits: List[Tuple[float, str]] = []
+        # Respuestas en orden: (estado, cabeceras, segundos de espera).
+        self.script: List[Tuple[int, dict, float]] = []
+
+    @property
+    def url(self) -> str:
+        return f"http://127.0.0.1:{self.server_address[1]}/translate"
+
+
+@pytest.fixture
+def server() -> Iterator[_StubServer]:
+    stub = _StubServer()
+    thread = threading.Thread(target=stub.serve_forever, daemon=True)
+    thread.start()
+    yield stub
+    stub.shutdown()
+    stub.server_close()
+
+
+def _client(**overrides: object) -> HttpClient:
+    config = dict(max_retries=3, backoff_base=0.01, backoff_max=5.0, breaker_threshold=50)
+    config.update(overrides)
+    return HttpClient(HttpClientConfig(**config))
+
+
+def test_connections_are_reused(server: _StubServer) -> None:
+    client = _client()
+    for i in range(5):
+        resp = client.post(server.url, 5, data=f"t{i}")
+        assert resp.status_code == 200
+        assert resp.text == f"ok:t{i}"
+    # También por el camino cancelable (hilos del ejecutor).
+    resp = client.post(server.url, 5, CancellationToken(), data="t5")
+    assert resp.status_code == 200
+    metrics = client.metrics()
+    assert metrics.requests == 6
+    assert metrics.new_connections == 1
+    assert metrics.reused_connections == 5
+    client.close()
+
+
+def test_retries_honour_retry_after(server: _StubServer) -> None:
+    server.script = [(503, {"Retry-After": "1"}, 0.0), (429, {}, 0.0)]
+    client = _client()
+    resp = client.post(server.url, 5, data="x")
+    assert resp.status_code == 200
+    assert len(server.hits) == 3
+    assert client.metrics().retries == 2
+    # El primer reintento espera el Retry-After (1 s); el segundo, el backoff corto.
+    assert server.hits[1][0] - server.hits[0][0] >= 0.95
+    assert server.hits[2][0] - server.hits[1][0] < 0.5
+    client.close()
+
+
+def test_non_retryable_status_is_returned_at_once(server: _StubServer) -> None:
+    server.script = [(403, {}, 0.0)]
+    client = _client()
+    assert client.post(server.url, 5, data="x").status_code == 403
+    assert len(server.hits) == 1
+    assert client.metrics().retries == 0
+    client.close()
+
+
+def test_cancelled_request_frees_its_worker(server: _StubServer) -> None:
+    # El servidor tarda 5 s; al cancelar, la conexión se corta y el hilo
+    # queda libre enseguida en lugar de esperar al timeout.
+    server.script = [(200, {}, 5.0)]
+    client = _client(max_workers=1)
+    token = CancellationToken()
+    threading.Timer(0.2, token.cancel).start()
+    started = time.monotonic()
+    with pytest.raises(JobCancelled):
+        client.post(server.url, 10, token, data="lenta")
+    assert time.monotonic() - started < 1.0
+
+    deadline = time.monotonic() + 2.0
+    while client.metrics().running_requests and time.monotonic() < deadline:
+        time.sleep(0.01)
+    metrics = client.metrics()
+    assert metrics.running_requests == 0
+    assert metrics.aborted_requests == 1
+    # Con un solo hilo, la siguiente petición no espera a la abandonada.
+    started = time.monotonic()
+    resp = client.post(server.url, 5, CancellationToken(), data="rápida")
+    assert resp.status_code == 200
+    assert time.monotonic() - started < 1.0
+    client.close()
@@ -0,0 +1,122 @@
+"""El flujo captura → OCR → traducción no bloquea el bucle de eventos de Qt."""
+
+import os
+import threading
+import time
+from typing import Dict, List
+
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+
+import pytest
+from PIL import Image
+from PySide6.QtCore import QCoreApplication, QElapsedTimer, QEventLoop, QThreadPool, QTimer
+
+from screenstranslate.jobs import Job, StageDeadlines
+from screenstranslate.ocr import TextBlock, TextBlockArray
+from screenstranslate.pipeline import PipelineRequest, PipelineSignals, TranslationPipeline
+
+# Hueco máximo admitido entre dos vueltas del bucle de eventos.
+EVENT_LOOP_BUDGET_MS = 50
+# Lo que tarda cada etapa falsa: muy por encima del presupuesto.
+STAGE_SECONDS = 0.3
+TICK_MS = 5
+
+
+@pytest.fixture(scope="module")
+def app() -> QCoreApplication:
+    return QCoreApplication.instance() or QCoreApplication([])
+
+
+class FakeTranslationClient:
+    def __init__(self) -> None:
+        self.threads: List[threading.Thread] = []
+
+    def translate_texts(self, texts, source_lang, target_lang, cancel_token=None, on_lines=None):
+        self.threads.append(threading.current_thread())
+        result = [f"[{target_lang}] {text}" for text in texts]
+        for index, text in enumerate(result):
+            time.sleep(STAGE_SECONDS / len(texts))
+            if on_lines is not None:
+                on_lines({index: text})
+        return result
+
+
+def test_pipeline_never_blocks_the_event_loop(app: QCoreApplication) -> None:
+    stage_threads: List[threading.Thread] = []
+
+    def fake_capture(x: int, y: int, w: int, h: int) -> Image.Image:
+        stage_threads.append(threading.current_thread())
+        time.sleep(STAGE_SECONDS)
+        return Image.new("RGB", (w, h))
+
+    def fake_ocr(img: Image.Image, **kwargs: object) -> TextBlockArray:
+        stage_threads.append(threading.current_thread())
+        time.sleep(STAGE_SECONDS)
+        return TextBlockArray.from_blocks(
+            TextBlock(f"line {i}", 10, 10 + 30 * i, 80, 20, 95.0, 1, i + 1, 1) for i in range(3)
+        )
+
+    history: List[object] = []
+    client = FakeTranslationClient()
+    signals = PipelineSignals()
+    received: Dict[str, object] = {}
+    slot_threads: List[threading.Thread] = []
+    loop = QEventLoop()
+
+    def _record(name: str):
+        def _slot(job: Job, value: object = None) -> None:
+            slot_threads.append(threading.current_thread())
+            received.setdefault(name, value)
+            if name in ("finished", "failed", "cancelled"):
+                loop.quit()
+
+        return _slot
+
+    for name in ("stageChanged", "ocrReady", "linesReady", "finished", "failed", "cancelled"):
+        getattr(signals, name).connect(_record(name))
+
+    # Un temporizador rápido mide cuánto tarda el bucle en volver a atenderlo.
+    gaps: List[int] = []
+    clock = QElapsedTimer()
+    ticker = QTimer()
+    ticker.setInterval(TICK_MS)
+
+    def _tick() -> None:
+        gaps.append(clock.restart())
+
+    ticker.timeout.connect(_tick)
+    QTimer.singleShot(10_000, loop.quit)
+
+    pool = QThreadPool()
+    job = Job(1, StageDeadlines())
+    pipeline = TranslationPipeline(
+        job,
+        PipelineRequest((0, 0, 200, 120), "en", "es"),
+        signals,
+        client,
+        capture=fake_capture,
+        ocr=fake_ocr,
+        record_history=lambda pairs, src, tgt: history.append(pairs),
+    )
+    clock.start()
+    ticker.start()
+    started = time.monotonic()
+    pool.start(pipeline)
+    loop.exec()
+    ticker.stop()
+    pool.waitForDone()
+
+    assert "finished" in received, received
+    assert time.monotonic() - started >= 3 * STAGE_SECONDS
+    result = received["finished"]
+    assert [block.text for block in result.blocks] == [f"[es] line {i}" for i in range(3)]
+    assert [block.text for block in received["ocrReady"]] == [f"line {i}" for i in range(3)]
+    assert "linesReady" in received
+    assert history, "la captura no se guardó en el historial"
+
+    main = threading.main_thread()
+    assert all(thread is not main for thread in stage_threads + client.threads)
+    assert all(thread is main for thread in slot_threads)
+    # Las etapas duran 0,3 s cada una; el bucle nunca debe quedarse parado.
+    assert len(gaps) > 20
+    assert max(gaps) <= EVENT_LOOP_BUDGET_MS, max(gaps)